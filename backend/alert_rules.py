@@ -0,0 +1,239 @@
+import ast
+import json
+import logging
+import os
+import string
+import threading
+
+import numpy as np
+
+import config
+from config import ALERT_RULES_PATH
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Per-SKU columns rule expressions may use (see alerts._sku_aggregates)
+AGGREGATE_COLUMNS = {
+    "avg_prediction", "max_prediction", "min_prediction",
+    "has_holiday", "has_holiday_names", "all_zero", "non_increasing",
+    "inventory", "sales",
+    "horizon_demand", "safety_stock", "reorder_quantity",
+    "period_days",
+}
+# Fields message templates may use
+MESSAGE_FIELDS = AGGREGATE_COLUMNS | {"sku", "product_name", "holiday_context", "holidays_in_window"}
+SEVERITIES = {"Critical", "High", "Medium", "Low"}
+
+_ALLOWED_NODES = (
+    ast.Expression, ast.BoolOp, ast.And, ast.Or, ast.UnaryOp, ast.Not, ast.USub,
+    ast.Compare, ast.Lt, ast.LtE, ast.Gt, ast.GtE, ast.Eq, ast.NotEq,
+    ast.BinOp, ast.Add, ast.Sub, ast.Mult, ast.Div,
+    ast.Name, ast.Load, ast.Constant,
+)
+
+
+class RuleError(ValueError):
+    """An alert rule file or expression is invalid."""
+
+
+def thresholds() -> dict:
+    """Numeric settings from ``config`` (e.g. ``OVERSTOCK_THRESHOLD``) usable in rules."""
+    return {
+        name: value for name, value in vars(config).items()
+        if name.isupper() and isinstance(value, (int, float)) and not isinstance(value, bool)
+    }
+
+# -------------------------------
+# Expression Compiler
+# -------------------------------
+class _Vectorize(ast.NodeTransformer):
+    """Rewrite ``and``/``or``/``not`` and chained comparisons into elementwise ``&``/``|``/``~``."""
+
+    def visit_BoolOp(self, node):
+        self.generic_visit(node)
+        op = ast.BitAnd() if isinstance(node.op, ast.And) else ast.BitOr()
+        result = node.values[0]
+        for value in node.values[1:]:
+            result = ast.BinOp(left=result, op=op, right=value)
+        return result
+
+    def visit_UnaryOp(self, node):
+        self.generic_visit(node)
+        if isinstance(node.op, ast.Not):
+            return ast.UnaryOp(op=ast.Invert(), operand=node.operand)
+        return node
+
+    def visit_Compare(self, node):
+        self.generic_visit(node)
+        if len(node.ops) == 1:
+            return node
+        # a < b < c  ->  (a < b) & (b < c)
+        lefts = [node.left] + node.comparators[:-1]
+        parts = [ast.Compare(left=left, ops=[op], comparators=[right])
+                 for left, op, right in zip(lefts, node.ops, node.comparators)]
+        result = parts[0]
+        for part in parts[1:]:
+            result = ast.BinOp(left=result, op=ast.BitAnd(), right=part)
+        return result
+
+
+def compile_expression(text: str, names: set, label: str = "rule"):
+    """
+    Validate ``text`` against a small expression grammar (comparisons, boolean
+    logic, arithmetic, numbers and the given ``names``) and compile it into a
+    code object that evaluates elementwise over NumPy arrays.
+    """
+    try:
+        tree = ast.parse(text, mode="eval")
+    except SyntaxError as e:
+        raise RuleError(f"{label}: invalid expression {text!r}: {e.msg}")
+
+    for node in ast.walk(tree):
+        if not isinstance(node, _ALLOWED_NODES):
+            raise RuleError(f"{label}: '{type(node).__name__}' is not allowed in {text!r}")
+        if isinstance(node, ast.Name) and node.id not in names:
+            raise RuleError(f"{label}: unknown name '{node.id}' in {text!r}")
+        if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+            raise RuleError(f"{label}: only numeric constants are allowed in {text!r}")
+
+    tree = ast.fix_missing_locations(_Vectorize().visit(tree))
+    return compile(tree, f"<{label}>", "eval")
+
+
+def _evaluate(code, namespace: dict, size: int) -> np.ndarray:
+    result = eval(code, {"__builtins__": {}}, namespace)
+    return np.broadcast_to(np.asarray(result, dtype=bool), (size,))
+
+# -------------------------------
+# Rules
+# -------------------------------
+class CompiledRule:
+    """One rule: a vectorized ``when`` mask, a severity and a message template."""
+
+    def __init__(self, spec: dict, names: set):
+        if not isinstance(spec, dict):
+            raise RuleError(f"each rule must be a JSON object, got {spec!r}")
+        try:
+            self.name = spec["name"]
+            self.type = spec["type"]
+            self.severity = spec["severity"]
+            self.when_text = spec["when"]
+            self.message = spec["message"]
+        except KeyError as e:
+            raise RuleError(f"rule {spec.get('name', '?')}: missing field {e}")
+
+        label = f"rule {self.name}"
+        self.when = compile_expression(self.when_text, names, label)
+        self.overrides = [
+            (compile_expression(o["when"], names, f"{label} severity override"), o["severity"])
+            for o in spec.get("severity_overrides", [])
+        ]
+        for severity in [self.severity] + [s for _, s in self.overrides]:
+            if severity not in SEVERITIES:
+                raise RuleError(f"{label}: unknown severity '{severity}'")
+
+        fields = {field.split(".")[0].split("[")[0]
+                  for _, field, _, _ in string.Formatter().parse(self.message) if field}
+        unknown = fields - MESSAGE_FIELDS
+        if unknown:
+            raise RuleError(f"{label}: unknown message fields {sorted(unknown)}")
+
+    def mask(self, namespace: dict, size: int) -> np.ndarray:
+        return _evaluate(self.when, namespace, size)
+
+    def severities(self, namespace: dict, size: int) -> np.ndarray:
+        """Severity per SKU; the first matching override wins."""
+        result = np.full(size, self.severity, dtype=object)
+        for code, severity in reversed(self.overrides):
+            result = np.where(_evaluate(code, namespace, size), severity, result)
+        return result
+
+
+class RuleSet:
+    def __init__(self, rules: list, source: str = None):
+        self.rules = rules
+        self.source = source
+
+    @classmethod
+    def from_dict(cls, data: dict, source: str = None) -> "RuleSet":
+        if not isinstance(data, dict):
+            raise RuleError("rules file must contain a JSON object with a 'rules' list")
+        names = AGGREGATE_COLUMNS | set(thresholds())
+        specs = data.get("rules")
+        if not isinstance(specs, list):
+            raise RuleError("rules file must contain a 'rules' list")
+        rules = [CompiledRule(spec, names) for spec in specs]
+        duplicates = {r.name for r in rules if sum(other.name == r.name for other in rules) > 1}
+        if duplicates:
+            raise RuleError(f"duplicate rule names: {sorted(duplicates)}")
+        return cls(rules, source)
+
+    def evaluate(self, columns: dict, size: int):
+        """Return ``(rule, fired_mask, severities)`` for every rule, over all SKUs at once."""
+        namespace = {**thresholds(), **columns}
+        results = []
+        for rule in self.rules:
+            fired = rule.mask(namespace, size)
+            severities = rule.severities(namespace, size) if rule.overrides else None
+            results.append((rule, fired, severities))
+        return results
+
+# -------------------------------
+# Loading & Hot Reload
+# -------------------------------
+_loaded = {}  # path -> (mtime_ns, RuleSet)
+_load_lock = threading.Lock()
+
+
+def load_rules(path: str) -> RuleSet:
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except (json.JSONDecodeError, UnicodeDecodeError) as e:
+        raise RuleError(f"{path}: invalid JSON: {e}")
+    except OSError as e:
+        raise RuleError(f"{path}: cannot read rules file: {e}")
+    return RuleSet.from_dict(data, source=path)
+
+
+def get_rules(path: str = None) -> RuleSet:
+    """
+    The compiled rules in ``path`` (default ``ALERT_RULES_PATH``).
+
+    The file is re-read and recompiled only when its mtime changes, so edits
+    take effect on the next request without a restart. If an edit is invalid,
+    or the file is missing or unreadable, the previous rules stay active and
+    the error is logged.
+    """
+    path = path or ALERT_RULES_PATH
+    cached = _loaded.get(path)
+    try:
+        mtime = os.stat(path).st_mtime_ns
+    except OSError as e:
+        if cached is None:
+            raise RuleError(f"{path}: cannot read rules file: {e}")
+        logger.error(f"❌ Keeping previous alert rules; {path}: {e}")
+        return cached[1]
+
+    if cached is not None and cached[0] == mtime:
+        return cached[1]
+
+    with _load_lock:
+        cached = _loaded.get(path)
+        if cached is not None and cached[0] == mtime:
+            return cached[1]
+        try:
+            rules = load_rules(path)
+        except RuleError as e:
+            if cached is None:
+                raise
+            logger.error(f"❌ Keeping previous alert rules; {e}")
+            rules = cached[1]
+        else:
+            logger.info(f"📜 Loaded {len(rules.rules)} alert rules from {path}")
+        _loaded[path] = (mtime, rules)
+        return rules
@@ -1,11 +1,111 @@
+import numpy as np
 import pandas as pd
-from datetime import datetime
-import holidays
 
-# Load Indian holidays
-india_holidays = holidays.CountryHoliday("IN")
+from holiday_calendar import is_holiday, holiday_name
+from metrics import stage
+from alert_rules import get_rules
+from forecasters import QUANTILE_MEDIAN, QUANTILE_UPPER
 
-def generate_alerts(original_df: pd.DataFrame, forecast_df: pd.DataFrame):
+
+def _sku_aggregates(original_df: pd.DataFrame, forecast_df: pd.DataFrame, period_days: int = 1):
+    """
+    Compute every per-SKU aggregate the alert rules need in one grouped pass.
+    Forecast rows are ``period_days`` long (1 daily, 7 weekly).
+
+    Returns the aggregate frame (indexed by sku, sorted) and the latest
+    original row per SKU.
+    """
+    forecast_df = forecast_df.copy()
+    forecast_df['date'] = pd.to_datetime(forecast_df['date'])
+    forecast_df = forecast_df.sort_values(by=['sku', 'date'], kind='stable').reset_index(drop=True)
+
+    # Add holiday context
+    forecast_df['is_holiday'] = is_holiday(forecast_df['date'], period_days)
+    forecast_df['holiday_name'] = holiday_name(forecast_df['date'], period_days)
+
+    grouped = forecast_df.groupby('sku', sort=True, observed=True)
+    predictions = grouped['prediction']
+    by_sku = forecast_df['sku']
+
+    agg = pd.DataFrame({
+        "avg_prediction": predictions.mean(),
+        "max_prediction": predictions.max(),
+        "min_prediction": predictions.min(),
+        "first_date": grouped['date'].first(),
+        "last_date": grouped['date'].last(),
+        "max_predicted_day": forecast_df.loc[predictions.idxmax(), ['sku', 'date']].set_index('sku')['date'],
+        "has_holiday": grouped['is_holiday'].max() > 0,
+        "all_zero": (forecast_df['prediction'] == 0).groupby(by_sku, observed=True).all(),
+        "non_increasing": (predictions.diff().fillna(0) <= 0).groupby(by_sku, observed=True).all(),
+    })
+
+    # Holiday rows are few, so a plain dict beats a per-group Python agg here
+    holiday_rows = forecast_df.loc[forecast_df['is_holiday'] == 1, ['sku', 'holiday_name']].dropna().drop_duplicates()
+    window_holidays = {}
+    for sku, name in zip(holiday_rows['sku'], holiday_rows['holiday_name']):
+        window_holidays.setdefault(sku, []).append(name)
+    agg["holidays_in_window"] = agg.index.map({sku: ', '.join(names) for sku, names in window_holidays.items()})
+    agg["has_holiday_names"] = agg["holidays_in_window"].notna()
+
+    if "product_name" in forecast_df.columns:
+        agg["product_name"] = forecast_df.dropna(subset=['product_name']).groupby('sku', observed=True)['product_name'].first()
+    else:
+        agg["product_name"] = None
+
+    # Latest inventory/sales row per SKU from the uploaded history
+    latest = original_df[['sku', 'date', 'inventory', 'sales']].copy()
+    latest['date'] = pd.to_datetime(latest['date'])
+    latest = latest.sort_values(by='date', kind='stable').drop_duplicates('sku', keep='last').set_index('sku')
+
+    _add_replenishment(agg, forecast_df, latest, period_days)
+    return agg, latest
+
+
+def _add_replenishment(agg: pd.DataFrame, forecast_df: pd.DataFrame, latest: pd.DataFrame,
+                       period_days: int = 1):
+    """
+    Safety stock and reorder quantity per SKU from the quantile forecast.
+
+    Over the periods ending after each SKU's latest upload row, expected
+    demand is the summed P50. Safety stock is the root-sum-square of the
+    per-period P90 - P50 gaps, treating periods as independent, so the demand plus safety stock
+    covers about 90% of outcomes. Reorder quantity tops inventory up to that
+    level. Forecasts without quantiles fall back to the point forecast, which
+    gives zero safety stock.
+    """
+    median = forecast_df[QUANTILE_MEDIAN] if QUANTILE_MEDIAN in forecast_df else forecast_df['prediction']
+    upper = forecast_df[QUANTILE_UPPER] if QUANTILE_UPPER in forecast_df else median
+
+    sku_index = pd.Index(latest.index.astype(str))
+    codes = sku_index.get_indexer(forecast_df['sku'].astype(str))
+    as_of = latest['date'].to_numpy()[codes]
+    period_end = forecast_df['date'] + pd.Timedelta(days=period_days - 1)
+    future = (codes >= 0) & (period_end.to_numpy() > as_of)
+
+    median = median.to_numpy(dtype='float64')
+    gap = np.clip(upper.to_numpy(dtype='float64') - median, 0, None)
+    horizon = pd.DataFrame({
+        "demand": np.where(future, median, 0.0),
+        "variance": np.where(future, gap ** 2, 0.0),
+    }).groupby(forecast_df['sku'].astype(str).to_numpy()).sum()
+
+    keys = agg.index.astype(str)
+    demand = horizon['demand'].reindex(keys).to_numpy()
+    safety = np.sqrt(horizon['variance'].reindex(keys).to_numpy())
+    inventory = latest['inventory'].set_axis(sku_index).reindex(keys).to_numpy(dtype='float64')
+
+    agg["horizon_demand"] = demand.round(2)
+    agg["safety_stock"] = np.ceil(safety)
+    # SKUs missing from the upload have no inventory to compare against
+    agg["reorder_quantity"] = np.nan_to_num(np.ceil(np.clip(demand + safety - inventory, 0, None)))
+
+
+def generate_alerts(original_df: pd.DataFrame, forecast_df: pd.DataFrame, period_days: int = 1):
+    """
+    One alert block per forecast SKU. ``period_days`` is the forecast's row
+    length; rules see it as ``period_days`` so demand thresholds can scale
+    from daily to weekly forecasts.
+    """
     alerts = []
 
     # ✅ Validate necessary columns in both dataframes
@@ -18,99 +118,87 @@ def generate_alerts(original_df: pd.DataFrame, forecast_df: pd.DataFrame):
     if not required_original_cols.issubset(original_df.columns):
         raise ValueError(f"Original DataFrame missing required columns: {required_original_cols - set(original_df.columns)}")
 
-    # ✅ Preprocess forecast_df
-    forecast_df = forecast_df.copy()
-    forecast_df['date'] = pd.to_datetime(forecast_df['date'])
-
-    # Add holiday context
-    forecast_df['is_holiday'] = forecast_df['date'].apply(lambda x: int(x in india_holidays))
-    forecast_df['holiday_name'] = forecast_df['date'].apply(lambda x: india_holidays.get(x) if x in india_holidays else None)
-
-    grouped = forecast_df.groupby('sku')
-
-    for sku, group in grouped:
+    if forecast_df.empty:
+        return alerts
+
+    with stage("alerts.aggregate"):
+        agg, latest = _sku_aggregates(original_df, forecast_df, period_days)
+
+    # ✅ Evaluate every configured rule for all SKUs at once
+    with stage("alerts.rules"):
+        rule_set = get_rules()
+        columns = {name: agg[name].to_numpy() for name in
+                   ("avg_prediction", "max_prediction", "min_prediction", "has_holiday",
+                    "has_holiday_names", "all_zero", "non_increasing",
+                    "horizon_demand", "safety_stock", "reorder_quantity")}
+        columns["has_holiday"] = columns["has_holiday"].astype(bool)
+        columns["inventory"] = latest["inventory"].reindex(agg.index).to_numpy(dtype="float64")
+        columns["sales"] = latest["sales"].reindex(agg.index).to_numpy(dtype="float64")
+        columns["period_days"] = np.full(len(agg), period_days)
+        evaluated = rule_set.evaluate(columns, len(agg))
+
+    latest_inventory = latest["inventory"].to_dict()
+    latest_sales = latest["sales"].to_dict()
+    first_days = agg["first_date"].dt.strftime('%Y-%m-%d')
+    last_days = agg["last_date"].dt.strftime('%Y-%m-%d')
+    max_days = agg["max_predicted_day"].dt.strftime('%Y-%m-%d')
+    horizon_demand = agg["horizon_demand"].tolist()
+    safety_stock = agg["safety_stock"].tolist()
+    reorder_quantity = agg["reorder_quantity"].tolist()
+
+    # Per SKU: the indices of the rules that fired, in rule-file order
+    fired = np.column_stack([mask for _, mask, _ in evaluated]) if evaluated else np.zeros((len(agg), 0), bool)
+    fired_rules = [np.flatnonzero(row).tolist() for row in fired]
+
+    # ✅ Emit alert dicts (one cheap Python step per SKU)
+    for i, (sku, avg_prediction, product_name, holidays_in_window, first_day, last_day, max_day) in enumerate(zip(
+        agg.index.tolist(),
+        agg["avg_prediction"].tolist(),
+        agg["product_name"].tolist(),
+        agg["holidays_in_window"].tolist(),
+        first_days.tolist(),
+        last_days.tolist(),
+        max_days.tolist(),
+    )):
         sku_alerts = []
-        group_sorted = group.sort_values(by='date')
-
-        predictions = group_sorted['prediction'].tolist()
-        dates = group_sorted['date'].dt.strftime('%Y-%m-%d').tolist()
-        avg_prediction = sum(predictions) / len(predictions) if predictions else 0
-        max_pred_day = dates[predictions.index(max(predictions))] if predictions else "N/A"
-        forecast_window = f"{dates[0]} to {dates[-1]}" if dates else "N/A"
-
-        holidays_in_window = group_sorted[group_sorted["is_holiday"] == 1]["holiday_name"].dropna().unique().tolist()
-        holiday_context = f"(Holiday: {', '.join(holidays_in_window)})" if holidays_in_window else ""
-
-        # 🆕 Get product_name (defensive fetch)
-        product_name = "N/A"
-        if "product_name" in group_sorted.columns:
-            non_null_names = group_sorted["product_name"].dropna().unique()
-            if len(non_null_names) > 0:
-                product_name = non_null_names[0]
-
-        # 🟠 Replenishment Alert
-        if avg_prediction < 3 and not any(group_sorted['is_holiday']):
-            sku_alerts.append({
-                "type": "Replenishment Required",
-                "severity": "High",
-                "message": f"Demand for {sku} is low {holiday_context}. Consider replenishing."
-            })
-
-        # 🔴 Zero Demand
-        if all(p == 0 for p in predictions) and not any(group_sorted['is_holiday']):
-            sku_alerts.append({
-                "type": "Zero Demand",
-                "severity": "Critical",
-                "message": f"No demand predicted for {sku} {holiday_context}. Investigate cause."
-            })
-
-        # 🟡 Slow-Moving Stock
-        elif all(p <= 2 for p in predictions) and not all(p == 0 for p in predictions):
-            sku_alerts.append({
-                "type": "Slow-Moving Stock",
-                "severity": "Low",
-                "message": f"{sku} is moving slowly {holiday_context}. Monitor performance."
-            })
-
-        # 🟣 Overstock Risk
-        if max(predictions) > 10:
-            severity = "Low" if holidays_in_window else "Medium"
-            sku_alerts.append({
-                "type": "Overstock Risk",
-                "severity": severity,
-                "message": f"{sku} has high predicted stock {holiday_context}—possible overstock."
-            })
-
-        # 🔻 Consistent Decline
-        if predictions == sorted(predictions, reverse=True) and len(set(predictions)) > 1:
-            sku_alerts.append({
-                "type": "Consistent Decline",
-                "severity": "Medium",
-                "message": f"{sku} shows a consistent decline in demand {holiday_context}."
-            })
-
-        # 🔁 Inventory vs Sales Delta Check
-        original_sku_df = original_df[(original_df["sku"] == sku)]
-        if not original_sku_df.empty:
-            original_sku_df['date'] = pd.to_datetime(original_sku_df['date'])
-            latest_row = original_sku_df.sort_values(by="date").iloc[-1]
-            inv = latest_row["inventory"]
-            sales = latest_row["sales"]
-
-            if inv > 1.5 * sales:
+        if fired_rules[i]:
+            has_holiday_names = isinstance(holidays_in_window, str)
+            fields = {
+                "sku": sku,
+                "product_name": product_name,
+                "holiday_context": f"(Holiday: {holidays_in_window})" if has_holiday_names else "",
+                "holidays_in_window": holidays_in_window if has_holiday_names else "",
+                "avg_prediction": avg_prediction,
+                "max_prediction": columns["max_prediction"][i],
+                "min_prediction": columns["min_prediction"][i],
+                "has_holiday": columns["has_holiday"][i],
+                "has_holiday_names": has_holiday_names,
+                "all_zero": columns["all_zero"][i],
+                "non_increasing": columns["non_increasing"][i],
+                "horizon_demand": horizon_demand[i],
+                "safety_stock": safety_stock[i],
+                "reorder_quantity": reorder_quantity[i],
+                "inventory": latest_inventory.get(sku),
+                "sales": latest_sales.get(sku),
+                "period_days": period_days,
+            }
+            for j in fired_rules[i]:
+                rule, _, severities = evaluated[j]
                 sku_alerts.append({
-                    "type": "Stockpile Alert",
-                    "severity": "Medium",
-                    "message": f"Inventory ({inv}) significantly exceeds recent sales ({sales}). Risk of overstock."
+                    "type": rule.type,
+                    "severity": severities[i] if severities is not None else rule.severity,
+                    "message": rule.message.format(**fields)
                 })
 
-        # Append all alerts with product_name now included
         alerts.append({
             "sku": sku,
-            "product_name": product_name,
-            "forecast_window": forecast_window,
+            "product_name": product_name if pd.notna(product_name) else "N/A",
+            "forecast_window": f"{first_day} to {last_day}",
             "avg_prediction": round(avg_prediction, 2),
-            "max_predicted_day": max_pred_day,
+            "max_predicted_day": max_day,
+            "horizon_demand": horizon_demand[i],
+            "safety_stock": safety_stock[i],
+            "reorder_quantity": reorder_quantity[i],
             "alerts": sku_alerts
         })
 
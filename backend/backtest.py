@@ -0,0 +1,289 @@
+"""
+Rolling-origin backtest: how accurate is each forecasting backend, and what
+does it cost to fit?
+
+    python backtest.py inventory_data.csv
+    python backtest.py inventory_data.csv --backends prophet smoothing auto --folds 4 --horizon 7
+    python backtest.py sales.parquet --freq W --horizon 4 --output backtest.json --per-sku skus.csv
+
+For each backend, every SKU is forecast from ``--folds`` origins spaced
+``--step`` periods apart, each time from the history up to that origin only,
+and the next ``--horizon`` periods are scored against the actual sales.
+Reported per SKU and per backend: MAPE (over periods with sales), WAPE, bias
+(signed, relative to actual demand) and fit time.
+
+Fits run in the forecast process pool (``--workers``). Work is shared where
+windows overlap: each origin is fitted once for the whole horizon and scored
+on every target period in it, Prophet fits are warm-started from the previous
+origin's parameters, and identical training windows (e.g. ``prophet`` and the
+Prophet SKUs of ``auto``, or a rerun) are served by the model cache.
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import BACKTEST_BACKENDS, BACKTEST_FOLDS
+
+# -------------------------------
+# Data Loading
+# -------------------------------
+def load_upload(path: str) -> pd.DataFrame:
+    """Read an ``inventory_data.csv``-shaped CSV, Parquet or Arrow file."""
+    from columnar import COLUMNAR_FORMATS, read_columnar, sniff_format
+    from utils import parse_csv
+
+    upload_format = sniff_format(path)
+    if upload_format in COLUMNAR_FORMATS:
+        return read_columnar(path, upload_format)
+    return parse_csv(path)
+
+
+def period_actuals(df: pd.DataFrame, period_days: int) -> pd.DataFrame:
+    """
+    Actual sales per SKU and period (``sku``, ``date`` = period start,
+    ``actual``). Periods with missing days, such as a trailing partial week,
+    are dropped so they aren't scored against a full period's forecast.
+    """
+    from forecasters import period_start
+
+    days = pd.to_datetime(df["date"]).to_numpy()
+    frame = pd.DataFrame({
+        "sku": df["sku"].astype(str).to_numpy(),
+        "date": pd.DatetimeIndex(period_start(days, period_days)),
+        "actual": df["sales"].to_numpy(dtype="float64"),
+    })
+    grouped = frame.groupby(["sku", "date"], sort=False)["actual"]
+    actuals = grouped.sum().to_frame()
+    actuals["days"] = grouped.size()
+    return actuals[actuals["days"] == period_days].drop(columns="days").reset_index()
+
+
+def origins(df: pd.DataFrame, folds: int, horizon: int, step: int, period_days: int) -> list:
+    """
+    The last training day of each fold, oldest first. The newest fold's
+    horizon ends on the last complete period of the upload.
+    """
+    dates = pd.to_datetime(df["date"])
+    last = dates.max()
+    if period_days > 1:
+        # The day before the period that follows the last uploaded day starts
+        from forecasters import period_start
+        last = pd.Timestamp(period_start([last + pd.Timedelta(days=1)], period_days)[0]) - pd.Timedelta(days=1)
+
+    cutoffs = [last - pd.Timedelta(days=(horizon + (folds - 1 - k) * step) * period_days) for k in range(folds)]
+    # Keep folds with at least two training periods
+    earliest = dates.min() + pd.Timedelta(days=2 * period_days - 1)
+    return [cutoff for cutoff in cutoffs if cutoff >= earliest]
+
+# -------------------------------
+# Backtest
+# -------------------------------
+def _score_fold(forecast_df: pd.DataFrame, actuals: pd.DataFrame, cutoff, horizon: int,
+                period_days: int) -> pd.DataFrame:
+    """Forecast rows inside the fold's horizon, joined with their actuals."""
+    dates = pd.to_datetime(forecast_df["date"])
+    ahead = (dates - cutoff).dt.days
+    in_horizon = (ahead >= 1) & (ahead <= horizon * period_days)
+    rows = pd.DataFrame({
+        "sku": forecast_df["sku"].astype(str).to_numpy()[in_horizon],
+        "date": dates[in_horizon].to_numpy(),
+        "step": ((ahead[in_horizon] - 1) // period_days + 1).to_numpy(),
+        "prediction": forecast_df["prediction"].to_numpy(dtype="float64")[in_horizon],
+    })
+    return rows.merge(actuals, on=["sku", "date"], how="inner")
+
+
+def run_backtest(df: pd.DataFrame, backends: list, folds: int = BACKTEST_FOLDS, horizon: int = None,
+                 step: int = None, freq: str = None, workers: int = None):
+    """
+    Return ``(scored_rows, fits, runs, params)``: one row per (backend, fold,
+    SKU, target period) with its prediction and actual, one row per (backend,
+    fold, SKU) fit with the model used and its fit seconds, one record per
+    backend with wall time and failure count, and the resolved fold settings.
+    """
+    from model import forecast_demand, resolve_frequency
+
+    freq, period_days, horizon = resolve_frequency(freq, horizon)
+    step = step or horizon
+    cutoffs = origins(df, folds, horizon, step, period_days)
+    if not cutoffs:
+        raise ValueError("Not enough history for a single backtest fold; lower --folds, --horizon or --step.")
+
+    actuals = period_actuals(df, period_days)
+    dates = pd.to_datetime(df["date"])
+    scored, fits, runs = [], [], []
+
+    for backend in backends:
+        started = time.perf_counter()
+        failed = 0
+        warm_start = {}
+        for fold, cutoff in enumerate(cutoffs):
+            train = df[dates <= cutoff].copy()
+            forecast_df = forecast_demand(
+                train, max_workers=workers, backend=backend, horizon=horizon, freq=freq,
+                warm_start=warm_start, fit_stats=True,
+            )
+            # Next origin's Prophet fits start from these parameters
+            warm_start = {sku: params for sku, params in forecast_df.attrs["fit_params"].items() if params}
+            failed += len(forecast_df.attrs["errors"])
+
+            rows = _score_fold(forecast_df, actuals, cutoff, horizon, period_days)
+            rows.insert(0, "fold", fold)
+            rows.insert(0, "backend", backend)
+            scored.append(rows)
+
+            stats = forecast_df.attrs["fit_stats"]
+            fits.append(pd.DataFrame({
+                "backend": backend,
+                "fold": fold,
+                "sku": [str(sku) for sku in stats],
+                "model": [stat["backend"] for stat in stats.values()],
+                "fit_seconds": [stat["fit_seconds"] for stat in stats.values()],
+                "cached": [stat["cached"] for stat in stats.values()],
+            }))
+        wall_seconds = round(time.perf_counter() - started, 3)
+        runs.append({"backend": backend, "wall_seconds": wall_seconds, "failed_fits": failed})
+        print(f"🧪 Backtested '{backend}' over {len(cutoffs)} folds in {wall_seconds}s", file=sys.stderr)
+
+    params = {
+        "freq": freq, "horizon": horizon, "step": step, "folds": len(cutoffs),
+        "origins": [cutoff.strftime("%Y-%m-%d") for cutoff in cutoffs],
+    }
+    return pd.concat(scored, ignore_index=True), pd.concat(fits, ignore_index=True), runs, params
+
+# -------------------------------
+# Accuracy Metrics
+# -------------------------------
+def accuracy(rows: pd.DataFrame, by: list) -> pd.DataFrame:
+    """
+    MAPE (%, over periods with non-zero actuals), WAPE (%) and bias (% of
+    actual demand; positive means over-forecasting) grouped by ``by``.
+    """
+    error = rows["prediction"] - rows["actual"]
+    nonzero = rows["actual"] != 0
+    frame = pd.DataFrame({
+        **{column: rows[column] for column in by},
+        "error": error,
+        "abs_error": error.abs(),
+        "actual": rows["actual"],
+        "ape": (error.abs() / rows["actual"].abs()).where(nonzero),
+    })
+    grouped = frame.groupby(by, sort=False)
+    totals = grouped[["error", "abs_error", "actual"]].sum()
+    result = pd.DataFrame({"periods": grouped.size(), "mape": grouped["ape"].mean() * 100})
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result["wape"] = totals["abs_error"] / totals["actual"].abs() * 100
+        result["bias"] = totals["error"] / totals["actual"].abs() * 100
+    return result.replace([np.inf, -np.inf], np.nan).round(2)
+
+
+def summarize(rows: pd.DataFrame, fits: pd.DataFrame, runs: list):
+    """Per-backend summary records and the per-SKU table."""
+    per_sku = accuracy(rows, ["backend", "sku"])
+    sku_fits = fits.groupby(["backend", "sku"], sort=False).agg(
+        fit_seconds=("fit_seconds", "sum"),
+        fits=("fit_seconds", "size"),
+        model=("model", lambda models: "/".join(sorted(set(models)))),
+    )
+    per_sku = per_sku.join(sku_fits, how="outer").reset_index()
+    per_sku["fit_seconds"] = per_sku["fit_seconds"].round(4)
+
+    overall = accuracy(rows, ["backend"])
+    summary = []
+    for run in runs:
+        backend = run["backend"]
+        backend_fits = fits[fits["backend"] == backend]
+        metrics = overall.loc[backend] if backend in overall.index else pd.Series(dtype="float64")
+        summary.append({
+            "backend": backend,
+            "skus": int(backend_fits["sku"].nunique()),
+            "periods": int(metrics.get("periods", 0)),
+            "mape": metrics.get("mape"),
+            "wape": metrics.get("wape"),
+            "bias": metrics.get("bias"),
+            "fit_seconds": round(float(backend_fits["fit_seconds"].sum()), 3),
+            "fit_seconds_per_fit": round(float(backend_fits["fit_seconds"].mean()), 4) if len(backend_fits) else None,
+            "cached_fits": int(backend_fits["cached"].sum()),
+            "models": backend_fits["model"].value_counts().to_dict(),
+            **{key: value for key, value in run.items() if key != "backend"},
+        })
+    return summary, per_sku
+
+
+TABLE_COLUMNS = [
+    ("skus", "skus"), ("mape", "MAPE%"), ("wape", "WAPE%"), ("bias", "bias%"),
+    ("fit_seconds", "fit s"), ("fit_seconds_per_fit", "s/fit"), ("wall_seconds", "wall s"),
+]
+
+
+def _table(summary: list) -> str:
+    """The per-backend summary as a small text table."""
+    lines = [f"{'backend':<10}" + "".join(f"{title:>10}" for _, title in TABLE_COLUMNS)]
+    for row in summary:
+        cells = ["-" if _json_safe(row[key]) is None else row[key] for key, _ in TABLE_COLUMNS]
+        lines.append(f"{row['backend']:<10}" + "".join(f"{cell:>10}" for cell in cells))
+    return "\n".join(lines)
+
+
+def _json_safe(value):
+    if isinstance(value, float) and not np.isfinite(value):
+        return None
+    if isinstance(value, (np.integer, np.floating)):
+        return _json_safe(value.item())
+    return value
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rolling-origin accuracy and fit-cost backtest per backend.")
+    parser.add_argument("path", help="CSV, Parquet or Arrow file shaped like inventory_data.csv")
+    parser.add_argument("--backends", nargs="+", default=BACKTEST_BACKENDS,
+                        help="backends/policies to compare: prophet, smoothing, sklearn, global, auto")
+    parser.add_argument("--folds", type=int, default=BACKTEST_FOLDS, help="forecast origins per backend")
+    parser.add_argument("--horizon", type=int, help="periods scored after each origin")
+    parser.add_argument("--step", type=int, help="periods between origins (default: the horizon)")
+    parser.add_argument("--freq", choices=["D", "W"], help="daily or weekly forecasts")
+    parser.add_argument("--workers", type=int, help="forecast worker processes")
+    parser.add_argument("--no-model-cache", action="store_true", help="refit instead of reusing cached Prophet fits")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's per-SKU INFO logs")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--per-sku", help="also write the per-SKU table as CSV")
+    args = parser.parse_args(argv)
+
+    if args.no_model_cache:
+        # Read by config at import time, so set before the model is imported.
+        os.environ["MODEL_CACHE_ENABLED"] = "0"
+    if not args.verbose:
+        # Pipeline modules configure INFO logging when they are imported
+        logging.disable(logging.INFO)
+
+    df = load_upload(args.path)
+    rows, fits, runs, params = run_backtest(
+        df, args.backends, args.folds, args.horizon, args.step, args.freq, args.workers)
+    summary, per_sku = summarize(rows, fits, runs)
+
+    results = {
+        "params": {"path": args.path, "backends": args.backends, **params},
+        "summary": [{key: _json_safe(value) for key, value in row.items()} for row in summary],
+        "skus": [{key: _json_safe(value) for key, value in record.items()}
+                 for record in per_sku.to_dict(orient="records")],
+    }
+    text = json.dumps(results, indent=2, default=str)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+    if args.per_sku:
+        per_sku.to_csv(args.per_sku, index=False)
+
+    print(_table(summary), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
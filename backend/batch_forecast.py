@@ -0,0 +1,348 @@
+"""
+Offline batch forecasting: forecast a whole catalog without the API server,
+checkpointing finished SKUs so an interrupted run picks up where it stopped.
+
+    python batch_forecast.py data/ --output nightly/
+    python batch_forecast.py "exports/inventory_*.csv" stores.parquet --freq W --horizon 8
+    python batch_forecast.py data/ --output nightly/ --restart
+
+Inputs are ``inventory_data.csv``-shaped CSV, Parquet or Arrow files, given as
+files, directories or glob patterns; each file is forecast on its own. SKUs
+are fitted in the forecast process pool (``--workers``) and, every
+``--checkpoint-skus`` finished SKUs (or ``--checkpoint-seconds``), written out
+as one Parquet part per table:
+
+    nightly/forecast/part-00000.parquet   forecast rows merged with actuals
+    nightly/alerts/part-00000.parquet     one row per alert
+    nightly/waste/part-00000.parquet      projected waste per SKU
+    nightly/manifest.json                 parts, finished and failed SKUs per input
+
+The manifest is replaced atomically after each part is written, so it only
+ever lists complete parts. Rerunning the same command skips finished inputs
+and SKUs; parts left behind by a crash before their manifest update are
+deleted. An input whose file changed since the last run is redone.
+"""
+import argparse
+import glob
+import json
+import logging
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import BATCH_CHECKPOINT_SECONDS, BATCH_CHECKPOINT_SKUS, BATCH_OUTPUT_DIR
+
+MANIFEST_VERSION = 2  # 2: parts written with the fixed schemas of part_schemas()
+TABLES = ("forecast", "alerts", "waste")
+INPUT_SUFFIXES = (".csv", ".parquet", ".arrow", ".feather", ".ipc")
+ALERT_COLUMNS = ["sku", "product_name", "forecast_window", "type", "severity", "message"]
+
+# -------------------------------
+# Inputs
+# -------------------------------
+def expand_inputs(patterns: list) -> list:
+    """Files named by ``patterns`` (files, directories or globs), sorted and de-duplicated."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, name) for name in os.listdir(pattern)
+                       if name.lower().endswith(INPUT_SUFFIXES)]
+        else:
+            matches = glob.glob(pattern) or ([pattern] if os.path.exists(pattern) else [])
+        if not matches:
+            raise FileNotFoundError(f"No input files match '{pattern}'")
+        paths.extend(os.path.abspath(path) for path in matches if os.path.isfile(path))
+    return sorted(set(paths))
+
+
+def _file_version(path: str) -> list:
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+# -------------------------------
+# Part Schemas
+# -------------------------------
+def part_schemas() -> dict:
+    """
+    One fixed Arrow schema per table. Parts with no rows would otherwise get
+    null-typed columns that can't be read back together with the other parts.
+    """
+    from forecasters import QUANTILE_COLUMNS
+
+    text = pa.large_string()
+    return {
+        "forecast": pa.schema(
+            [("date", pa.timestamp("ns")), ("prediction", pa.float64()), ("sku", text)]
+            + [(name, pa.float32()) for name in QUANTILE_COLUMNS]
+            + [("max_predicted_day", pa.timestamp("ns")), ("product_name", text),
+               ("sales", pa.float64()), ("inventory", pa.float64())]),
+        "alerts": pa.schema([(name, text) for name in ALERT_COLUMNS]),
+        "waste": pa.schema([
+            ("sku", text), ("product_name", text), ("inventory", pa.float64()), ("expiry_date", text),
+            ("days_to_expiry", pa.int64()), ("demand_before_expiry", pa.float64()),
+            ("projected_waste", pa.float64()), ("waste_fraction", pa.float64()),
+        ]),
+    }
+
+# -------------------------------
+# Manifest / Checkpoints
+# -------------------------------
+class Checkpoint:
+    """
+    The output directory and its manifest: which parts exist and, per input
+    file, which SKUs are finished or failed and whether it is complete.
+    """
+
+    def __init__(self, output_dir: str, params: dict, restart: bool = False):
+        self.output_dir = output_dir
+        self.path = os.path.join(output_dir, "manifest.json")
+        self.schemas = part_schemas()
+        for table in TABLES:
+            os.makedirs(os.path.join(output_dir, table), exist_ok=True)
+
+        manifest = None
+        if not restart and os.path.exists(self.path):
+            with open(self.path) as f:
+                manifest = json.load(f)
+            if manifest.get("version") != MANIFEST_VERSION or manifest.get("params") != params:
+                raise ValueError(
+                    f"{output_dir} holds a run with different settings ({manifest.get('params')}); "
+                    "use --restart to discard it or pick another --output.")
+        self.manifest = manifest or {"version": MANIFEST_VERSION, "params": params,
+                                     "next_part": 0, "parts": [], "inputs": {}}
+        self._remove_unlisted_parts()
+        if manifest is None:
+            self.save()
+
+    def _remove_unlisted_parts(self):
+        listed = {part["name"] for part in self.manifest["parts"]}
+        for table in TABLES:
+            directory = os.path.join(self.output_dir, table)
+            for name in os.listdir(directory):
+                if os.path.splitext(name)[0] not in listed:
+                    os.remove(os.path.join(directory, name))
+
+    def save(self):
+        """Replace the manifest atomically."""
+        fd, tmp = tempfile.mkstemp(dir=self.output_dir, suffix=".tmp")
+        with os.fdopen(fd, "w") as f:
+            json.dump(self.manifest, f, indent=1)
+        os.replace(tmp, self.path)
+
+    def input_state(self, path: str) -> dict:
+        """
+        Progress for one input file. Progress recorded against an older
+        version of the file is dropped, together with its parts.
+        """
+        version = _file_version(path)
+        state = self.manifest["inputs"].get(path)
+        if state is not None and state["version"] != version:
+            print(f"♻️ {path} changed since the last run; forecasting it again", file=sys.stderr)
+            self.drop_input(path)
+            state = None
+        if state is None:
+            state = {"version": version, "complete": False, "skus": [], "failed": {}}
+            self.manifest["inputs"][path] = state
+        return state
+
+    def drop_input(self, path: str):
+        """Forget an input's progress and delete its parts."""
+        keep = []
+        for part in self.manifest["parts"]:
+            if part["input"] != path:
+                keep.append(part)
+                continue
+            for table in TABLES:
+                part_path = os.path.join(self.output_dir, table, part["name"] + ".parquet")
+                if os.path.exists(part_path):
+                    os.remove(part_path)
+        self.manifest["parts"] = keep
+        self.manifest["inputs"].pop(path, None)
+        self.save()
+
+    def write_part(self, path: str, tables: dict, skus: list, errors: list):
+        """Write one part per table, then record it and its SKUs in the manifest."""
+        name = f"part-{self.manifest['next_part']:05d}"
+        for table, frame in tables.items():
+            target = os.path.join(self.output_dir, table, name + ".parquet")
+            arrow_table = pa.Table.from_pandas(frame, schema=self.schemas[table], preserve_index=False)
+            pq.write_table(arrow_table, target + ".tmp")
+            os.replace(target + ".tmp", target)
+
+        state = self.manifest["inputs"][path]
+        state["skus"].extend(skus)
+        for error in errors:
+            state["failed"][str(error.get("sku"))] = error
+        self.manifest["parts"].append({
+            "name": name, "input": path, "skus": len(skus), "rows": len(tables["forecast"]),
+        })
+        self.manifest["next_part"] += 1
+        self.save()
+
+    def finish_input(self, path: str, errors: list):
+        state = self.manifest["inputs"][path]
+        for error in errors:
+            state["failed"][str(error.get("sku"))] = error
+        state["complete"] = True
+        self.save()
+
+# -------------------------------
+# Forecast → Parts
+# -------------------------------
+def _alert_rows(alerts: list) -> pd.DataFrame:
+    """One row per fired alert, with its SKU block's identifying fields."""
+    rows = [
+        {"sku": str(block["sku"]), "product_name": block["product_name"],
+         "forecast_window": block["forecast_window"], **alert}
+        for block in alerts for alert in block["alerts"]
+    ]
+    return pd.DataFrame(rows, columns=ALERT_COLUMNS)
+
+
+def _part_tables(batch: list, originals: dict, period_days: int, horizon_days: int) -> dict:
+    """Forecast, alert and waste tables for a batch of finished ``(sku, forecast)`` pairs."""
+    from pipeline import _assemble, sanitize_json
+    from utils import concat_partitions
+
+    df = concat_partitions([originals.pop(sku) for sku, _ in batch])
+    forecast_df = pd.concat([frame for _, frame in batch], ignore_index=True)
+    merged, alerts, waste = _assemble(df, forecast_df, period_days, horizon_days)
+    merged["sku"] = merged["sku"].astype(str)
+    # Ranks only make sense across the whole catalog, not within one part
+    return {"forecast": merged, "alerts": _alert_rows(sanitize_json(alerts)), "waste": waste.drop(columns="rank")}
+
+
+def forecast_input(path: str, checkpoint: Checkpoint, horizon: int = None, freq: str = None,
+                   workers: int = None, checkpoint_skus: int = BATCH_CHECKPOINT_SKUS,
+                   checkpoint_seconds: float = BATCH_CHECKPOINT_SECONDS, retry_failed: bool = False) -> dict:
+    """
+    Forecast one input file's unfinished SKUs, writing a part every
+    ``checkpoint_skus`` SKUs or ``checkpoint_seconds``. Returns a summary.
+    """
+    from config import FORECAST_MODE
+    from hierarchy import HIERARCHICAL
+    from model import iter_forecasts, resolve_frequency
+    from utils import iter_partitions
+
+    freq, period_days, horizon = resolve_frequency(freq, horizon)
+    state = checkpoint.input_state(path)
+    if state["complete"] and not (retry_failed and state["failed"]):
+        return {"input": path, "skipped": True, "skus": 0, "failed": len(state["failed"])}
+    if FORECAST_MODE == HIERARCHICAL and state["skus"]:
+        # Reconciliation needs the whole upload, so a partial input starts over
+        checkpoint.drop_input(path)
+        state = checkpoint.input_state(path)
+
+    done = set(state["skus"])
+    if not retry_failed:
+        done.update(state["failed"])
+    state["complete"] = False
+    for sku in list(state["failed"]):
+        if sku not in done:
+            del state["failed"][sku]
+
+    originals = {}
+    started = time.perf_counter()
+    written = 0
+
+    def pending():
+        for sku, part in iter_partitions(path):
+            if str(sku) not in done:
+                originals[sku] = part
+                yield sku, part
+
+    def flush(batch: list, errors: list):
+        nonlocal written
+        tables = _part_tables(batch, originals, period_days, horizon * period_days)
+        checkpoint.write_part(path, tables, [str(sku) for sku, _ in batch], errors)
+        written += len(batch)
+        print(f"💾 {os.path.basename(path)}: {written} SKUs checkpointed "
+              f"({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+    if FORECAST_MODE == HIERARCHICAL:
+        from hierarchy import forecast_hierarchical
+        from utils import concat_partitions
+
+        forecast_df = forecast_hierarchical(concat_partitions([part for _, part in pending()]),
+                                            horizon=horizon, freq=freq)
+        errors = forecast_df.attrs.get("errors", [])
+        finished = iter(forecast_df.groupby("sku", sort=False))
+    else:
+        errors = []
+        finished = iter_forecasts(pending(), max_workers=workers, errors=errors, horizon=horizon, freq=freq)
+
+    # Each part records the failures reported since the previous one
+    recorded = 0
+    batch = []
+    last_flush = time.monotonic()
+    for sku, forecast in finished:
+        batch.append((sku, forecast))
+        if len(batch) >= checkpoint_skus or time.monotonic() - last_flush >= checkpoint_seconds:
+            flush(batch, errors[recorded:])
+            recorded = len(errors)
+            batch = []
+            last_flush = time.monotonic()
+    if batch:
+        flush(batch, errors[recorded:])
+        recorded = len(errors)
+
+    checkpoint.finish_input(path, errors[recorded:])
+    return {
+        "input": path, "skipped": False, "skus": written,
+        "failed": len(state["failed"]), "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Forecast a catalog offline with resumable, checkpointed output.")
+    parser.add_argument("inputs", nargs="+", help="CSV/Parquet/Arrow files, directories or glob patterns")
+    parser.add_argument("--output", default=BATCH_OUTPUT_DIR, help="output directory (parts + manifest.json)")
+    parser.add_argument("--horizon", type=int, help="periods to forecast")
+    parser.add_argument("--freq", choices=["D", "W"], help="daily or weekly forecasts")
+    parser.add_argument("--workers", type=int, help="forecast worker processes")
+    parser.add_argument("--checkpoint-skus", type=int, default=BATCH_CHECKPOINT_SKUS,
+                        help="finished SKUs per checkpointed part")
+    parser.add_argument("--checkpoint-seconds", type=float, default=BATCH_CHECKPOINT_SECONDS,
+                        help="checkpoint at least this often")
+    parser.add_argument("--retry-failed", action="store_true", help="forecast SKUs that failed last time again")
+    parser.add_argument("--restart", action="store_true", help="discard earlier progress in --output")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's per-SKU INFO logs")
+    args = parser.parse_args(argv)
+
+    if not args.verbose:
+        # Pipeline modules configure INFO logging when they are imported
+        logging.disable(logging.INFO)
+
+    from config import FORECAST_BACKEND, FORECAST_MODE
+    from model import resolve_frequency
+
+    freq, _, horizon = resolve_frequency(args.freq, args.horizon)
+    params = {"freq": freq, "horizon": horizon, "backend": FORECAST_BACKEND, "mode": FORECAST_MODE}
+    paths = expand_inputs(args.inputs)
+    checkpoint = Checkpoint(args.output, params, restart=args.restart)
+
+    started = time.perf_counter()
+    summaries = []
+    for path in paths:
+        summary = forecast_input(path, checkpoint, horizon, freq, args.workers,
+                                 args.checkpoint_skus, args.checkpoint_seconds, args.retry_failed)
+        summaries.append(summary)
+        status = "already done" if summary["skipped"] else f"{summary['skus']} SKUs in {summary['seconds']}s"
+        print(f"📦 {path}: {status}, {summary['failed']} failed", file=sys.stderr)
+
+    print(json.dumps({
+        "output": os.path.abspath(args.output),
+        "params": params,
+        "inputs": summaries,
+        "parts": len(checkpoint.manifest["parts"]),
+        "seconds": round(time.perf_counter() - started, 3),
+    }, indent=2))
+
+
+if __name__ == "__main__":
+    main()
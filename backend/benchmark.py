@@ -0,0 +1,194 @@
+"""
+Benchmark the /predict pipeline stage by stage on synthetic data.
+
+    python benchmark.py --skus 1000 --days 60 --output results.json
+    python benchmark.py --skus 1000 --days 60 --compare results.json
+
+By default forecasting uses the ``stub`` backend (a naive last-value model),
+so the non-model stages can be measured quickly and offline; pass
+``--backend auto`` or ``--backend prophet`` to include real fits.
+"""
+import argparse
+import io
+import json
+import logging
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+from datetime import datetime, timezone
+
+import numpy as np
+import pandas as pd
+
+# -------------------------------
+# Synthetic Data
+# -------------------------------
+def generate_csv(skus: int, days: int, seed: int = 0) -> bytes:
+    """
+    An upload shaped like ``inventory_data.csv`` (DD-MM-YYYY dates, rows
+    grouped by SKU) with ``skus`` × ``days`` rows.
+    """
+    rng = np.random.default_rng(seed)
+    dates = pd.date_range("2025-01-01", periods=days, freq="D")
+    sku_ids = np.arange(101, 101 + skus)
+
+    base = rng.gamma(2.0, 5.0, skus)
+    weekly = 1 + 0.3 * np.sin(2 * np.pi * dates.dayofweek.to_numpy() / 7)
+    sales = rng.poisson(np.outer(base, weekly)).ravel()
+    inventory = np.maximum(sales + rng.integers(-5, 40, sales.size), 0)
+    shelf_life = np.repeat(rng.integers(3, 30, skus), days)
+
+    df = pd.DataFrame({
+        "date": np.tile(dates, skus),
+        "sku": np.repeat([f"SKU{i}" for i in sku_ids], days),
+        "product_name": np.repeat([f"Product {i}" for i in sku_ids], days),
+        "inventory": inventory,
+        "sales": sales,
+    })
+    df["expiry_date"] = df["date"] + pd.to_timedelta(shelf_life, unit="D")
+    return df.to_csv(index=False, date_format="%d-%m-%Y").encode("utf-8")
+
+# -------------------------------
+# Stub Forecaster
+# -------------------------------
+def register_stub_backend():
+    """Add a ``stub`` backend that repeats each SKU's last value; no fitting."""
+    from forecasters import BACKENDS, Forecaster, SeriesBatch
+
+    class StubForecaster(Forecaster):
+        name = "stub"
+
+        def forecast(self, series: list, periods: int, period_days: int = 1) -> dict:
+            batch = SeriesBatch(series, period_days)
+            last = np.nan_to_num(batch.y[batch.ends - 1])
+            return batch.frames(np.nan_to_num(batch.y), np.repeat(last[:, None], periods, axis=1))
+
+    BACKENDS["stub"] = StubForecaster()
+
+# -------------------------------
+# Measurement
+# -------------------------------
+def _peak_rss_mb() -> float:
+    # ru_maxrss is KiB on Linux and bytes on macOS; forecast workers count
+    # as children.
+    scale = 1024 * 1024 if sys.platform == "darwin" else 1024
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return round(max(own, children) / scale, 1)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except Exception:
+        return None
+
+
+def run_benchmark(skus: int, days: int, backend: str, workers: int, seed: int = 0) -> dict:
+    from alerts import generate_alerts
+    from model import forecast_demand
+    from pipeline import annotate_forecast, merge_actuals, frame_records, sanitize_json
+    from utils import parse_csv
+
+    raw = generate_csv(skus, days, seed)
+    stages = {}
+    rss = {}
+
+    def timed(name, fn, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        stages[name] = round(time.perf_counter() - started, 4)
+        rss[name] = _peak_rss_mb()
+        return result
+
+    df = timed("parse", parse_csv, io.BytesIO(raw))
+    forecast_df = timed("forecast", forecast_demand, df, max_workers=workers, backend=backend)
+    annotated = timed("merge", annotate_forecast, df, forecast_df)
+    alerts = timed("alerts", generate_alerts, df, annotated)
+
+    def serialize():
+        response = {
+            "forecast": frame_records(merge_actuals(df, annotated)),
+            "alerts": sanitize_json(alerts),
+            "errors": forecast_df.attrs.get("errors", []),
+        }
+        return json.dumps(response)
+
+    body = timed("serialize", serialize)
+
+    return {
+        "commit": _git_commit(),
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "params": {"skus": skus, "days": days, "backend": backend, "workers": workers, "seed": seed},
+        "rows": len(df),
+        "csv_bytes": len(raw),
+        "response_bytes": len(body),
+        "stages": stages,
+        "total_seconds": round(sum(stages.values()), 4),
+        "peak_rss_mb": _peak_rss_mb(),
+        "peak_rss_mb_after_stage": rss,
+    }
+
+
+def compare(current: dict, baseline: dict) -> str:
+    """Per-stage timings against a previous run, as a small text table."""
+    lines = [f"{'stage':<10} {'baseline':>10} {'current':>10} {'change':>8}"]
+    names = list(current["stages"]) + ["total"]
+    for name in names:
+        if name == "total":
+            old, new = baseline.get("total_seconds"), current["total_seconds"]
+        else:
+            old, new = baseline.get("stages", {}).get(name), current["stages"][name]
+        change = f"{(new / old - 1) * 100:+.0f}%" if old else "n/a"
+        lines.append(f"{name:<10} {old if old is not None else '-':>10} {new:>10} {change:>8}")
+    lines.append(f"{'peak RSS':<10} {baseline.get('peak_rss_mb', '-'):>10} {current['peak_rss_mb']:>10}")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parse → forecast → merge → alerts → serialize.")
+    parser.add_argument("--skus", type=int, default=1000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--backend", default="stub",
+                        help="forecaster backend/policy: stub, auto, prophet, smoothing, sklearn or global")
+    parser.add_argument("--workers", type=int, default=1, help="forecast worker processes")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-model-cache", action="store_true",
+                        help="refit Prophet models instead of reusing cached fits")
+    parser.add_argument("--verbose", action="store_true", help="keep the pipeline's per-SKU INFO logs")
+    parser.add_argument("--output", help="write the JSON results here (default: stdout)")
+    parser.add_argument("--compare", help="a previous results file to compare against")
+    args = parser.parse_args(argv)
+
+    if args.no_model_cache:
+        # Read by config at import time, so set before the pipeline is imported.
+        os.environ["MODEL_CACHE_ENABLED"] = "0"
+    register_stub_backend()
+    if not args.verbose:
+        logging.getLogger().setLevel(logging.WARNING)
+
+    results = run_benchmark(args.skus, args.days, args.backend, args.workers, args.seed)
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.compare:
+        with open(args.compare) as f:
+            print(compare(results, json.load(f)), file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
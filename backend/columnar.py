@@ -0,0 +1,246 @@
+import json
+import logging
+
+import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
+
+from config import CSV_CHUNK_ROWS
+from utils import EMPTY_UPLOAD_MESSAGE, CSVSchemaError, finalize_frame, missing_columns, parse_dates
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Upload / response formats
+CSV = "csv"
+JSON = "json"
+NDJSON = "ndjson"
+PARQUET = "parquet"
+ARROW = "arrow"
+COLUMNAR_FORMATS = (PARQUET, ARROW)
+
+MEDIA_TYPES = {
+    JSON: "application/json",
+    NDJSON: "application/x-ndjson",
+    PARQUET: "application/vnd.apache.parquet",
+    ARROW: "application/vnd.apache.arrow.stream",
+}
+_ACCEPTED = {
+    **{media_type: fmt for fmt, media_type in MEDIA_TYPES.items()},
+    "application/x-parquet": PARQUET,
+    "application/vnd.apache.arrow.file": ARROW,
+}
+
+# Keys of the JSON side tables in a columnar result's schema metadata
+METADATA_KEYS = ("alerts", "waste", "errors")
+
+_PARQUET_MAGIC = b"PAR1"
+_ARROW_FILE_MAGIC = b"ARROW1"
+_ARROW_STREAM_MAGIC = b"\xff\xff\xff\xff"  # IPC continuation marker
+
+
+class UploadFormatError(ValueError):
+    """A Parquet/Arrow upload could not be read."""
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+# -------------------------------
+# Format Negotiation
+# -------------------------------
+def sniff_format(source) -> str:
+    """``parquet``, ``arrow`` or ``csv`` from the first bytes of ``source`` (rewound afterwards)."""
+    if isinstance(source, str):
+        with open(source, "rb") as fh:
+            head = fh.read(8)
+    else:
+        head = source.read(8)
+        _rewind(source)
+    if head.startswith(_PARQUET_MAGIC):
+        return PARQUET
+    if head.startswith(_ARROW_FILE_MAGIC) or head.startswith(_ARROW_STREAM_MAGIC):
+        return ARROW
+    return CSV
+
+
+def negotiate(accept: str, default: str = JSON) -> str:
+    """The first response format named in an ``Accept`` header, honouring q-values."""
+    ranked = []
+    for position, item in enumerate((accept or "").split(",")):
+        media_type, *params = [part.strip() for part in item.split(";")]
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media_type in _ACCEPTED and q > 0:
+            ranked.append((-q, position, _ACCEPTED[media_type]))
+    return min(ranked)[2] if ranked else default
+
+# -------------------------------
+# Columnar Uploads
+# -------------------------------
+def _ipc_reader(source):
+    """An Arrow IPC file or stream reader, whichever ``source`` holds."""
+    if isinstance(source, str):
+        source = pa.memory_map(source)
+    head = source.read(6)
+    _rewind(source)
+    return pa.ipc.open_file(source) if head == _ARROW_FILE_MAGIC else pa.ipc.open_stream(source)
+
+
+def _read_table(source, fmt: str) -> pa.Table:
+    if fmt == PARQUET:
+        return pq.read_table(source)
+    return _ipc_reader(source).read_all()
+
+
+def read_schema(source, fmt: str) -> list:
+    """Column names of a Parquet/Arrow upload without reading its data; rewinds ``source``."""
+    try:
+        if fmt == PARQUET:
+            return pq.read_schema(source).names
+        return _ipc_reader(source).schema.names
+    except pa.ArrowException as e:
+        raise UploadFormatError(f"Could not read {fmt} upload: {e}")
+    finally:
+        _rewind(source)
+
+
+def read_columnar(source, fmt: str) -> pd.DataFrame:
+    """
+    Read a Parquet or Arrow IPC upload into the same typed frame ``parse_csv``
+    returns. Columns arrive typed, so only ``date`` may need parsing (when it
+    was exported as text).
+    """
+    try:
+        table = _read_table(source, fmt)
+    except pa.ArrowException as e:
+        raise UploadFormatError(f"Could not read {fmt} upload: {e}")
+    missing = missing_columns(table.schema.names)
+    if missing:
+        raise CSVSchemaError(missing)
+
+    df = _typed_frame(table)
+    if df.empty:
+        raise CSVSchemaError(message=EMPTY_UPLOAD_MESSAGE)
+    logger.info(f"📦 Read {len(df)} rows from {fmt} upload")
+    return finalize_frame(df.reset_index(drop=True))
+
+
+def _typed_frame(data) -> pd.DataFrame:
+    """Rows with a SKU from a table or record batch, dates parsed, SKUs as text."""
+    df = data.to_pandas()
+    df = df[df["sku"].notna()]
+    if not pd.api.types.is_datetime64_any_dtype(df["date"]):
+        try:
+            df["date"] = parse_dates(df["date"])
+        except Exception as e:
+            logger.error(f"❌ Failed to parse 'date' column: {e}")
+            raise ValueError("Invalid date format in input data.")
+    df["sku"] = df["sku"].astype(str)
+    return df
+
+
+def _check_columns(path: str, fmt: str):
+    missing = missing_columns(read_schema(path, fmt))
+    if missing:
+        raise CSVSchemaError(missing)
+
+
+def _iter_batches(path: str, fmt: str, batch_rows: int, columns: list = None):
+    if fmt == PARQUET:
+        yield from pq.ParquetFile(path).iter_batches(batch_size=batch_rows, columns=columns)
+        return
+    reader = _ipc_reader(path)
+    if isinstance(reader, pa.ipc.RecordBatchFileReader):
+        batches = (reader.get_batch(i) for i in range(reader.num_record_batches))
+    else:
+        batches = reader
+    for batch in batches:
+        yield batch.select(columns) if columns else batch
+
+
+def iter_columnar_chunks(path: str, fmt: str, batch_rows: int = CSV_CHUNK_ROWS):
+    """
+    Read a Parquet or Arrow IPC file one record batch at a time, as the same
+    typed chunks ``utils.iter_csv_chunks`` yields. Arrow files keep the batch
+    sizes they were written with.
+    """
+    _check_columns(path, fmt)
+    try:
+        for batch in _iter_batches(path, fmt, batch_rows):
+            yield _typed_frame(batch)
+    except pa.ArrowException as e:
+        raise UploadFormatError(f"Could not read {fmt} upload: {e}")
+
+
+def iter_columnar_skus(path: str, fmt: str, batch_rows: int = CSV_CHUNK_ROWS):
+    """The ``sku`` column of a Parquet or Arrow IPC file, one array per record batch."""
+    _check_columns(path, fmt)
+    try:
+        for batch in _iter_batches(path, fmt, batch_rows, columns=["sku"]):
+            yield batch.column(0).cast(pa.string()).to_numpy(zero_copy_only=False)
+    except pa.ArrowException as e:
+        raise UploadFormatError(f"Could not read {fmt} upload: {e}")
+
+# -------------------------------
+# Columnar Results
+# -------------------------------
+def result_table(forecast_df: pd.DataFrame, **side_tables) -> pa.Table:
+    """
+    The forecast rows as an Arrow table, with each side table (alerts, waste,
+    errors) JSON-encoded into the schema metadata under its own key.
+    """
+    return with_side_tables(pa.Table.from_pandas(forecast_df, preserve_index=False), **side_tables)
+
+
+def with_side_tables(table: pa.Table, **side_tables) -> pa.Table:
+    """``table`` with each side table JSON-encoded into its schema metadata."""
+    metadata = dict(table.schema.metadata or {})
+    for key, value in side_tables.items():
+        metadata[key.encode()] = json.dumps(value, allow_nan=False, default=str).encode("utf-8")
+    return table.replace_schema_metadata(metadata)
+
+
+def encode_table(table: pa.Table, fmt: str) -> memoryview:
+    """
+    Serialize ``table`` as an Arrow IPC stream or a Parquet file. The view
+    wraps Arrow's own buffer, so responses are sent without another copy.
+    """
+    sink = pa.BufferOutputStream()
+    if fmt == PARQUET:
+        pq.write_table(table, sink)
+    else:
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+    return memoryview(sink.getvalue())
+
+
+def result_errors(data, fmt: str) -> list:
+    """The ``errors`` side table of an encoded result, read from its schema alone."""
+    buffer = pa.BufferReader(data)
+    if fmt == PARQUET:
+        schema = pq.read_schema(buffer)
+    else:
+        with pa.ipc.open_stream(buffer) as reader:
+            schema = reader.schema
+    return json.loads((schema.metadata or {}).get(b"errors", b"[]"))
+
+
+def read_result(source):
+    """Inverse of ``result_table``: ``(table, {key: side_table})`` from an Arrow IPC stream."""
+    if isinstance(source, str):
+        source = pa.memory_map(source)
+    with pa.ipc.open_stream(source) as reader:
+        table = reader.read_all()
+    metadata = table.schema.metadata or {}
+    side_tables = {key: json.loads(metadata[key.encode()]) for key in METADATA_KEYS if key.encode() in metadata}
+    return table, side_tables
@@ -1,5 +1,122 @@
+import os
+
 REPLENISHMENT_THRESHOLD = 5
 OVERSTOCK_THRESHOLD = 20
 ZERO_DEMAND_THRESHOLD = 0
 SLOW_MOVING_SALES_THRESHOLD = 3
 EXPIRY_WARNING_DAYS = 7
+
+# Forecast engine
+FORECAST_HORIZON_DAYS = 7
+FORECAST_HORIZON_WEEKS = int(os.getenv("FORECAST_HORIZON_WEEKS", 4))
+FORECAST_MAX_HORIZON_PERIODS = int(os.getenv("FORECAST_MAX_HORIZON_PERIODS", 366))
+FORECAST_FREQ = os.getenv("FORECAST_FREQ", "D")  # D (daily) | W (weekly, Monday-anchored)
+FORECAST_FREQUENCIES = {"D": 1, "W": 7}  # frequency -> days per period
+# Sub-daily seasonality can't be identified from one row per day; opt in only
+# for intraday data.
+FORECAST_DAILY_SEASONALITY = os.getenv("FORECAST_DAILY_SEASONALITY", "0") == "1"
+FORECAST_MAX_WORKERS = int(os.getenv("FORECAST_MAX_WORKERS", os.cpu_count() or 1))
+FORECAST_SKU_TIMEOUT_SECONDS = float(os.getenv("FORECAST_SKU_TIMEOUT_SECONDS", 120))
+
+# Fitted-model cache
+MODEL_CACHE_ENABLED = os.getenv("MODEL_CACHE_ENABLED", "1") == "1"
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".model_cache"))
+MODEL_CACHE_MAX_BYTES = int(os.getenv("MODEL_CACHE_MAX_BYTES", 512 * 1024 * 1024))
+MODEL_CACHE_MAX_ENTRIES = int(os.getenv("MODEL_CACHE_MAX_ENTRIES", 50_000))
+
+# /predict response cache (keyed by upload bytes + request parameters + model version)
+RESPONSE_CACHE_ENABLED = os.getenv("RESPONSE_CACHE_ENABLED", "1") == "1"
+RESPONSE_CACHE_DIR = os.getenv("RESPONSE_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".response_cache"))
+RESPONSE_CACHE_MAX_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_BYTES", 1024 * 1024 * 1024))
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", 1000))
+RESPONSE_CACHE_MAX_ENTRY_BYTES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRY_BYTES", 128 * 1024 * 1024))
+
+# Forecast jobs
+JOBS_DB_PATH = os.getenv("JOBS_DB_PATH", os.path.join(os.path.dirname(__file__), "jobs.sqlite3"))
+JOBS_UPLOAD_DIR = os.getenv("JOBS_UPLOAD_DIR", os.path.join(os.path.dirname(__file__), ".job_uploads"))
+JOBS_RESULT_DIR = os.getenv("JOBS_RESULT_DIR", os.path.join(os.path.dirname(__file__), ".job_results"))
+JOBS_MAX_CONCURRENT = int(os.getenv("JOBS_MAX_CONCURRENT", 1))
+
+# CSV ingestion
+CSV_CHUNK_ROWS = int(os.getenv("CSV_CHUNK_ROWS", 100_000))
+CSV_DATE_DAYFIRST = os.getenv("CSV_DATE_DAYFIRST", "1") == "1"  # uploads use DD-MM-YYYY
+PARTITION_SPILL_BUCKETS = int(os.getenv("PARTITION_SPILL_BUCKETS", 64))  # offline inputs not grouped by SKU
+
+# NDJSON streaming responses
+NDJSON_BATCH_SKUS = int(os.getenv("NDJSON_BATCH_SKUS", 64))
+NDJSON_FLUSH_SECONDS = float(os.getenv("NDJSON_FLUSH_SECONDS", 0.25))
+
+# Incremental history store
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", os.path.join(os.path.dirname(__file__), "history.sqlite3"))
+
+# Forecaster backends
+FORECAST_BACKEND = os.getenv("FORECAST_BACKEND", "auto")  # auto | prophet | smoothing | sklearn | global
+FORECAST_MIN_PROPHET_HISTORY_DAYS = int(os.getenv("FORECAST_MIN_PROPHET_HISTORY_DAYS", 28))
+FORECAST_MIN_NONZERO_FRACTION = float(os.getenv("FORECAST_MIN_NONZERO_FRACTION", 0.5))
+FORECAST_SEASON_LENGTH = 7
+FORECAST_BATCH_SKUS = int(os.getenv("FORECAST_BATCH_SKUS", 1000))
+SKLEARN_MODEL_PATH = os.getenv("SKLEARN_MODEL_PATH", os.path.join(os.path.dirname(__file__), "models", "inventory_model.pkl"))
+GLOBAL_MODEL_DIR = os.getenv("GLOBAL_MODEL_DIR", os.path.join(os.path.dirname(__file__), "models", "global"))
+GLOBAL_MODEL_VERSION = os.getenv("GLOBAL_MODEL_VERSION", "")  # empty: the LATEST trained version
+
+# Metrics / instrumentation
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "1") == "1"
+METRICS_TIMING_HEADER = os.getenv("METRICS_TIMING_HEADER", "0") == "1"  # add X-Timing to /predict
+METRICS_MULTIPROC_DIR = os.getenv("METRICS_MULTIPROC_DIR", "")  # shared by server workers; serve.py sets it
+METRICS_FLUSH_SECONDS = float(os.getenv("METRICS_FLUSH_SECONDS", 1))  # how stale another worker's share can be
+
+# Expiry / waste projection
+WASTE_TRANSFER_MIN_DAYS = int(os.getenv("WASTE_TRANSFER_MIN_DAYS", 3))  # enough time left to move stock
+WASTE_TRANSFER_MIN_FRACTION = float(os.getenv("WASTE_TRANSFER_MIN_FRACTION", 0.5))
+
+# Alert rules
+ALERT_RULES_PATH = os.getenv("ALERT_RULES_PATH", os.path.join(os.path.dirname(__file__), "alert_rules.json"))
+STOCKPILE_RATIO = 1.5  # inventory above this multiple of latest sales
+
+# Probabilistic forecasts
+FORECAST_INTERVAL_WIDTH = 0.8  # P10-P90
+FORECAST_UNCERTAINTY_SAMPLES = int(os.getenv("FORECAST_UNCERTAINTY_SAMPLES", 200))  # Prophet trend simulations
+
+# Hierarchical forecasting
+FORECAST_MODE = os.getenv("FORECAST_MODE", "sku")  # sku | hierarchical
+HIERARCHY_COLUMNS = ["store", "category"]  # outermost level first
+HIERARCHY_PROPORTION_DAYS = int(os.getenv("HIERARCHY_PROPORTION_DAYS", 28))  # window for top-down shares
+
+# Backtesting (backtest.py)
+BACKTEST_FOLDS = int(os.getenv("BACKTEST_FOLDS", 3))  # rolling forecast origins per backend
+BACKTEST_BACKENDS = os.getenv("BACKTEST_BACKENDS", "prophet,smoothing").split(",")
+
+# Reorder-policy simulation (/simulate)
+SIMULATION_HORIZON_DAYS = int(os.getenv("SIMULATION_HORIZON_DAYS", 30))
+SIMULATION_PATHS = int(os.getenv("SIMULATION_PATHS", 1000))  # Monte Carlo demand paths per SKU
+SIMULATION_MAX_PATHS = int(os.getenv("SIMULATION_MAX_PATHS", 10_000))
+SIMULATION_LEAD_TIME_DAYS = int(os.getenv("SIMULATION_LEAD_TIME_DAYS", 2))
+SIMULATION_CHUNK_SKUS = int(os.getenv("SIMULATION_CHUNK_SKUS", 16))  # SKUs simulated together; sized for CPU cache
+SIMULATION_THREADS = int(os.getenv("SIMULATION_THREADS", os.cpu_count() or 1))
+SIMULATION_HOLDING_COST = float(os.getenv("SIMULATION_HOLDING_COST", 0.05))  # per unit per day on hand
+SIMULATION_WASTE_COST = float(os.getenv("SIMULATION_WASTE_COST", 1.0))  # per unit expired
+SIMULATION_STOCKOUT_COST = float(os.getenv("SIMULATION_STOCKOUT_COST", 2.0))  # per unit of lost sales
+SIMULATION_ORDER_COST = float(os.getenv("SIMULATION_ORDER_COST", 5.0))  # per order placed
+# Candidate policies; levels are in days of each SKU's mean forecast demand
+SIMULATION_POLICIES = [
+    {"name": "sS", "type": "sS", "s_days": 3, "S_days": 7},
+    {"name": "min_max", "type": "min_max", "min_days": 3, "max_days": 10, "review_days": 7},
+    {"name": "order_up_to", "type": "order_up_to", "S_days": 10, "review_days": 7},
+]
+
+# Offline batch forecasting (batch_forecast.py)
+BATCH_OUTPUT_DIR = os.getenv("BATCH_OUTPUT_DIR", os.path.join(os.path.dirname(__file__), ".batch_output"))
+BATCH_CHECKPOINT_SKUS = int(os.getenv("BATCH_CHECKPOINT_SKUS", 500))  # finished SKUs per output part
+BATCH_CHECKPOINT_SECONDS = float(os.getenv("BATCH_CHECKPOINT_SECONDS", 60))  # flush at least this often
+
+# Global model training (train_model.py)
+TRAIN_CHUNK_ROWS = int(os.getenv("TRAIN_CHUNK_ROWS", 250_000))  # rows per partial_fit chunk
+TRAIN_EPOCHS = int(os.getenv("TRAIN_EPOCHS", 3))
+TRAIN_HOLDOUT_DAYS = int(os.getenv("TRAIN_HOLDOUT_DAYS", 14))  # each SKU's last days, kept out for scoring
+
+# Server (serve.py)
+SERVER_HOST = os.getenv("SERVER_HOST", "0.0.0.0")
+SERVER_PORT = int(os.getenv("SERVER_PORT", 8000))
+SERVER_WORKERS = int(os.getenv("SERVER_WORKERS", 1))
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "1") == "1"
+WARMUP_CACHED_MODELS = int(os.getenv("WARMUP_CACHED_MODELS", 200))  # MRU cache entries to pre-read
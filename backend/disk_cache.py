@@ -0,0 +1,152 @@
+import logging
+import os
+import tempfile
+from contextlib import contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: eviction runs unsynchronized
+    fcntl = None
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+# -------------------------------
+# Size-bounded LRU Store on Local Disk
+# -------------------------------
+class DiskCache:
+    """
+    A directory of ``<key>.bin`` blobs with LRU eviction.
+
+    Recency is tracked through file mtimes, so several processes can share one
+    directory: writes go through a temp file + ``os.replace`` and readers never
+    see a partial entry. Eviction holds an ``flock`` on ``.lock`` so only one
+    process scans and deletes at a time.
+    """
+
+    suffix = ".bin"
+    lock_name = ".lock"
+
+    def __init__(self, directory: str, max_bytes: int, max_entries: int):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._approx_bytes = None
+        self._approx_entries = None
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.suffix)
+
+    @contextmanager
+    def _exclusive(self):
+        """Yield True while holding the directory lock, False if another process has it."""
+        if fcntl is None:
+            yield True
+            return
+        with open(os.path.join(self.directory, self.lock_name), "a") as fh:
+            try:
+                fcntl.flock(fh, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+
+    def get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "rb") as fh:
+                data = fh.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)  # mark as recently used
+        except OSError:
+            pass
+        return data
+
+    def contains(self, key: str) -> bool:
+        return os.path.exists(self._path(key))
+
+    def put(self, key: str, data: bytes):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as fh:
+                fh.write(data)
+            os.replace(tmp_path, self._path(key))
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        if self._approx_bytes is None:
+            self._rescan()
+        else:
+            self._approx_bytes += len(data)
+            self._approx_entries += 1
+        if self._approx_bytes > self.max_bytes or self._approx_entries > self.max_entries:
+            self.evict()
+
+    def _entries(self) -> list:
+        entries = []
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(self.suffix):
+                    continue
+                try:
+                    stat = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+        return entries
+
+    def _rescan(self):
+        entries = self._entries()
+        self._approx_bytes = sum(size for _, size, _ in entries)
+        self._approx_entries = len(entries)
+
+    def evict(self):
+        """
+        Drop least recently used entries until the store is within its limits.
+
+        If another process is already evicting, leave it to that process and
+        rescan on the next write.
+        """
+        with self._exclusive() as acquired:
+            if not acquired:
+                self._approx_bytes = None
+                return
+            self._evict()
+
+    def _evict(self):
+        entries = sorted(self._entries())
+        total_bytes = sum(size for _, size, _ in entries)
+        total_entries = len(entries)
+        removed = 0
+
+        for _, size, path in entries:
+            if total_bytes <= self.max_bytes and total_entries <= self.max_entries:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total_bytes -= size
+            total_entries -= 1
+            removed += 1
+
+        self._approx_bytes = total_bytes
+        self._approx_entries = total_entries
+        if removed:
+            logger.info(f"🧹 Evicted {removed} entries from {self.directory}")
+
+    def usage(self) -> dict:
+        self._rescan()
+        return {"entries": self._approx_entries, "bytes": self._approx_bytes}
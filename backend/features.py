@@ -0,0 +1,214 @@
+import json
+import logging
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+from config import GLOBAL_MODEL_DIR, GLOBAL_MODEL_VERSION
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# -------------------------------
+# Feature Definitions
+# -------------------------------
+# Bump when a feature's meaning changes; saved models record the version they
+# were trained with and are refused by a different one.
+FEATURE_VERSION = 2
+FEATURE_LAGS = (1, 7, 14)
+ROLLING_WINDOWS = (7, 28)
+MAX_EXPIRY_DAYS = 60  # expiry further out than this reads the same
+HISTORY_WINDOW = max(FEATURE_LAGS + ROLLING_WINDOWS)  # past values a forecast step needs
+
+FEATURE_COLUMNS = (
+    [f"lag_{lag}" for lag in FEATURE_LAGS]
+    + [f"roll_mean_{window}" for window in ROLLING_WINDOWS]
+    + [f"dow_{day}" for day in range(7)]
+    + ["is_holiday", "days_to_expiry", "has_expiry"]
+)
+
+
+def calendar_features(days, holidays, days_to_expiry) -> dict:
+    """Day-of-week one-hots, the holiday flag and capped days to expiry for rows dated ``days``."""
+    day_numbers = np.asarray(days, dtype="datetime64[D]").astype("int64")
+    dow = (day_numbers + 3) % 7  # 1970-01-01 was a Thursday; Monday is 0
+    expiry = np.asarray(days_to_expiry, dtype="float64")
+    features = {f"dow_{day}": (dow == day).astype(np.float32) for day in range(7)}
+    features["is_holiday"] = np.nan_to_num(np.asarray(holidays, dtype="float64")).astype(np.float32)
+    features["days_to_expiry"] = np.clip(np.nan_to_num(expiry, nan=MAX_EXPIRY_DAYS), 0, MAX_EXPIRY_DAYS).astype(np.float32)
+    features["has_expiry"] = np.isfinite(expiry).astype(np.float32)
+    return features
+
+
+def _steps(days, period_days: int) -> np.ndarray:
+    """Dates as whole periods since the epoch, so consecutive periods differ by 1."""
+    return np.asarray(days, dtype="datetime64[D]").astype("int64") // period_days
+
+
+def build_features(frame: pd.DataFrame, period_days: int = 1) -> pd.DataFrame:
+    """
+    The ``FEATURE_COLUMNS`` (float32) for every row of a ``sku/ds/y/is_holiday
+    [/days_to_expiry]`` frame sorted by SKU and date, plus ``history`` (how
+    many earlier rows the SKU has).
+
+    Lags and rolling means are taken by date, not by row: each SKU is laid
+    out on a gap-free grid of ``period_days`` periods, so a missing date is a
+    missing value rather than a shift of every later lag. Rolling means
+    average the observed values in their window; a lag whose date is missing
+    or before the SKU's first row falls back to the ``HISTORY_WINDOW`` rolling
+    mean (0 without history). ``step_features`` does the same.
+    """
+    codes = pd.factorize(frame["sku"])[0]
+    y = np.nan_to_num(frame["y"].to_numpy(dtype="float64"))
+    steps = _steps(frame["ds"].to_numpy(), period_days)
+    history = pd.Series(codes).groupby(codes).cumcount().to_numpy()
+
+    # Each SKU's grid runs from its first to its last period
+    n = codes.max() + 1 if len(codes) else 0
+    first = np.full(n, np.iinfo(np.int64).max)
+    np.minimum.at(first, codes, steps)
+    offset = steps - first[codes]
+    spans = np.zeros(n, dtype="int64")
+    np.maximum.at(spans, codes, offset + 1)
+    grid_start = np.concatenate(([0], np.cumsum(spans)[:-1]))
+    at = grid_start[codes] + offset
+
+    values = np.zeros(spans.sum())
+    observed = np.zeros(len(values))
+    values[at], observed[at] = y, 1.0
+    # Exclusive prefix sums: totals[i] covers grid cells before i
+    totals = np.concatenate(([0.0], np.cumsum(values)))
+    counts = np.concatenate(([0.0], np.cumsum(observed)))
+    sku_start = grid_start[codes]
+
+    def trailing_mean(window):
+        lower = np.maximum(at - window, sku_start)
+        seen = counts[at] - counts[lower]
+        return np.divide(totals[at] - totals[lower], seen, out=np.zeros(len(at)), where=seen > 0)
+
+    features = {f"roll_mean_{window}": trailing_mean(window) for window in ROLLING_WINDOWS}
+    fallback = trailing_mean(HISTORY_WINDOW)
+    for lag in FEATURE_LAGS:
+        source = at - lag
+        available = source >= sku_start
+        available[available] = observed[source[available]] > 0
+        features[f"lag_{lag}"] = np.where(available, values[np.maximum(source, 0)], fallback)
+
+    expiry = frame["days_to_expiry"] if "days_to_expiry" in frame else np.full(len(frame), np.nan)
+    features.update(calendar_features(frame["ds"].to_numpy(), frame["is_holiday"].to_numpy(), expiry))
+    result = pd.DataFrame({name: np.asarray(features[name], dtype=np.float32) for name in FEATURE_COLUMNS})
+    result["history"] = history
+    return result
+
+
+def history_window(codes: np.ndarray, days, values: np.ndarray, skus: int, period_days: int = 1) -> np.ndarray:
+    """
+    ``(skus, HISTORY_WINDOW)`` array of each SKU's values over the
+    ``HISTORY_WINDOW`` periods up to its last row, by date and oldest first;
+    NaN where a date is missing or precedes the SKU's history.
+    """
+    steps = _steps(days, period_days)
+    last = np.full(skus, np.iinfo(np.int64).min)
+    np.maximum.at(last, codes, steps)
+    back = last[codes] - steps
+    recent = back < HISTORY_WINDOW
+    window = np.full((skus, HISTORY_WINDOW), np.nan)
+    window[codes[recent], HISTORY_WINDOW - 1 - back[recent]] = values[recent]
+    return window
+
+
+def step_features(window: np.ndarray, days, holidays, days_to_expiry) -> pd.DataFrame:
+    """
+    ``FEATURE_COLUMNS`` for one new row per SKU, from a ``(skus, HISTORY_WINDOW)``
+    array of each SKU's values for the periods just before it (see
+    ``history_window``), oldest first and NaN where unknown. Matches
+    ``build_features`` row for row.
+    """
+    observed = np.isfinite(window)
+    filled = np.nan_to_num(window)
+
+    def trailing_mean(recent):
+        seen = observed[:, -recent:].sum(axis=1)
+        return np.divide(filled[:, -recent:].sum(axis=1), seen, out=np.zeros(len(window)), where=seen > 0)
+
+    features = {f"roll_mean_{recent}": trailing_mean(recent) for recent in ROLLING_WINDOWS}
+    fallback = trailing_mean(HISTORY_WINDOW)
+    for lag in FEATURE_LAGS:
+        features[f"lag_{lag}"] = np.where(observed[:, -lag], filled[:, -lag], fallback)
+    features.update(calendar_features(days, holidays, days_to_expiry))
+    return pd.DataFrame({name: np.asarray(features[name], dtype=np.float32) for name in FEATURE_COLUMNS})
+
+# -------------------------------
+# Versioned Model Store
+# -------------------------------
+# models/global/<version>/model.joblib (+ metadata.json); LATEST names the
+# version used unless GLOBAL_MODEL_VERSION pins one.
+def latest_version(model_dir: str = GLOBAL_MODEL_DIR):
+    try:
+        with open(os.path.join(model_dir, "LATEST")) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def model_path(version: str = None, model_dir: str = GLOBAL_MODEL_DIR):
+    """Path of a saved model (default: the pinned or latest version), or ``None``."""
+    version = version or GLOBAL_MODEL_VERSION or latest_version(model_dir)
+    if not version:
+        return None
+    return os.path.join(model_dir, version, "model.joblib")
+
+
+def save_model(bundle: dict, metadata: dict, version: str, model_dir: str = GLOBAL_MODEL_DIR) -> str:
+    """
+    Write ``bundle`` (uncompressed, so its arrays can be memory-mapped) and
+    ``metadata`` as ``version``, then point LATEST at it. Both steps are
+    atomic renames, so readers never see a half-written model.
+    """
+    import joblib
+
+    os.makedirs(model_dir, exist_ok=True)
+    target = os.path.join(model_dir, version)
+    if os.path.exists(target):
+        raise FileExistsError(f"Model version {version} already exists in {model_dir}")
+    staging = tempfile.mkdtemp(dir=model_dir, prefix=".staging-")
+    try:
+        joblib.dump(bundle, os.path.join(staging, "model.joblib"))
+        with open(os.path.join(staging, "metadata.json"), "w") as f:
+            json.dump(metadata, f, indent=2, default=str)
+        os.replace(staging, target)
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    fd, tmp = tempfile.mkstemp(dir=model_dir, suffix=".tmp")
+    with os.fdopen(fd, "w") as f:
+        f.write(version + "\n")
+    os.replace(tmp, os.path.join(model_dir, "LATEST"))
+    return target
+
+
+def load_model(path: str) -> dict:
+    """
+    Load a saved model with its arrays memory-mapped read-only, so every
+    worker process shares one copy through the OS page cache.
+    """
+    import joblib
+
+    bundle = joblib.load(path, mmap_mode="r")
+    if bundle.get("feature_version") != FEATURE_VERSION:
+        raise ValueError(f"{path} was trained with feature version {bundle.get('feature_version')}, "
+                         f"expected {FEATURE_VERSION}; retrain it with train_model.py")
+    return bundle
+
+
+def predict(bundle: dict, features: pd.DataFrame) -> np.ndarray:
+    """One batched prediction (daily sales, floored at 0) for every row of ``features``."""
+    X = bundle["scaler"].transform(features[bundle["features"]].to_numpy(dtype="float64"))
+    return np.clip(bundle["regressor"].predict(X), 0, None)
@@ -0,0 +1,437 @@
+import logging
+import os
+import threading
+from abc import ABC, abstractmethod
+from statistics import NormalDist
+
+import joblib
+import numpy as np
+import pandas as pd
+
+from config import (
+    FORECAST_BACKEND,
+    FORECAST_MIN_PROPHET_HISTORY_DAYS,
+    FORECAST_MIN_NONZERO_FRACTION,
+    FORECAST_SEASON_LENGTH,
+    FORECAST_INTERVAL_WIDTH,
+    GLOBAL_MODEL_DIR,
+    SKLEARN_MODEL_PATH,
+)
+import features
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Prophet is fitted one SKU at a time by model.py's worker pool; the backends
+# below forecast a whole batch of SKUs in a single call.
+PROPHET = "prophet"
+SMOOTHING = "smoothing"
+SKLEARN = "sklearn"
+GLOBAL = "global"
+AUTO = "auto"
+
+# Candidate smoothing factors; each SKU keeps the one with the lowest
+# one-step-ahead squared error.
+SMOOTHING_ALPHAS = np.array([0.1, 0.3, 0.5, 0.8])
+
+# Quantile columns every backend adds next to ``prediction`` (float32 to keep
+# large forecasts compact), e.g. p10/p50/p90 for an 80% interval.
+QUANTILE_LOWER = f"p{round(50 * (1 - FORECAST_INTERVAL_WIDTH))}"
+QUANTILE_MEDIAN = "p50"
+QUANTILE_UPPER = f"p{round(50 * (1 + FORECAST_INTERVAL_WIDTH))}"
+QUANTILE_COLUMNS = [QUANTILE_LOWER, QUANTILE_MEDIAN, QUANTILE_UPPER]
+INTERVAL_Z = NormalDist().inv_cdf(0.5 + FORECAST_INTERVAL_WIDTH / 2)
+
+
+def quantile_columns(lower, median, upper) -> dict:
+    """Quantile columns as float32, clipped at zero since demand can't be negative."""
+    return {
+        name: np.clip(np.asarray(values, dtype="float64"), 0, None).astype(np.float32)
+        for name, values in zip(QUANTILE_COLUMNS, (lower, median, upper))
+    }
+
+
+class Forecaster(ABC):
+    """
+    A batched forecaster backend.
+
+    ``forecast(series, periods, period_days)`` takes ``(sku, sales_df)`` pairs,
+    where ``sales_df`` has ``ds``/``y`` columns (plus ``inventory`` when the
+    upload had it) at one row per ``period_days`` days, and returns
+    ``{sku: frame}`` with the same ``date/prediction/sku`` rows Prophet
+    produces: fitted values over the history, then ``periods`` future
+    periods. Each row also carries the ``QUANTILE_COLUMNS``.
+    """
+
+    name = None
+
+    @abstractmethod
+    def forecast(self, series: list, periods: int, period_days: int = 1) -> dict:
+        ...
+
+
+class SeriesBatch:
+    """
+    A batch of SKU histories stacked into flat arrays, sorted by SKU then date.
+
+    ``starts``/``ends`` delimit each SKU's rows; ``codes`` maps rows to SKUs.
+    Rows are ``period_days`` apart (1 for daily, 7 for weekly series).
+    """
+
+    def __init__(self, series: list, period_days: int = 1):
+        self.period_days = period_days
+        self.skus = [sku for sku, _ in series]
+        self.lengths = np.array([len(sales_df) for _, sales_df in series])
+        self.codes = np.repeat(np.arange(len(series)), self.lengths)
+        self.ends = np.cumsum(self.lengths)
+        self.starts = self.ends - self.lengths
+
+        ds = np.concatenate([sales_df["ds"].to_numpy(dtype="datetime64[ns]") for _, sales_df in series])
+        self._order = np.lexsort((ds, self.codes))
+        self.ds = ds[self._order].astype("datetime64[D]")
+        self.y = self.column(series, "y")
+        self.inventory = self.column(series, "inventory")
+
+    def column(self, series: list, name: str) -> np.ndarray:
+        """One column of every SKU's rows in batch order (NaN where a frame lacks it)."""
+        return self._column(series, name)[self._order]
+
+    @staticmethod
+    def _column(series: list, name: str) -> np.ndarray:
+        return np.concatenate([
+            sales_df[name].to_numpy(dtype="float64", na_value=np.nan) if name in sales_df
+            else np.full(len(sales_df), np.nan)
+            for _, sales_df in series
+        ])
+
+    def future_dates(self, periods: int) -> np.ndarray:
+        """``(skus, periods)`` period start dates following each SKU's last row."""
+        return self.ds[self.ends - 1][:, None] + np.arange(1, periods + 1) * self.period_days
+
+    def trailing_mean(self, values: np.ndarray, window: int) -> np.ndarray:
+        """Mean of the last ``window`` rows of each SKU (NaN treated as 0)."""
+        totals = np.concatenate(([0.0], np.cumsum(np.nan_to_num(values))))
+        counts = np.minimum(self.lengths, window)
+        return (totals[self.ends] - totals[self.ends - counts]) / counts
+
+    def frames(self, fitted: np.ndarray, future: np.ndarray,
+               fitted_sigma: np.ndarray = None, future_sigma: np.ndarray = None) -> dict:
+        """
+        Split fitted history values plus ``(skus, periods)`` future values into
+        one ``date/prediction/sku`` frame per SKU.
+
+        The optional ``*_sigma`` arrays (same shapes) are forecast standard
+        errors; quantiles are the normal interval around the point forecast.
+        Without them the quantiles collapse onto the point forecast.
+        """
+        n, periods = future.shape
+        offsets = np.arange(n) * periods
+        history_at = np.arange(len(fitted)) + offsets[self.codes]
+        future_at = (self.ends + offsets)[:, None] + np.arange(periods)
+
+        dates = np.empty(len(fitted) + n * periods, dtype="datetime64[D]")
+        predictions = np.empty(len(dates))
+        sigma = np.zeros(len(dates))
+        dates[history_at], predictions[history_at] = self.ds, fitted
+        dates[future_at], predictions[future_at] = self.future_dates(periods), future
+        if fitted_sigma is not None:
+            sigma[history_at], sigma[future_at] = fitted_sigma, future_sigma
+
+        spread = INTERVAL_Z * np.nan_to_num(sigma)
+        out = pd.DataFrame({
+            "date": dates.astype("datetime64[ns]"),
+            "prediction": predictions,
+            "sku": np.repeat(np.array(self.skus, dtype=object), self.lengths + periods),
+            **quantile_columns(predictions - spread, predictions, predictions + spread),
+        })
+        bounds = np.append(self.starts + offsets, len(out))
+        return {sku: out.iloc[bounds[i]:bounds[i + 1]] for i, sku in enumerate(self.skus)}
+
+
+def _day_of_week(days: np.ndarray) -> np.ndarray:
+    # 1970-01-01 was a Thursday; Monday is 0 as in pandas.
+    return (days.astype("int64") + 3) % 7
+
+
+def period_start(dates, period_days: int) -> np.ndarray:
+    """
+    The first day of the period each date falls in, as ``datetime64[D]``:
+    the date itself for daily periods, the Monday of its week for weekly ones.
+    """
+    days = np.asarray(dates, dtype="datetime64[D]")
+    if period_days == 1:
+        return days
+    if period_days != 7:
+        raise ValueError(f"Unsupported period length: {period_days} days")
+    return days - _day_of_week(days).astype("timedelta64[D]")
+
+# -------------------------------
+# Exponential Smoothing / Seasonal Naive
+# -------------------------------
+class SmoothingForecaster(Forecaster):
+    """
+    Simple exponential smoothing on top of a day-of-week seasonal profile.
+
+    All SKUs in a batch are right-aligned into one ``(skus, days)`` matrix and
+    smoothed together, so the per-step cost is a few array operations however
+    many SKUs there are. SKUs with less than two seasons of history, and
+    weekly series, get a flat profile, i.e. plain exponential smoothing.
+    """
+
+    name = SMOOTHING
+
+    def forecast(self, series: list, periods: int, period_days: int = 1) -> dict:
+        batch = SeriesBatch(series, period_days)
+        n, width = len(batch.skus), int(batch.lengths.max())
+        codes, dow = batch.codes, _day_of_week(batch.ds)
+        columns = np.arange(len(batch.y)) - batch.starts[codes] + (width - batch.lengths)[codes]
+
+        seasonal = self._seasonal_profile(batch.y, dow, codes, batch.lengths)
+        if period_days != 1:
+            seasonal[:] = 0.0
+        values = np.full((n, width), np.nan)
+        values[codes, columns] = batch.y - seasonal[codes, dow]
+
+        sse = self._smooth(values, SMOOTHING_ALPHAS[:, None])[1]
+        alpha = SMOOTHING_ALPHAS[np.argmin(sse, axis=0)]
+        level, sse, fitted = self._smooth(values, alpha, keep_fitted=True)
+
+        fitted = np.clip(fitted[codes, columns] + seasonal[codes, dow], 0, None)
+        future_dow = _day_of_week(batch.future_dates(periods))
+        future = np.clip(level[:, None] + np.take_along_axis(seasonal, future_dow, axis=1), 0, None)
+
+        # Analytic intervals: one-step residual variance, widened for h steps
+        # ahead as sigma^2 * (1 + (h - 1) * alpha^2).
+        residuals = np.maximum((~np.isnan(values)).sum(axis=1) - 1, 1)
+        sigma = np.sqrt(sse / residuals)
+        steps = np.arange(1, periods + 1)
+        future_sigma = sigma[:, None] * np.sqrt(1 + (steps - 1) * alpha[:, None] ** 2)
+        return batch.frames(fitted, future, sigma[codes], future_sigma)
+
+    @staticmethod
+    def _seasonal_profile(y, dow, codes, lengths) -> np.ndarray:
+        """Mean deviation from each SKU's average, per day of week: ``(skus, 7)``."""
+        n = len(lengths)
+        valid = ~np.isnan(y)
+        slots = codes * 7 + dow
+        totals = np.bincount(slots[valid], weights=y[valid], minlength=n * 7).reshape(n, 7)
+        counts = np.bincount(slots[valid], minlength=n * 7).reshape(n, 7)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            means = totals.sum(axis=1) / counts.sum(axis=1)
+            profile = totals / counts - means[:, None]
+        profile = np.nan_to_num(profile)
+        profile[lengths < 2 * FORECAST_SEASON_LENGTH] = 0.0
+        return profile
+
+    @staticmethod
+    def _smooth(values: np.ndarray, alpha, keep_fitted: bool = False):
+        """
+        Run the level recursion across every SKU (and every ``alpha`` row) at
+        once. Returns ``(final_level, sse, fitted)``; the first observation of
+        a series seeds its level.
+        """
+        shape = np.broadcast(alpha, values[:, 0]).shape
+        level = np.full(shape, np.nan)
+        sse = np.zeros(shape)
+        fitted = np.full(values.shape, np.nan) if keep_fitted else None
+
+        for t in range(values.shape[1]):
+            observed = values[:, t]
+            error = observed - level
+            sse += np.where(np.isnan(error), 0.0, error ** 2)
+            if keep_fitted:
+                fitted[:, t] = np.where(np.isnan(level), observed, level)
+            level = np.where(
+                np.isnan(level), observed,
+                np.where(np.isnan(observed), level, level + alpha * error),
+            )
+        return level, sse, fitted
+
+# -------------------------------
+# Saved scikit-learn Regressor
+# -------------------------------
+class SklearnForecaster(Forecaster):
+    """
+    Predict sales with the legacy regressor at ``SKLEARN_MODEL_PATH`` (the
+    ``global`` backend replaces it; ``train_model.py`` now trains that).
+
+    The model maps ``(inventory, sales)`` to sales, so future days are scored
+    with the last known inventory and the trailing seasonal-window mean of sales.
+    It was trained on daily rows, so longer periods are scored as daily rates
+    and scaled back up.
+    """
+
+    name = SKLEARN
+
+    def __init__(self, path: str = SKLEARN_MODEL_PATH):
+        self.path = path
+        self._model = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _get_model(self):
+        with self._lock:
+            if self._model is None:
+                self._model = joblib.load(self.path)
+                logger.info(f"🌲 Loaded scikit-learn forecaster from {self.path}")
+            return self._model
+
+    def forecast(self, series: list, periods: int, period_days: int = 1) -> dict:
+        model = self._get_model()
+        features = list(getattr(model, "feature_names_in_", ["inventory", "sales"]))
+        batch = SeriesBatch(series, period_days)
+
+        inventory = np.nan_to_num(batch.inventory)
+        daily_sales = np.nan_to_num(batch.y) / period_days
+        recent = batch.trailing_mean(daily_sales, FORECAST_SEASON_LENGTH)
+        history = pd.DataFrame({"inventory": inventory, "sales": daily_sales})
+        future = pd.DataFrame({
+            "inventory": np.repeat(inventory[batch.ends - 1], periods),
+            "sales": np.repeat(recent, periods),
+        })
+
+        # One predict call for the whole batch
+        predictions = model.predict(pd.concat([history, future], ignore_index=True)[features]) * period_days
+        fitted, future_values = predictions[:len(history)], predictions[len(history):]
+
+        # Intervals from each SKU's in-sample residual spread
+        residuals = np.nan_to_num(batch.y) - fitted
+        counts = np.maximum(batch.lengths - 1, 1)
+        sigma = np.sqrt(np.bincount(batch.codes, weights=residuals ** 2) / counts)
+        return batch.frames(
+            fitted, future_values.reshape(len(batch.skus), periods),
+            sigma[batch.codes], np.repeat(sigma[:, None], periods, axis=1),
+        )
+
+# -------------------------------
+# Global Feature Model
+# -------------------------------
+class GlobalForecaster(Forecaster):
+    """
+    Forecast every SKU with the one global model trained by ``train_model.py``.
+
+    Fitted values come from a single predict over the batch's history
+    features. The future is forecast recursively: each step is one predict
+    for all SKUs, whose outputs become the next step's lags. The model was
+    trained on daily rows, so longer periods are scored as daily rates (lags
+    then count periods) and scaled back up.
+
+    The model file is memory-mapped once per process and reloaded when
+    ``LATEST`` moves to a new version.
+    """
+
+    name = GLOBAL
+
+    def __init__(self, version: str = None):
+        self.version = version
+        self._bundle = None
+        self._path = None
+        self._lock = threading.Lock()
+
+    def available(self) -> bool:
+        path = features.model_path(self.version)
+        return path is not None and os.path.exists(path)
+
+    def _get_model(self) -> dict:
+        path = features.model_path(self.version)
+        if path is None:
+            raise FileNotFoundError(f"No trained global model in {GLOBAL_MODEL_DIR}; run train_model.py")
+        with self._lock:
+            if self._path != path:
+                self._bundle = features.load_model(path)
+                self._path = path
+                logger.info(f"🌐 Memory-mapped global model {path}")
+            return self._bundle
+
+    def forecast(self, series: list, periods: int, period_days: int = 1) -> dict:
+        from holiday_calendar import is_holiday
+
+        bundle = self._get_model()
+        batch = SeriesBatch(series, period_days)
+        daily_sales = np.nan_to_num(batch.y) / period_days
+        expiry = batch.column(series, "days_to_expiry")
+        history = pd.DataFrame({
+            "sku": batch.codes,
+            "ds": batch.ds,
+            "y": daily_sales,
+            "is_holiday": batch.column(series, "is_holiday"),
+            "days_to_expiry": expiry,
+        })
+        fitted = features.predict(bundle, features.build_features(history, period_days)) * period_days
+
+        # Each SKU's values over the latest HISTORY_WINDOW periods, by date
+        window = features.history_window(batch.codes, batch.ds, daily_sales, len(batch.skus), period_days)
+
+        dates = batch.future_dates(periods)
+        last_expiry = expiry[batch.ends - 1]
+        future = np.empty((len(batch.skus), periods))
+        for step in range(periods):
+            step_dates = dates[:, step]
+            step_rows = features.step_features(
+                window, step_dates, is_holiday(step_dates, period_days),
+                last_expiry - (step + 1) * period_days,
+            )
+            future[:, step] = features.predict(bundle, step_rows)
+            window = np.concatenate([window[:, 1:], future[:, step, None]], axis=1)
+        future *= period_days
+
+        # Intervals from each SKU's in-sample residual spread
+        residuals = np.nan_to_num(batch.y) - fitted
+        counts = np.maximum(batch.lengths - 1, 1)
+        sigma = np.sqrt(np.bincount(batch.codes, weights=residuals ** 2) / counts)
+        return batch.frames(fitted, future, sigma[batch.codes], np.repeat(sigma[:, None], periods, axis=1))
+
+# -------------------------------
+# Backend Registry & Selection
+# -------------------------------
+BACKENDS = {
+    SMOOTHING: SmoothingForecaster(),
+    SKLEARN: SklearnForecaster(),
+    GLOBAL: GlobalForecaster(),
+}
+
+
+def get_forecaster(name: str) -> Forecaster:
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown forecaster backend: {name}")
+
+
+def resolve_policy(policy: str = None) -> str:
+    """Validate a backend policy (default ``FORECAST_BACKEND``) once per run."""
+    policy = policy or FORECAST_BACKEND
+    if policy not in (AUTO, PROPHET, *BACKENDS):
+        raise ValueError(f"Unknown forecaster backend: {policy}")
+    if policy == SKLEARN and not BACKENDS[SKLEARN].available():
+        logger.warning(f"⚠️ {SKLEARN_MODEL_PATH} not found; using {SMOOTHING} instead.")
+        return SMOOTHING
+    if policy == GLOBAL and not BACKENDS[GLOBAL].available():
+        logger.warning(f"⚠️ No trained global model in {GLOBAL_MODEL_DIR}; using {SMOOTHING} instead.")
+        return SMOOTHING
+    return policy
+
+
+def select_backend(sales_df: pd.DataFrame, policy: str, period_days: int = 1) -> str:
+    """
+    Pick a backend for one SKU.
+
+    With the ``auto`` policy, short series (too little history for Prophet's
+    seasonality to be identifiable) and sparse ones (mostly zero periods) go
+    to exponential smoothing; everything else goes to Prophet. History is
+    measured in periods, so weekly series need ``FORECAST_MIN_PROPHET_HISTORY_DAYS``
+    weeks.
+    """
+    if policy != AUTO:
+        return policy
+
+    periods = ((sales_df["ds"].max() - sales_df["ds"].min()).days + period_days) / period_days
+    nonzero = (sales_df["y"].fillna(0) != 0).mean()
+    if periods < FORECAST_MIN_PROPHET_HISTORY_DAYS or nonzero < FORECAST_MIN_NONZERO_FRACTION:
+        return SMOOTHING
+    return PROPHET
@@ -0,0 +1,144 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from config import HIERARCHY_COLUMNS, HIERARCHY_PROPORTION_DAYS
+import metrics
+from forecasters import QUANTILE_COLUMNS
+from model import forecast_demand
+from utils import parse_dates
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Forecast modes (``FORECAST_MODE``)
+SKU_MODE = "sku"
+HIERARCHICAL = "hierarchical"
+MODES = (SKU_MODE, HIERARCHICAL)
+
+VALUE_COLUMNS = ["prediction"] + QUANTILE_COLUMNS
+
+
+def hierarchy_levels(df: pd.DataFrame) -> list:
+    """The ``HIERARCHY_COLUMNS`` present in ``df``, outermost first."""
+    return [column for column in HIERARCHY_COLUMNS if column in df.columns]
+
+
+def _node_keys(df: pd.DataFrame, levels: list) -> pd.Series:
+    """One label per row naming its aggregate series, e.g. ``store=S1/category=Dairy``."""
+    key = None
+    for level in levels:
+        values = df[level].astype(object).where(df[level].notna(), "(none)").astype(str)
+        part = f"{level}=" + values
+        key = part if key is None else key + "/" + part
+    return key
+
+# -------------------------------
+# Top-Down Proportions
+# -------------------------------
+def _proportions(df: pd.DataFrame, node: pd.Series) -> pd.DataFrame:
+    """
+    Each (node, sku) pair's share of its node's demand.
+
+    Shares come from the last ``HIERARCHY_PROPORTION_DAYS`` of the node's
+    history so they follow recent mix changes. A node with no recent sales
+    falls back to its whole history, and one with none at all splits evenly.
+    """
+    sales = df["sales"].fillna(0).to_numpy(dtype="float64")
+    latest = df["date"].groupby(node).transform("max")
+    recent = (df["date"] > latest - pd.Timedelta(days=HIERARCHY_PROPORTION_DAYS)).to_numpy()
+
+    pairs = pd.DataFrame({
+        "node": node.to_numpy(),
+        "sku": df["sku"].astype(object).to_numpy(),
+        "recent": np.where(recent, sales, 0.0),
+        "total": sales,
+    }).groupby(["node", "sku"], sort=False).sum().reset_index()
+
+    by_node = pairs.groupby("node", sort=False)
+    recent_total = by_node["recent"].transform("sum").to_numpy()
+    total = by_node["total"].transform("sum").to_numpy()
+    members = by_node["sku"].transform("size").to_numpy()
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        share = np.where(
+            recent_total > 0, pairs["recent"] / recent_total,
+            np.where(total > 0, pairs["total"] / total, 1.0 / members),
+        )
+    pairs["share"] = share
+    return pairs[["node", "sku", "share"]]
+
+# -------------------------------
+# Hierarchical Forecast
+# -------------------------------
+def forecast_hierarchical(df: pd.DataFrame, max_workers: int = None, sku_timeout: float = None,
+                          progress=None, backend: str = None, horizon: int = None,
+                          freq: str = None) -> pd.DataFrame:
+    """
+    Forecast every SKU in ``df`` top-down from store/category aggregates.
+
+    Sales are summed per node of the hierarchy's lowest level (every
+    combination of the ``HIERARCHY_COLUMNS`` present), one model is fitted per
+    node, and each SKU gets its node's forecast scaled by its share of recent
+    node sales; quantiles are scaled the same way. A SKU stocked under several
+    nodes (e.g. in several stores) gets the sum over them. Sparse SKUs that the
+    per-SKU path would skip are covered by their node.
+
+    Returns the same frame as ``forecast_demand``; node failures are reported
+    in ``attrs["errors"]`` once per affected SKU. ``progress`` counts nodes.
+    Without hierarchy columns this is plain ``forecast_demand``.
+    """
+    levels = hierarchy_levels(df)
+    if not levels:
+        logger.warning(f"⚠️ No hierarchy columns ({', '.join(HIERARCHY_COLUMNS)}) in upload; forecasting per SKU.")
+        return forecast_demand(df, max_workers=max_workers, sku_timeout=sku_timeout,
+                               progress=progress, backend=backend, horizon=horizon, freq=freq)
+
+    try:
+        # assign() copies, so the caller's frame keeps its own date column.
+        df = df.assign(date=parse_dates(df["date"]))
+    except Exception as e:
+        logger.error(f"❌ Failed to parse 'date' column: {e}")
+        raise ValueError("Invalid date format in input data.")
+
+    with metrics.stage("hierarchy.aggregate"):
+        node = _node_keys(df, levels)
+        aggregate = (
+            pd.DataFrame({
+                "sku": node.to_numpy(),
+                "date": df["date"].to_numpy(),
+                "sales": df["sales"].to_numpy(dtype="float64"),
+                "inventory": df["inventory"].to_numpy(dtype="float64"),
+            })
+            .groupby(["sku", "date"], sort=False)
+            .sum()
+            .reset_index()
+        )
+        shares = _proportions(df, node)
+
+    logger.info(f"🌳 Forecasting {shares['sku'].nunique()} SKUs from {aggregate['sku'].nunique()} "
+                f"{'/'.join(levels)} aggregates.")
+    node_forecast = forecast_demand(aggregate, max_workers=max_workers, sku_timeout=sku_timeout,
+                                    progress=progress, backend=backend, horizon=horizon, freq=freq)
+
+    with metrics.stage("hierarchy.disaggregate"):
+        rows = shares.merge(node_forecast.rename(columns={"sku": "node"}), on="node")
+        rows[VALUE_COLUMNS] = rows[VALUE_COLUMNS].astype("float64").mul(rows["share"], axis=0)
+        result = rows.groupby(["sku", "date"], sort=False)[VALUE_COLUMNS].sum().reset_index()
+        result[QUANTILE_COLUMNS] = result[QUANTILE_COLUMNS].astype("float32")
+        result = result[["date", "prediction", "sku"] + QUANTILE_COLUMNS]
+
+    errors = []
+    members = shares.groupby("node", sort=False)["sku"].agg(list)
+    for error in node_forecast.attrs.get("errors", []):
+        for sku in members.get(error["sku"], []):
+            errors.append({"sku": sku, "stage": error["stage"], "error": f"{error['sku']}: {error['error']}"})
+    if errors:
+        logger.warning(f"⚠️ {len(errors)} SKUs have no forecast because their aggregate failed.")
+
+    result.attrs.update(node_forecast.attrs, errors=errors)
+    return result
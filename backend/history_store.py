@@ -0,0 +1,229 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+from contextlib import closing, contextmanager
+
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, File, HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from config import HISTORY_DB_PATH
+from model import forecast_demand
+from pipeline import build_response
+from utils import parse_csv, CSVSchemaError
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HISTORY_COLUMNS = ["sku", "date", "sales", "inventory", "product_name", "expiry_date"]
+VALUE_COLUMNS = ["sales", "inventory", "product_name", "expiry_date"]
+# Error stages that new rows, not a retry, would fix
+SETTLED_ERROR_STAGES = ("skipped", "validation")
+
+
+# -------------------------------
+# SQLite Per-SKU History Store
+# -------------------------------
+class HistoryStore:
+    """
+    Append-only sales history, latest forecasts and fit parameters per SKU.
+
+    SKUs whose history changed stay in ``stale_skus`` until a reforecast for
+    them is saved, so a failed or interrupted reforecast is retried on the
+    next append.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sales_history (
+                    sku TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    sales REAL,
+                    inventory REAL,
+                    product_name TEXT,
+                    expiry_date TEXT,
+                    PRIMARY KEY (sku, date)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS sku_forecasts (
+                    sku TEXT NOT NULL,
+                    date TEXT NOT NULL,
+                    prediction REAL,
+                    PRIMARY KEY (sku, date)
+                )
+            """)
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS fit_params (
+                    sku TEXT PRIMARY KEY,
+                    params TEXT NOT NULL,
+                    updated_at REAL NOT NULL
+                )
+            """)
+            conn.execute("CREATE TABLE IF NOT EXISTS stale_skus (sku TEXT PRIMARY KEY)")
+
+    @contextmanager
+    def _connect(self):
+        """A connection for one transaction: committed on success, rolled back on error, then closed."""
+        with closing(sqlite3.connect(self.path, timeout=30)) as conn:
+            with conn:
+                yield conn
+
+    def append(self, rows: pd.DataFrame) -> list:
+        """
+        Upsert new or corrected rows and mark their SKUs stale; return the
+        SKUs whose history changed.
+
+        Rows identical to what is already stored are ignored, so re-sending a
+        day is free.
+        """
+        incoming = rows.reindex(columns=HISTORY_COLUMNS).copy()
+        incoming["sku"] = incoming["sku"].astype(str)
+        incoming["date"] = pd.to_datetime(incoming["date"]).dt.strftime("%Y-%m-%d")
+        incoming["sales"] = incoming["sales"].astype("float64")
+        incoming["inventory"] = incoming["inventory"].astype("float64")
+        for col in ("product_name", "expiry_date"):
+            incoming[col] = incoming[col].astype(object).where(incoming[col].notna(), None)
+        incoming = incoming.drop_duplicates(["sku", "date"], keep="last")
+
+        with self._connect() as conn:
+            # TEMP tables are private to this connection, so concurrent appends don't collide
+            conn.execute("CREATE TEMP TABLE incoming_keys (sku TEXT, date TEXT)")
+            conn.executemany("INSERT INTO incoming_keys VALUES (?, ?)",
+                             incoming[["sku", "date"]].itertuples(index=False, name=None))
+            existing = pd.read_sql_query(
+                "SELECT h.* FROM sales_history h JOIN incoming_keys k ON h.sku = k.sku AND h.date = k.date",
+                conn,
+            )
+            conn.execute("DROP TABLE incoming_keys")
+
+            merged = incoming.merge(existing, on=["sku", "date"], how="left", suffixes=("", "_old"), indicator=True)
+            changed = merged["_merge"] == "left_only"
+            for col in VALUE_COLUMNS:
+                new, old = merged[col], merged[f"{col}_old"]
+                changed |= ~((new == old) | (new.isna() & old.isna()))
+            to_write = incoming[changed.to_numpy()]
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO sales_history (sku, date, sales, inventory, product_name, expiry_date) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                to_write.astype(object).where(to_write.notna(), None).itertuples(index=False, name=None),
+            )
+            changed_skus = sorted(to_write["sku"].unique().tolist())
+            conn.executemany("INSERT OR IGNORE INTO stale_skus (sku) VALUES (?)", ((sku,) for sku in changed_skus))
+
+        logger.info(f"🗂️ Stored {len(to_write)} new/changed rows across {len(changed_skus)} SKUs")
+        return changed_skus
+
+    def load_history(self, skus: list) -> pd.DataFrame:
+        with self._connect() as conn:
+            conn.execute("CREATE TEMP TABLE wanted_skus (sku TEXT)")
+            conn.executemany("INSERT INTO wanted_skus VALUES (?)", ((sku,) for sku in skus))
+            history = pd.read_sql_query(
+                "SELECT h.* FROM sales_history h JOIN wanted_skus w ON h.sku = w.sku ORDER BY h.sku, h.date",
+                conn,
+            )
+            conn.execute("DROP TABLE wanted_skus")
+        history["date"] = pd.to_datetime(history["date"])
+        for col in ("sales", "inventory"):
+            if history[col].notna().all() and np.all(np.mod(history[col], 1) == 0):
+                history[col] = history[col].astype("int64")
+        history["sku"] = history["sku"].astype("category")
+        return history
+
+    def load_params(self, skus: list) -> dict:
+        if not skus:
+            return {}
+        with self._connect() as conn:
+            placeholders = ", ".join("?" for _ in skus)
+            rows = conn.execute(f"SELECT sku, params FROM fit_params WHERE sku IN ({placeholders})", skus).fetchall()
+        return {sku: json.loads(params) for sku, params in rows}
+
+    def stale_skus(self) -> list:
+        with self._connect() as conn:
+            return [sku for (sku,) in conn.execute("SELECT sku FROM stale_skus ORDER BY sku")]
+
+    def save_results(self, forecast_df: pd.DataFrame, fit_params: dict):
+        """
+        Store fresh forecasts and fit parameters. Their SKUs, and SKUs that
+        failed for lack of data rather than a fit error or timeout, are no
+        longer stale.
+        """
+        skus = forecast_df["sku"].astype(str).unique().tolist()
+        settled = skus + [str(e["sku"]) for e in forecast_df.attrs.get("errors", [])
+                          if e["stage"] in SETTLED_ERROR_STAGES]
+        rows = forecast_df.assign(
+            sku=forecast_df["sku"].astype(str),
+            date=pd.to_datetime(forecast_df["date"]).dt.strftime("%Y-%m-%d"),
+        )[["sku", "date", "prediction"]]
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM sku_forecasts WHERE sku = ?", ((sku,) for sku in skus))
+            conn.executemany(
+                "INSERT INTO sku_forecasts (sku, date, prediction) VALUES (?, ?, ?)",
+                rows.itertuples(index=False, name=None),
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO fit_params (sku, params, updated_at) VALUES (?, ?, ?)",
+                ((sku, json.dumps(params), now) for sku, params in fit_params.items()),
+            )
+            conn.executemany("DELETE FROM stale_skus WHERE sku = ?", ((sku,) for sku in settled))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store() -> HistoryStore:
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = HistoryStore(HISTORY_DB_PATH)
+        return _store
+
+
+# -------------------------------
+# Incremental Update
+# -------------------------------
+def apply_update(rows: pd.DataFrame) -> dict:
+    """
+    Append ``rows`` and reforecast only the SKUs they changed, plus any whose
+    earlier reforecast failed or never finished.
+    """
+    store = get_store()
+    changed_skus = store.append(rows)
+    skus = sorted(set(changed_skus) | set(store.stale_skus()))
+    if not skus:
+        return {"updated_skus": [], "forecast": [], "alerts": [], "errors": []}
+
+    history = store.load_history(skus)
+    warm_start = store.load_params(skus)
+    logger.info(f"♻️ Reforecasting {len(skus)} changed or stale SKUs ({len(warm_start)} warm-started)")
+
+    forecast_df = forecast_demand(history, warm_start=warm_start)
+    store.save_results(forecast_df, forecast_df.attrs.get("fit_params", {}))
+
+    response = build_response(history, forecast_df)
+    response["updated_skus"] = changed_skus
+    return response
+
+
+router = APIRouter()
+
+@router.post("/history/append")
+async def append_history(file: UploadFile = File(...)):
+    """Accept only the new rows (e.g. one day per SKU) and reforecast what changed."""
+    try:
+        rows = await run_in_threadpool(parse_csv, file.file)
+    except CSVSchemaError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_in_threadpool(apply_update, rows)
@@ -0,0 +1,120 @@
+import logging
+import threading
+
+import holidays
+import numpy as np
+import pandas as pd
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HOLIDAY_COUNTRY = "IN"
+
+
+def _to_days(dates) -> np.ndarray:
+    """Coerce dates (Series, Index, list, scalar) to a datetime64[D] array."""
+    values = np.atleast_1d(np.asarray(dates))
+    if not np.issubdtype(values.dtype, np.datetime64):
+        values = np.asarray(pd.to_datetime(values))
+    return values.astype("datetime64[D]")
+
+
+# -------------------------------
+# Sorted-array Holiday Index
+# -------------------------------
+class HolidayCalendar:
+    """Holidays for a fixed set of years, stored as sorted date/name arrays."""
+
+    def __init__(self, years, country: str = HOLIDAY_COUNTRY):
+        self.country = country
+        self.years = frozenset(int(y) for y in years)
+        country_holidays = holidays.CountryHoliday(country, years=sorted(self.years))
+
+        items = sorted(country_holidays.items())
+        self.dates = np.array([d for d, _ in items], dtype="datetime64[D]")
+        self.names = np.array([name for _, name in items], dtype=object)
+
+    def covers(self, years) -> bool:
+        return set(years) <= self.years
+
+    def _lookup(self, days: np.ndarray):
+        if len(self.dates) == 0:
+            return np.zeros(len(days), dtype=np.intp), np.zeros(len(days), dtype=bool)
+        idx = np.searchsorted(self.dates, days)
+        idx = np.minimum(idx, len(self.dates) - 1)
+        return idx, self.dates[idx] == days
+
+    def is_holiday(self, dates) -> np.ndarray:
+        _, hit = self._lookup(_to_days(dates))
+        return hit.astype(np.int64)
+
+    def holiday_name(self, dates) -> np.ndarray:
+        idx, hit = self._lookup(_to_days(dates))
+        return np.where(hit, self.names[idx], None)
+
+
+# -------------------------------
+# Shared Calendar
+# -------------------------------
+_calendar = None
+_calendar_lock = threading.Lock()
+
+
+def _years_of(days: np.ndarray) -> set:
+    days = days[~np.isnat(days)]
+    if len(days) == 0:
+        return set()
+    first, last = days.min().astype(object).year, days.max().astype(object).year
+    return set(range(first, last + 1))
+
+
+def get_calendar(dates=None) -> HolidayCalendar:
+    """Return the shared calendar, extending it to cover the years in ``dates``."""
+    global _calendar
+    years = _years_of(_to_days(dates)) if dates is not None else set()
+
+    calendar = _calendar
+    if calendar is not None and calendar.covers(years):
+        return calendar
+
+    with _calendar_lock:
+        if _calendar is None or not _calendar.covers(years):
+            known = _calendar.years if _calendar is not None else set()
+            _calendar = HolidayCalendar(set(known) | years)
+            logger.info(f"📅 Built holiday calendar for {sorted(_calendar.years)}")
+        return _calendar
+
+
+def _period_days(days: np.ndarray, period_days: int) -> np.ndarray:
+    """``(len(days), period_days)`` grid of the days each period covers."""
+    return days[:, None] + np.arange(period_days)
+
+
+def is_holiday(dates, period_days: int = 1) -> np.ndarray:
+    """
+    Vectorized 0/1 holiday flag for every date in ``dates``. With
+    ``period_days`` > 1 each date starts a period (e.g. a week) that is
+    flagged if any of its days is a holiday.
+    """
+    days = _to_days(dates)
+    if period_days == 1:
+        return get_calendar(days).is_holiday(days)
+    grid = _period_days(days, period_days)
+    return get_calendar(grid.ravel()).is_holiday(grid.ravel()).reshape(grid.shape).max(axis=1)
+
+
+def holiday_name(dates, period_days: int = 1) -> np.ndarray:
+    """
+    Vectorized holiday name (``None`` on regular days) for every date in
+    ``dates``; for periods, the first holiday within each one.
+    """
+    days = _to_days(dates)
+    if period_days == 1:
+        return get_calendar(days).holiday_name(days)
+    grid = _period_days(days, period_days)
+    names = get_calendar(grid.ravel()).holiday_name(grid.ravel()).reshape(grid.shape)
+    first = np.argmax(names != None, axis=1)  # noqa: E711 (elementwise)
+    return names[np.arange(len(days)), first]
@@ -0,0 +1,436 @@
+import json
+import logging
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import List
+
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, File, HTTPException, Query, Request, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import FileResponse, Response
+
+from config import (
+    FORECAST_MAX_HORIZON_PERIODS,
+    JOBS_DB_PATH,
+    JOBS_UPLOAD_DIR,
+    JOBS_RESULT_DIR,
+    JOBS_MAX_CONCURRENT,
+)
+from pipeline import run_prediction, frame_records
+from columnar import (
+    ARROW,
+    COLUMNAR_FORMATS,
+    JSON,
+    MEDIA_TYPES,
+    PARQUET,
+    UploadFormatError,
+    encode_table,
+    negotiate,
+    read_columnar,
+    read_result,
+    read_schema,
+    sniff_format,
+    with_side_tables,
+)
+from utils import parse_csv, missing_columns
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+PROGRESS_WRITE_INTERVAL_SECONDS = 0.5
+RESULT_CACHE_JOBS = 4  # finished results kept loaded for per-SKU/page reads
+MAX_PAGE_SIZE = 500
+
+# Identifies this server process even if a restarted one reuses its PID.
+_WORKER_ID = f"{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _worker_alive(worker_id: str) -> bool:
+    pid = int(worker_id.split(":", 1)[0])
+    if pid == os.getpid():
+        return worker_id == _WORKER_ID
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+# -------------------------------
+# SQLite Job Store
+# -------------------------------
+class JobStore:
+    """Job status, progress and results, persisted in a local SQLite file."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    filename TEXT,
+                    worker TEXT,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    skus_done INTEGER NOT NULL DEFAULT 0,
+                    skus_total INTEGER,
+                    result TEXT,
+                    error TEXT
+                )
+            """)
+        self._fail_orphans()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def _fail_orphans(self):
+        """Jobs owned by a process that no longer exists will never finish."""
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT id, worker FROM jobs WHERE status IN ('queued', 'running')"
+            ).fetchall()
+            for job_id, worker in rows:
+                if worker is None or not _worker_alive(worker):
+                    conn.execute(
+                        "UPDATE jobs SET status = 'failed', error = ?, updated_at = ? WHERE id = ?",
+                        ("Interrupted by server restart", time.time(), job_id),
+                    )
+
+    def create(self, filename: str) -> str:
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT INTO jobs (id, status, filename, worker, created_at, updated_at) "
+                "VALUES (?, 'queued', ?, ?, ?, ?)",
+                (job_id, filename, _WORKER_ID, now, now),
+            )
+        return job_id
+
+    def _update(self, job_id: str, **fields):
+        fields["updated_at"] = time.time()
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        with self._connect() as conn:
+            conn.execute(f"UPDATE jobs SET {assignments} WHERE id = ?", (*fields.values(), job_id))
+
+    def mark_running(self, job_id: str):
+        self._update(job_id, status="running")
+
+    def set_progress(self, job_id: str, done: int, total: int):
+        self._update(job_id, skus_done=done, skus_total=total)
+
+    def finish(self, job_id: str):
+        # The result itself lives in an Arrow file (see ``result_path``)
+        self._update(job_id, status="completed")
+
+    def fail(self, job_id: str, error: str):
+        self._update(job_id, status="failed", error=error)
+
+    def get(self, job_id: str):
+        with self._connect() as conn:
+            conn.row_factory = sqlite3.Row
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return dict(row) if row is not None else None
+
+
+def result_path(job_id: str) -> str:
+    return os.path.join(JOBS_RESULT_DIR, f"{job_id}.arrow")
+
+
+def _save_result(job_id: str, data):
+    os.makedirs(JOBS_RESULT_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=JOBS_RESULT_DIR, suffix=".tmp")
+    with os.fdopen(fd, "wb") as out:
+        out.write(data)
+    os.replace(tmp_path, result_path(job_id))
+
+
+def _result_dict(job: dict):
+    """The JSON ``forecast/alerts/waste/errors`` result of a finished job."""
+    if job["result"]:
+        # Jobs finished before results moved to Arrow files
+        return json.loads(job["result"])
+    path = result_path(job["id"])
+    if job["status"] != "completed" or not os.path.exists(path):
+        return None
+    result = _load_result(path, os.stat(path).st_mtime_ns)
+    return {
+        "forecast": frame_records(result.table.to_pandas()),
+        "alerts": result.alerts,
+        "waste": list(result.waste.values()),
+        "errors": result.errors,
+    }
+
+class LoadedResult:
+    """
+    A finished job's Arrow result, memory-mapped, indexed for per-SKU reads.
+
+    Rows are grouped by SKU once (a stable argsort), so a SKU's series is a
+    small ``take`` instead of a scan of the whole forecast.
+    """
+
+    def __init__(self, path: str):
+        self.table, side_tables = read_result(path)
+        self.alerts = side_tables.get("alerts", [])
+        self.errors = side_tables.get("errors", [])
+        self.blocks = {str(block["sku"]): block for block in self.alerts}
+        self.waste = {str(record["sku"]): record for record in side_tables.get("waste", [])}
+
+        skus = np.asarray(self.table.column("sku").to_pandas().astype(str), dtype=object)
+        self.skus = list(pd.unique(skus))
+        self._order = np.argsort(skus, kind="stable")
+        ordered = skus[self._order]
+        starts = np.flatnonzero(np.r_[True, ordered[1:] != ordered[:-1]]) if len(ordered) else np.array([], dtype=int)
+        ends = np.r_[starts[1:], len(ordered)]
+        self._rows = {ordered[start]: (start, end) for start, end in zip(starts, ends)}
+
+    def sku_table(self, sku: str):
+        if sku not in self._rows:
+            return None
+        start, end = self._rows[sku]
+        return self.table.take(self._order[start:end])
+
+
+@lru_cache(maxsize=RESULT_CACHE_JOBS)
+def _load_result(path: str, mtime_ns: int) -> LoadedResult:
+    # mtime is part of the key so a rewritten file is never served stale
+    return LoadedResult(path)
+
+
+def loaded_result(job: dict) -> LoadedResult:
+    path = result_path(job["id"])
+    if job["status"] != "completed" or not os.path.exists(path):
+        raise HTTPException(status_code=409, detail=f"Job {job['id']} has no stored result ({job['status']})")
+    return _load_result(path, os.stat(path).st_mtime_ns)
+
+# -------------------------------
+# Worker Pool
+# -------------------------------
+_store = None
+_executor = None
+_init_lock = threading.Lock()
+
+
+def get_store() -> JobStore:
+    global _store
+    with _init_lock:
+        if _store is None:
+            _store = JobStore(JOBS_DB_PATH)
+        return _store
+
+
+def _get_executor() -> ThreadPoolExecutor:
+    # Job threads only orchestrate; the heavy per-SKU fits run in
+    # forecast_demand's process pool, so the event loop stays responsive.
+    global _executor
+    with _init_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=JOBS_MAX_CONCURRENT, thread_name_prefix="forecast-job")
+        return _executor
+
+
+def _run_job(job_id: str, upload_path: str, horizon: int = None, freq: str = None):
+    store = get_store()
+    last_write = 0.0
+
+    def progress(done, total):
+        nonlocal last_write
+        now = time.monotonic()
+        if done == total or now - last_write >= PROGRESS_WRITE_INTERVAL_SECONDS:
+            store.set_progress(job_id, done, total)
+            last_write = now
+
+    try:
+        store.mark_running(job_id)
+        upload_format = sniff_format(upload_path)
+        if upload_format in COLUMNAR_FORMATS:
+            df = read_columnar(upload_path, upload_format)
+        else:
+            df = parse_csv(upload_path)
+        store.set_progress(job_id, 0, df["sku"].nunique())
+
+        logger.info(f"🧵 Running forecast job {job_id}")
+        result = run_prediction(df, progress=progress, response_format=ARROW, horizon=horizon, freq=freq)
+        _save_result(job_id, result)
+        store.finish(job_id)
+        logger.info(f"✅ Forecast job {job_id} completed")
+    except Exception as e:
+        logger.exception(f"❌ Forecast job {job_id} failed")
+        store.fail(job_id, str(e))
+    finally:
+        os.remove(upload_path)
+
+
+def submit_job(upload_path: str, filename: str, horizon: int = None, freq: str = None) -> str:
+    job_id = get_store().create(filename)
+    _get_executor().submit(_run_job, job_id, upload_path, horizon, freq)
+    return job_id
+
+
+def _save_upload(file: UploadFile) -> str:
+    """Copy the upload to disk (the request's file is closed once we return)."""
+    os.makedirs(JOBS_UPLOAD_DIR, exist_ok=True)
+    fd, upload_path = tempfile.mkstemp(dir=JOBS_UPLOAD_DIR, suffix=".upload")
+    with os.fdopen(fd, "wb") as out:
+        shutil.copyfileobj(file.file, out)
+
+    upload_format = sniff_format(upload_path)
+    try:
+        if upload_format in COLUMNAR_FORMATS:
+            columns = read_schema(upload_path, upload_format)
+        else:
+            columns = pd.read_csv(upload_path, nrows=0).columns
+    except Exception as e:
+        os.remove(upload_path)
+        detail = str(e) if isinstance(e, UploadFormatError) else f"Could not parse CSV: {e}"
+        raise HTTPException(status_code=400, detail=detail)
+
+    missing = missing_columns(columns)
+    if missing:
+        os.remove(upload_path)
+        raise HTTPException(status_code=400, detail=f"Missing required columns: {missing}")
+    return upload_path
+
+
+# -------------------------------
+# Jobs API
+# -------------------------------
+router = APIRouter()
+
+@router.post("/jobs", status_code=202)
+async def create_job(
+    file: UploadFile = File(...),
+    horizon: int = Query(None, ge=1, le=FORECAST_MAX_HORIZON_PERIODS),
+    freq: str = Query(None, pattern="^[DdWw]$"),
+):
+    """
+    Accept a CSV, Parquet or Arrow upload and queue it for forecasting; returns
+    immediately. ``horizon``/``freq`` are as for ``/predict``.
+    """
+    upload_path = await run_in_threadpool(_save_upload, file)
+    job_id = submit_job(upload_path, file.filename, horizon, freq)
+    logger.info(f"📥 Queued forecast job {job_id} for {file.filename}")
+    return {"job_id": job_id, "status": "queued"}
+
+
+def _get_or_404(job_id: str) -> dict:
+    job = get_store().get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job: {job_id}")
+    return job
+
+
+@router.get("/jobs/{job_id}")
+def get_job(job_id: str, result: bool = True):
+    """
+    Job status and progress, plus the JSON result once completed.
+
+    Pollers should pass ``result=false`` and fetch ``/jobs/{job_id}/result``
+    when the job is done.
+    """
+    # Plain def: decoding a large stored result runs in the threadpool.
+    job = _get_or_404(job_id)
+
+    return {
+        "job_id": job["id"],
+        "status": job["status"],
+        "filename": job["filename"],
+        "progress": {"skus_done": job["skus_done"], "skus_total": job["skus_total"]},
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"],
+        "error": job["error"],
+        "result": _result_dict(job) if result else None,
+    }
+
+
+@router.get("/jobs/{job_id}/result")
+def get_job_result(job_id: str, request: Request):
+    """
+    A completed job's result, as an Arrow IPC stream by default (alerts, waste
+    and errors in the schema metadata), or as Parquet/JSON per ``Accept``.
+    """
+    job = _get_or_404(job_id)
+    if job["status"] != "completed":
+        raise HTTPException(status_code=409, detail=f"Job {job_id} is {job['status']}")
+
+    response_format = negotiate(request.headers.get("accept"), default=ARROW)
+    path = result_path(job_id)
+    if response_format == JSON or not os.path.exists(path):
+        return _result_dict(job)
+    if response_format == PARQUET:
+        table, _ = read_result(path)
+        return Response(content=encode_table(table, PARQUET), media_type=MEDIA_TYPES[PARQUET])
+    # The stored file is already the response body
+    return FileResponse(path, media_type=MEDIA_TYPES[ARROW])
+
+
+@router.get("/jobs/{job_id}/skus")
+def get_job_skus(job_id: str):
+    """Every SKU in a completed job's result, in upload order."""
+    return {"skus": loaded_result(_get_or_404(job_id)).skus}
+
+
+@router.get("/jobs/{job_id}/alerts")
+def get_job_alerts(
+    job_id: str,
+    severity: List[str] = Query(None),
+    page: int = Query(1, ge=1),
+    page_size: int = Query(50, ge=1, le=MAX_PAGE_SIZE),
+):
+    """
+    One page of a completed job's per-SKU alert blocks. With ``severity``,
+    only SKUs that have an alert of one of those severities are listed.
+    """
+    blocks = loaded_result(_get_or_404(job_id)).alerts
+    if severity:
+        wanted = set(severity)
+        blocks = [block for block in blocks
+                  if any(alert.get("severity") in wanted for alert in block.get("alerts", []))]
+    start = (page - 1) * page_size
+    return {
+        "total": len(blocks),
+        "page": page,
+        "page_size": page_size,
+        "items": blocks[start:start + page_size],
+    }
+
+
+@router.get("/jobs/{job_id}/sku/{sku:path}")
+def get_job_sku(job_id: str, sku: str, request: Request):
+    """
+    One SKU's forecast rows, alert block and waste projection from a completed
+    job, as JSON or (per ``Accept``) an Arrow IPC stream with the alert block
+    and waste record in the schema metadata.
+    """
+    result = loaded_result(_get_or_404(job_id))
+    table = result.sku_table(sku)
+    if table is None:
+        raise HTTPException(status_code=404, detail=f"Unknown SKU in job {job_id}: {sku}")
+
+    alerts, waste = result.blocks.get(sku), result.waste.get(sku)
+    response_format = negotiate(request.headers.get("accept"))
+    if response_format in COLUMNAR_FORMATS:
+        errors = [error for error in result.errors if str(error["sku"]) == sku]
+        table = with_side_tables(table, alerts=[alerts] if alerts else [], waste=[waste] if waste else [], errors=errors)
+        return Response(content=encode_table(table, response_format), media_type=MEDIA_TYPES[response_format])
+    return {
+        "sku": sku,
+        "forecast": frame_records(table.to_pandas()),
+        "alerts": alerts,
+        "waste": waste,
+    }
@@ -1,23 +1,66 @@
-from fastapi import FastAPI, File, UploadFile
+from fastapi import FastAPI, File, UploadFile, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.exceptions import RequestValidationError
-from fastapi.responses import JSONResponse
-from starlette.status import HTTP_400_BAD_REQUEST, HTTP_500_INTERNAL_SERVER_ERROR
+from fastapi.responses import JSONResponse, StreamingResponse, PlainTextResponse, Response
+from fastapi.encoders import jsonable_encoder
+from starlette.status import (
+    HTTP_304_NOT_MODIFIED,
+    HTTP_400_BAD_REQUEST,
+    HTTP_500_INTERNAL_SERVER_ERROR,
+    HTTP_503_SERVICE_UNAVAILABLE,
+)
 from fastapi.routing import APIRouter
+from fastapi.concurrency import run_in_threadpool
 
 import logging
-import pandas as pd
-from io import StringIO
-import math
-
-from model import forecast_demand
-from alerts import generate_alerts
+import time
+from contextlib import asynccontextmanager
+
+from pipeline import run_prediction_stream, run_prediction_columnar, iter_prediction_ndjson
+from columnar import (
+    COLUMNAR_FORMATS,
+    MEDIA_TYPES,
+    NDJSON,
+    UploadFormatError,
+    negotiate,
+    read_columnar,
+    result_errors,
+    sniff_format,
+)
+from utils import CSVSchemaError, EMPTY_UPLOAD_MESSAGE, read_head, missing_columns
+from model import resolve_frequency
+from model_cache import cache_stats
+import metrics
+import response_cache
+from config import (
+    FORECAST_MAX_HORIZON_PERIODS,
+    METRICS_ENABLED,
+    METRICS_TIMING_HEADER,
+    RESPONSE_CACHE_ENABLED,
+    WARMUP_ENABLED,
+)
+import warmup
+from jobs import router as jobs_router
+from history_store import router as history_router
+from simulate import router as simulate_router
+
+# ---------------------- Warm-up ----------------------
+@asynccontextmanager
+async def lifespan(app):
+    # Runs before the worker accepts connections
+    metrics.share_across_processes()
+    if WARMUP_ENABLED:
+        await run_in_threadpool(warmup.warm_up)
+    else:
+        warmup.mark_ready()
+    yield
 
 # ---------------------- Setup FastAPI App ----------------------
 app = FastAPI(
     title="AI Inventory Waste Reduction API",
     version="1.0.0",
-    description="A FastAPI backend for demand forecasting and smart alerting."
+    description="A FastAPI backend for demand forecasting and smart alerting.",
+    lifespan=lifespan,
 )
 
 app.add_middleware(
@@ -31,19 +74,18 @@ app.add_middleware(
 # ---------------------- Logging Setup ----------------------
 logging.basicConfig(level=logging.INFO)
 
-# ---------------------- Utility: JSON Sanitizer ----------------------
-def sanitize_json(data):
-    """Recursively clean JSON-unsafe values like NaN and Inf."""
-    if isinstance(data, dict):
-        return {k: sanitize_json(v) for k, v in data.items()}
-    elif isinstance(data, list):
-        return [sanitize_json(item) for item in data]
-    elif isinstance(data, float):
-        if math.isnan(data) or math.isinf(data):
-            return None
-        return data
-    else:
-        return data
+# ---------------------- Request Metrics ----------------------
+if METRICS_ENABLED:
+    @app.middleware("http")
+    async def record_request_metrics(request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        # Route templates (e.g. /jobs/{job_id}) keep label cardinality bounded
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        metrics.HTTP_SECONDS.observe(time.perf_counter() - started, method=request.method, path=path)
+        metrics.HTTP_REQUESTS.inc(method=request.method, path=path, status=response.status_code)
+        return response
 
 # ---------------------- Exception Handlers ----------------------
 @app.exception_handler(RequestValidationError)
@@ -65,54 +107,129 @@ async def generic_exception_handler(request, exc):
 # ---------------------- Prediction Endpoint ----------------------
 router = APIRouter()
 
+@router.get("/health")
+async def health():
+    """200 once this worker has warmed up, 503 before that (or if warm-up failed)."""
+    state = warmup.status()
+    if not state["ready"]:
+        return JSONResponse(status_code=HTTP_503_SERVICE_UNAVAILABLE, content={"status": "starting", "warmup": state})
+    return {"status": "OK", "warmup": state}
+
 @router.post("/predict")
-async def predict(file: UploadFile = File(...)):
+async def predict(
+    request: Request,
+    file: UploadFile = File(...),
+    response_format: str = Query(None, alias="format", pattern="^(json|ndjson|arrow|parquet)$"),
+    horizon: int = Query(None, ge=1, le=FORECAST_MAX_HORIZON_PERIODS),
+    freq: str = Query(None, pattern="^[DdWw]$"),
+):
+    """
+    Forecast a CSV, Parquet or Arrow IPC upload (detected from its content).
+
+    The response is JSON unless ``?format=`` or the ``Accept`` header asks for
+    NDJSON, an Arrow IPC stream or Parquet. ``freq=W`` forecasts weekly totals
+    instead of days; ``horizon`` is the number of periods to forecast.
+
+    Responses carry an ``ETag`` derived from the upload bytes, the parameters
+    and the model version. Repeating a request replays the cached response,
+    or answers 304 if ``If-None-Match`` already names that ETag.
+    """
+    response_format = response_format or negotiate(request.headers.get("accept"))
     try:
-        content = await file.read()
-        df = pd.read_csv(StringIO(content.decode("utf-8")))
-
-        required_cols = {"date", "sku", "sales", "inventory"}
-        if not required_cols.issubset(df.columns):
-            return JSONResponse(
-                status_code=HTTP_400_BAD_REQUEST,
-                content={"error": f"Missing required columns: {required_cols - set(df.columns)}"}
+        cache_key = None
+        if RESPONSE_CACHE_ENABLED:
+            freq, _, horizon = resolve_frequency(freq, horizon)
+            params = {"format": response_format, "freq": freq, "horizon": horizon}
+            cache_key = await run_in_threadpool(response_cache.request_key, file.file, params)
+            headers = {"ETag": response_cache.etag(cache_key)}
+            if response_cache.not_modified(request.headers.get("if-none-match"), cache_key):
+                return Response(status_code=HTTP_304_NOT_MODIFIED, headers=headers)
+            cached = await run_in_threadpool(response_cache.load, cache_key)
+            if cached is not None:
+                media_type, body = cached
+                return Response(content=body, media_type=media_type, headers={**headers, "X-Cache": "hit"})
+
+        upload_format = await run_in_threadpool(sniff_format, file.file)
+        columnar_upload = upload_format in COLUMNAR_FORMATS
+
+        if response_format == NDJSON:
+            # Validate up front: once streaming starts the status is already 200
+            if columnar_upload:
+                source = await run_in_threadpool(read_columnar, file.file, upload_format)
+            else:
+                head = await run_in_threadpool(read_head, file.file)
+                missing = missing_columns(head.columns)
+                if missing:
+                    raise CSVSchemaError(missing)
+                if head.empty:
+                    raise CSVSchemaError(message=EMPTY_UPLOAD_MESSAGE)
+                source = file.file
+            # One line per SKU, sent as soon as that SKU is forecast
+            lines = iter_prediction_ndjson(source, horizon, freq)
+            if cache_key is None:
+                return StreamingResponse(lines, media_type=MEDIA_TYPES[NDJSON])
+            return StreamingResponse(
+                response_cache.caching_stream(cache_key, MEDIA_TYPES[NDJSON], lines),
+                media_type=MEDIA_TYPES[NDJSON],
+                headers={**headers, "X-Cache": "miss"},
             )
 
-        logging.info("📊 Running demand forecast model...")
-        forecast_df = forecast_demand(df)
-
-        # ✅ Calculate max predicted day per SKU
-        max_idx = forecast_df.groupby("sku")["prediction"].idxmax()
-        max_days = forecast_df.loc[max_idx, ["sku", "date"]].rename(columns={"date": "max_predicted_day"})
-        forecast_df = pd.merge(forecast_df, max_days, on="sku", how="left")
-
-        # ✅ Handle product_name mapping BEFORE alerts
-        if "product_name" in df.columns:
-            sku_name_map = df[["sku", "product_name"]].dropna().drop_duplicates().set_index("sku")["product_name"].to_dict()
-            forecast_df["product_name"] = forecast_df["sku"].map(sku_name_map)
-        else:
-            forecast_df["product_name"] = "N/A"
-
-        # ✅ Now generate alerts AFTER product_name is added
-        logging.info("🚨 Generating alerts...")
-        alerts = generate_alerts(df, forecast_df)
-
-        # ✅ Merge forecast with actuals
-        merged = pd.merge(
-            forecast_df,
-            df[["date", "sku", "sales", "inventory"]],
-            on=["date", "sku"],
-            how="left"
+        # Parsing and forecasting are CPU-bound; keep them off the event loop.
+        # CSV uploads are parsed in chunks and SKUs are forecast as they complete.
+        with metrics.request_timings() as timings:
+            if columnar_upload:
+                result = await run_in_threadpool(
+                    run_prediction_columnar, file.file, upload_format, response_format, horizon, freq)
+            else:
+                result = await run_in_threadpool(
+                    run_prediction_stream, file.file, response_format, horizon, freq)
+            with metrics.stage("encode"):
+                if response_format in COLUMNAR_FORMATS:
+                    response = Response(content=result, media_type=MEDIA_TYPES[response_format])
+                else:
+                    response = JSONResponse(content=jsonable_encoder(result))
+        if cache_key is not None:
+            errors = (await run_in_threadpool(result_errors, result, response_format)
+                      if response_format in COLUMNAR_FORMATS else result["errors"])
+            await run_in_threadpool(response_cache.save, cache_key, response.media_type, response.body, errors)
+            response.headers.update({**headers, "X-Cache": "miss"})
+        if METRICS_TIMING_HEADER:
+            response.headers["X-Timing"] = metrics.timing_header(timings)
+        return response
+
+    except (CSVSchemaError, UploadFormatError) as e:
+        return JSONResponse(
+            status_code=HTTP_400_BAD_REQUEST,
+            content={"error": str(e)}
         )
-
-        return {
-            "forecast": sanitize_json(merged.to_dict(orient="records")),
-            "alerts": sanitize_json(alerts)
-        }
-
     except Exception as e:
         logging.exception("Error in /predict route")
         raise e
 
+# ---------------------- Model Cache Stats ----------------------
+@router.get("/cache/stats")
+def model_cache_stats():
+    """
+    Hit/miss counters and refit time saved by the fitted-model cache, plus
+    the ``/predict`` response cache's counters under ``responses``.
+    """
+    # Plain def: the stats rescan the cache directories, which blocks.
+    return {**cache_stats(), "responses": response_cache.stats()}
+
+# ---------------------- Prometheus Metrics ----------------------
+@router.get("/metrics")
+def prometheus_metrics():
+    """
+    Stage timings, fit-time histograms and SKU outcome counters (Prometheus
+    text format). Under ``serve.py --workers N`` every worker publishes its
+    counters to ``METRICS_MULTIPROC_DIR`` and any worker answers with the sum,
+    at most ``METRICS_FLUSH_SECONDS`` behind for the other workers.
+    """
+    # Plain def: the cache size gauges rescan the cache directories.
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 # ---------------------- Register Routes ----------------------
 app.include_router(router)
+app.include_router(jobs_router)
+app.include_router(history_router)
+app.include_router(simulate_router)
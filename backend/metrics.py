@@ -0,0 +1,345 @@
+import atexit
+import contextvars
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+
+from config import METRICS_ENABLED, METRICS_FLUSH_SECONDS, METRICS_MULTIPROC_DIR
+
+# Prometheus text format written by hand: the handful of counters and
+# histograms below don't justify another dependency. Values are kept per
+# process; with several server workers (serve.py) each worker also publishes
+# a snapshot to METRICS_MULTIPROC_DIR, and /metrics sums every snapshot there.
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+_NOOP = nullcontext()
+
+# Per-request stage breakdown (see ``request_timings``); ``None`` outside one.
+_request_timings = contextvars.ContextVar("request_timings", default=None)
+
+
+def _label_text(labelnames, values, extra=()) -> str:
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _number(value) -> str:
+    return "+Inf" if value == float("inf") else repr(float(value))
+
+# -------------------------------
+# Metric Types
+# -------------------------------
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return sorted(self._values.items())
+
+    @staticmethod
+    def add(left, right):
+        return left + right
+
+    def samples(self, items):
+        for key, value in items:
+            yield f"{self.name}{_label_text(self.labelnames, key)} {_number(value)}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        if not METRICS_ENABLED:
+            return
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        with self._lock:
+            counts, total = self._values.get(key, ([0] * len(self.buckets), 0.0))
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            self._values[key] = (counts, total + value)
+
+    def snapshot(self):
+        with self._lock:
+            return sorted((key, (list(counts), total)) for key, (counts, total) in self._values.items())
+
+    @staticmethod
+    def add(left, right):
+        return [a + b for a, b in zip(left[0], right[0])], left[1] + right[1]
+
+    def samples(self, items):
+        for key, (counts, total) in items:
+            for bound, count in zip(self.buckets, counts):
+                yield f"{self.name}_bucket{_label_text(self.labelnames, key, [('le', _number(bound))])} {count}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, key)} {_number(total)}"
+            yield f"{self.name}_count{_label_text(self.labelnames, key)} {counts[-1]}"
+
+# -------------------------------
+# Pipeline Metrics
+# -------------------------------
+STAGE_SECONDS = Histogram(
+    "pipeline_stage_seconds", "Wall time of each prediction pipeline stage.", ["stage"])
+SKU_FIT_SECONDS = Histogram(
+    "forecast_sku_fit_seconds", "Per-SKU model fit time (cached fits excluded).", ["backend"])
+BATCH_SECONDS = Histogram(
+    "forecast_batch_seconds", "Wall time of one batched-backend forecast call.", ["backend"])
+SKUS_FORECAST = Counter(
+    "forecast_skus_total", "SKUs forecast successfully.", ["backend"])
+SKU_ERRORS = Counter(
+    "forecast_sku_errors_total", "SKUs skipped, failed or timed out, by stage.", ["stage"])
+HTTP_REQUESTS = Counter(
+    "http_requests_total", "HTTP requests served.", ["method", "path", "status"])
+HTTP_SECONDS = Histogram(
+    "http_request_duration_seconds", "HTTP request latency.", ["method", "path"])
+
+REGISTRY = [STAGE_SECONDS, SKU_FIT_SECONDS, BATCH_SECONDS, SKUS_FORECAST, SKU_ERRORS, HTTP_REQUESTS, HTTP_SECONDS]
+
+
+def record_stage(name: str, seconds: float):
+    """Report ``seconds`` spent in stage ``name`` (histogram and current request)."""
+    if not METRICS_ENABLED:
+        return
+    STAGE_SECONDS.observe(seconds, stage=name)
+    timings = _request_timings.get()
+    if timings is not None:
+        timings[name] = timings.get(name, 0.0) + seconds
+
+
+@contextmanager
+def _timed_stage(name: str):
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_stage(name, time.perf_counter() - started)
+
+
+def stage(name: str):
+    """Time a block as pipeline stage ``name``; a shared no-op when metrics are off."""
+    if not METRICS_ENABLED:
+        return _NOOP
+    return _timed_stage(name)
+
+
+def timed_iter(iterable, name: str):
+    """
+    Pass ``iterable`` through, charging the time spent producing items to
+    ``name`` as a single observation once the iteration ends.
+    """
+    if not METRICS_ENABLED:
+        yield from iterable
+        return
+    iterator = iter(iterable)
+    spent = 0.0
+    try:
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            finally:
+                spent += time.perf_counter() - started
+            yield item
+    except StopIteration:
+        return
+    finally:
+        record_stage(name, spent)
+
+
+@contextmanager
+def request_timings():
+    """
+    Collect the stage timings of the current request into a dict.
+
+    Work handed to ``run_in_threadpool`` inside the block still reports here,
+    since the thread runs in a copy of this context that shares the dict.
+    """
+    timings = {}
+    token = _request_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _request_timings.reset(token)
+
+
+def timing_header(timings: dict) -> str:
+    """``X-Timing`` value: ``stage=seconds`` pairs in the order stages ran."""
+    return ", ".join(f"{name}={seconds:.4f}" for name, seconds in timings.items())
+
+# -------------------------------
+# Sharing Across Worker Processes
+# -------------------------------
+_flush_lock = threading.Lock()
+_snapshot_name = None
+_last_flushed = None
+
+
+def _process_snapshot() -> dict:
+    """This process's values, JSON-ready (label tuples become lists)."""
+    # Imported here so the metrics module stays free of Prophet imports.
+    import model_cache
+    import response_cache
+
+    return {
+        "metrics": {metric.name: [[list(key), value] for key, value in metric.snapshot()]
+                    for metric in REGISTRY},
+        "model_cache": model_cache.counters(),
+        "response_cache": response_cache.counters(),
+    }
+
+
+def _flush():
+    global _last_flushed
+    data = json.dumps(_process_snapshot())
+    with _flush_lock:
+        if _snapshot_name is None or data == _last_flushed:
+            return
+        path = os.path.join(METRICS_MULTIPROC_DIR, _snapshot_name)
+        try:
+            with open(path + ".tmp", "w") as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        except OSError as e:
+            logger.warning(f"⚠️ Failed to publish metrics to {METRICS_MULTIPROC_DIR}: {e}")
+            return
+        _last_flushed = data
+
+
+def _flush_loop():
+    while True:
+        time.sleep(METRICS_FLUSH_SECONDS)
+        _flush()
+
+
+def reset_multiproc_dir(path: str):
+    """Create ``path`` and drop snapshots left by a previous server run."""
+    os.makedirs(path, exist_ok=True)
+    for name in os.listdir(path):
+        if name.endswith((".json", ".json.tmp")):
+            os.remove(os.path.join(path, name))
+
+
+def share_across_processes():
+    """
+    Publish this process's values to ``METRICS_MULTIPROC_DIR`` every
+    ``METRICS_FLUSH_SECONDS`` (and at exit). No-op unless the directory is set.
+
+    Snapshots are named per process start, not just by PID, so a restarted
+    worker adds to the totals instead of overwriting its predecessor's.
+    """
+    global _snapshot_name
+    if not (METRICS_ENABLED and METRICS_MULTIPROC_DIR) or _snapshot_name is not None:
+        return
+    os.makedirs(METRICS_MULTIPROC_DIR, exist_ok=True)
+    _snapshot_name = f"{os.getpid()}-{time.time_ns()}.json"
+    threading.Thread(target=_flush_loop, name="metrics-flush", daemon=True).start()
+    atexit.register(_flush)
+
+
+def _snapshots():
+    if _snapshot_name is None:
+        return [_process_snapshot()]
+    _flush()
+    snapshots = []
+    for name in sorted(os.listdir(METRICS_MULTIPROC_DIR)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(METRICS_MULTIPROC_DIR, name)) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError) as e:
+            logger.warning(f"⚠️ Skipping unreadable metrics snapshot {name}: {e}")
+    return snapshots
+
+
+def _merged(metric, snapshots):
+    values = {}
+    for snapshot in snapshots:
+        for key, value in snapshot["metrics"].get(metric.name, []):
+            key = tuple(key)
+            values[key] = metric.add(values[key], value) if key in values else value
+    return sorted(values.items())
+
+
+def _summed(snapshots, section: str) -> dict:
+    totals = {}
+    for snapshot in snapshots:
+        for name, value in snapshot[section].items():
+            totals[name] = totals.get(name, 0) + value
+    return totals
+
+# -------------------------------
+# Exposition
+# -------------------------------
+def _cache_samples(snapshots):
+    # Hit/miss counters come from every worker's snapshot; the size gauges
+    # read the shared on-disk stores and are the same from every worker.
+    from model_cache import cache_stats
+
+    counts = _summed(snapshots, "model_cache")
+    yield "# HELP model_cache_hits_total Fitted-model cache hits."
+    yield "# TYPE model_cache_hits_total counter"
+    yield f"model_cache_hits_total {counts.get('hits', 0)}"
+    yield "# HELP model_cache_misses_total Fitted-model cache misses."
+    yield "# TYPE model_cache_misses_total counter"
+    yield f"model_cache_misses_total {counts.get('misses', 0)}"
+    stats = cache_stats()
+    if stats["enabled"]:
+        yield "# HELP model_cache_bytes Bytes held by the fitted-model cache."
+        yield "# TYPE model_cache_bytes gauge"
+        yield f"model_cache_bytes {stats['bytes']}"
+
+    from response_cache import stats as response_stats
+
+    counts = _summed(snapshots, "response_cache")
+    yield "# HELP response_cache_lookups_total /predict response cache lookups, by result."
+    yield "# TYPE response_cache_lookups_total counter"
+    for result in ("hits", "misses", "not_modified"):
+        yield f'response_cache_lookups_total{{result="{result}"}} {counts.get(result, 0)}'
+    stats = response_stats()
+    if stats["enabled"]:
+        yield "# HELP response_cache_bytes Bytes held by the response cache."
+        yield "# TYPE response_cache_bytes gauge"
+        yield f"response_cache_bytes {stats['bytes']}"
+
+
+def render() -> str:
+    """Prometheus text for this process, or for all workers sharing ``METRICS_MULTIPROC_DIR``."""
+    snapshots = _snapshots()
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.documentation}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples(_merged(metric, snapshots)))
+    lines.extend(_cache_samples(snapshots))
+    return "\n".join(lines) + "\n"
@@ -1,7 +1,43 @@
+import numpy as np
 import pandas as pd
+import prophet
 from prophet import Prophet
 import logging
-import holidays
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from collections import deque
+from concurrent.futures import CancelledError, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+from config import (
+    FORECAST_HORIZON_DAYS,
+    FORECAST_HORIZON_WEEKS,
+    FORECAST_FREQ,
+    FORECAST_FREQUENCIES,
+    FORECAST_DAILY_SEASONALITY,
+    FORECAST_MAX_WORKERS,
+    FORECAST_SKU_TIMEOUT_SECONDS,
+    FORECAST_BATCH_SKUS,
+    FORECAST_INTERVAL_WIDTH,
+    FORECAST_UNCERTAINTY_SAMPLES,
+)
+import model_cache
+import metrics
+from forecasters import (
+    GLOBAL,
+    PROPHET,
+    QUANTILE_COLUMNS,
+    get_forecaster,
+    period_start,
+    quantile_columns,
+    resolve_policy,
+    select_backend,
+)
+from holiday_calendar import is_holiday
+from utils import parse_dates
 
 # -------------------------------
 # Logging Setup
@@ -10,67 +46,619 @@ logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 # -------------------------------
-# Holiday Regressor Helper
+# Per-SKU Fit (runs in worker processes)
 # -------------------------------
-def is_indian_holiday(date):
-    india_holidays = holidays.CountryHoliday("IN")
-    return int(date in india_holidays)
+# Everything that changes the fitted parameters belongs here, since it is part
+# of the model cache key.
+PROPHET_CONFIG = {
+    "daily_seasonality": FORECAST_DAILY_SEASONALITY,
+    "regressors": ["is_holiday"],
+    "interval_width": FORECAST_INTERVAL_WIDTH,
+    "uncertainty_samples": FORECAST_UNCERTAINTY_SAMPLES,
+    "prophet_version": prophet.__version__,
+}
+
+
+def _stan_params(model) -> dict:
+    """Fitted parameters in the form Prophet accepts as ``fit(init=...)``."""
+    params = {name: float(model.params[name][0][0]) for name in ("k", "m", "sigma_obs")}
+    params.update({name: model.params[name][0].tolist() for name in ("delta", "beta")})
+    return params
+
+
+def _new_model() -> Prophet:
+    # A few hundred trend simulations give stable P10/P90 at a fraction of the
+    # default 1000 samples' predict cost.
+    model = Prophet(
+        daily_seasonality=PROPHET_CONFIG["daily_seasonality"],
+        interval_width=PROPHET_CONFIG["interval_width"],
+        uncertainty_samples=PROPHET_CONFIG["uncertainty_samples"],
+    )
+    for regressor in PROPHET_CONFIG["regressors"]:
+        model.add_regressor(regressor)
+    return model
+
+
+def _fit_sku(sku, sales_df: pd.DataFrame, periods: int, init: dict = None, period_days: int = 1):
+    """
+    Return ``(forecast_frame, cache_hit, fit_seconds, params)`` for one SKU,
+    whose rows (and forecast) are ``period_days`` apart.
+
+    ``init`` warm-starts the optimizer from a previous fit's parameters; if they
+    no longer fit the model's shape (e.g. more changepoints), it fits cold.
+    """
+    cache_key = model_cache.fingerprint(sales_df, PROPHET_CONFIG)
+    cached = model_cache.load_model(cache_key)
+
+    if cached is not None:
+        model, fit_seconds = cached
+        cache_hit = True
+    else:
+        model = _new_model()
+        started = time.perf_counter()
+        if init is not None:
+            try:
+                model.fit(sales_df, init={name: np.asarray(value) for name, value in init.items()})
+            except Exception as e:
+                logger.info(f"♨️ Warm start rejected for SKU '{sku}', fitting cold: {e}")
+                model = _new_model()
+                model.fit(sales_df)
+        else:
+            model.fit(sales_df)
+        fit_seconds = time.perf_counter() - started
+        model_cache.save_model(cache_key, model, fit_seconds)
+        cache_hit = False
+
+    future = model.make_future_dataframe(periods=periods, freq=f"{period_days}D")
+    future["is_holiday"] = is_holiday(future["ds"], period_days)
+
+    forecast = model.predict(future)
+    forecast_result = forecast[["ds", "yhat"]].rename(columns={
+        "ds": "date", "yhat": "prediction"
+    })
+    forecast_result["sku"] = sku
+    forecast_result = forecast_result.assign(**quantile_columns(
+        forecast["yhat_lower"], forecast["yhat"], forecast["yhat_upper"]
+    ))
+    return forecast_result, cache_hit, fit_seconds, _stan_params(model)
+
+
+def _collect(sku, outcome):
+    forecast_result, cache_hit, fit_seconds, params = outcome
+    model_cache.record(cache_hit, fit_seconds)
+    if not cache_hit:
+        metrics.SKU_FIT_SECONDS.observe(fit_seconds, backend=PROPHET)
+    metrics.SKUS_FORECAST.inc(backend=PROPHET)
+    forecast_result.attrs["fit"] = {"backend": PROPHET, "fit_seconds": round(fit_seconds, 4), "cached": cache_hit}
+    logger.info(f"✅ Forecast complete for SKU: {sku}{' (cached model)' if cache_hit else ''}")
+    return forecast_result, params
+
+
+def _sku_error(sku, stage: str, error) -> dict:
+    """One entry of the structured per-SKU error report."""
+    metrics.SKU_ERRORS.inc(stage=stage)
+    return {"sku": sku, "stage": stage, "error": str(error)}
+
+
+def _sales_frame(frame: pd.DataFrame, expiry: bool = False) -> pd.DataFrame:
+    """
+    Select and rename the columns a fit needs; raises ``KeyError`` if one is
+    missing. With ``expiry``, adds ``days_to_expiry`` (for the global model).
+    """
+    columns = ["date", "sales", "is_holiday"] + (["inventory"] if "inventory" in frame else [])
+    sales_df = frame[columns].rename(columns={"date": "ds", "sales": "y"})
+    if expiry and "expiry_date" in frame:
+        expiry_date = parse_dates(frame["expiry_date"], errors="coerce")
+        sales_df["days_to_expiry"] = (expiry_date - sales_df["ds"]).dt.days
+    return sales_df
+
+
+def _validation_failed(sku, ke: KeyError, errors: list, tick):
+    logger.error(f"⚠️ Missing required columns in input data: {ke}")
+    errors.append(_sku_error(sku, "validation", f"missing column {ke}"))
+    tick()
+
 
 # -------------------------------
-# Demand Forecast Function
+# Forecast Frequency
 # -------------------------------
-def forecast_demand(df: pd.DataFrame) -> pd.DataFrame:
-    result_frames = []
+def resolve_frequency(freq: str = None, horizon: int = None):
+    """
+    ``(freq, period_days, periods)`` for a requested frequency and horizon.
 
-    try:
-        df["date"] = pd.to_datetime(df["date"])
-    except Exception as e:
-        logger.error(f"❌ Failed to parse 'date' column: {e}")
-        raise ValueError("Invalid date format in input data.")
+    ``freq`` is a ``FORECAST_FREQUENCIES`` key (``D`` or ``W``), defaulting to
+    ``FORECAST_FREQ``; ``horizon`` counts periods of that frequency and
+    defaults to ``FORECAST_HORIZON_DAYS`` days or ``FORECAST_HORIZON_WEEKS`` weeks.
+    """
+    freq = (freq or FORECAST_FREQ).upper()
+    if freq not in FORECAST_FREQUENCIES:
+        raise ValueError(f"Unknown forecast frequency '{freq}'; expected one of {', '.join(FORECAST_FREQUENCIES)}.")
+    if horizon is None:
+        horizon = FORECAST_HORIZON_WEEKS if freq == "W" else FORECAST_HORIZON_DAYS
+    return freq, FORECAST_FREQUENCIES[freq], int(horizon)
 
-    for sku in df["sku"].unique():
-        logger.info(f"📊 Forecasting for SKU: {sku}")
 
-        sku_df = df[df["sku"] == sku].copy()
-        sku_df["is_holiday"] = sku_df["date"].apply(is_indian_holiday)
+def resample_sales(sales: pd.DataFrame, period_days: int) -> pd.DataFrame:
+    """
+    Aggregate daily ``sku/ds/y/is_holiday[/inventory]`` rows into one row per
+    SKU and period (``ds`` is the period start; weeks start on Monday).
 
-        try:
-            sales_df = sku_df[["date", "sales", "is_holiday"]].rename(columns={
-                "date": "ds", "sales": "y"
-            })
-        except KeyError as ke:
-            logger.error(f"⚠️ Missing required columns in input data: {ke}")
-            continue
+    Sales are summed and partial periods (typically the first and last week of
+    an upload) are scaled up to a full period's rate, so they don't read as
+    dips. A period is a holiday if any of its days is; inventory (and days to
+    expiry) is the last value seen. SKUs keep their upload order, periods are sorted.
+    """
+    codes, skus = pd.factorize(sales["sku"])
+    period = pd.DatetimeIndex(period_start(sales["ds"].to_numpy(), period_days))
+    aggregations = {"y": "sum", "is_holiday": "max"}
+    for column in ("inventory", "days_to_expiry"):
+        if column in sales:
+            aggregations[column] = "last"
+
+    grouped = sales[list(aggregations)].groupby([codes, period], sort=True)
+    resampled = grouped.agg(aggregations)
+    resampled["y"] *= period_days / grouped.size()
+    resampled = resampled.reset_index(names=["code", "ds"])
+    resampled.insert(0, "sku", skus.take(resampled.pop("code").to_numpy()))
+    return resampled
+
+
+def _iter_sku_tasks(partitions, errors: list, tick):
+    """Yield (sku, sales_df) pairs ready for fitting, recording skipped SKUs."""
+    for sku, sales_df in partitions:
+        logger.info(f"📊 Forecasting for SKU: {sku}")
 
         if sales_df["y"].sum() == 0 or len(sales_df) < 2:
             logger.warning(f"⛔ Skipping SKU '{sku}' due to insufficient data.")
+            errors.append(_sku_error(sku, "skipped", "insufficient data"))
+            tick()
             continue
 
+        yield sku, sales_df
+
+# -------------------------------
+# Execution Strategies
+# -------------------------------
+# Both strategies take ``(seq, sku, sales_df)`` Prophet tasks and yield
+# ``(seq, sku, frame, params)`` as SKUs finish, where ``seq`` is the SKU's
+# position in the upload and ``params`` its fitted parameters (usable as a
+# later warm start).
+def _run_serial(tasks, periods: int, errors: list, tick, warm_start: dict, period_days: int = 1):
+    for seq, sku, sales_df in tasks:
         try:
-            model = Prophet(daily_seasonality=True)
-            model.add_regressor("is_holiday")
-            model.fit(sales_df)
+            frame, params = _collect(sku, _fit_sku(sku, sales_df, periods, warm_start.get(sku), period_days))
+        except Exception as e:
+            logger.error(f"❌ Forecasting failed for SKU '{sku}': {e}")
+            errors.append(_sku_error(sku, "fit", e))
+            frame = None
+        tick()
+        if frame is not None:
+            yield seq, sku, frame, params
+
+
+# -------------------------------
+# Shared Process Pool
+# -------------------------------
+# One pool serves every forecast in this process, so concurrent requests and
+# jobs share its worker processes instead of each starting their own. Workers
+# start from a forkserver (spawn where there is none), never by forking the
+# threaded server, and the forkserver preloads this module so they start warm.
+_pool_context = multiprocessing.get_context(
+    "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn")
+_pool_cond = threading.Condition()
+_pool = None
+_pool_size = 0
+_in_flight = 0
+_worker_pids = {}  # pool -> SimpleQueue its workers report their PIDs on
+
+
+def _register_worker(pids):
+    """Pool initializer: report this worker's PID so a hung fit can be killed."""
+    pids.put(os.getpid())
+
+
+def _start_pool(size: int) -> ProcessPoolExecutor:
+    if _pool_context.get_start_method() == "forkserver":
+        _pool_context.set_forkserver_preload([__name__])
+    pids = _pool_context.SimpleQueue()
+    pool = ProcessPoolExecutor(max_workers=size, mp_context=_pool_context,
+                               initializer=_register_worker, initargs=(pids,))
+    _worker_pids[pool] = pids
+    # Start every worker now, so the first fits' budgets don't include
+    # process start-up.
+    wait([pool.submit(os.getpid) for _ in range(size)])
+    logger.info(f"🧵 Started a shared pool of {size} forecast processes")
+    return pool
+
+
+def _reserve(max_workers: int, block: bool):
+    """
+    Take one of the shared pool's process slots and return the pool, or
+    ``None`` if every slot is busy and ``block`` is false. The pool is started
+    on first use and replaced by a bigger one if a caller asks for more workers.
+    """
+    global _pool, _pool_size, _in_flight
+    with _pool_cond:
+        while _pool is not None and max_workers <= _pool_size <= _in_flight:
+            if not block:
+                return None
+            _pool_cond.wait()
+        if _pool is None or max_workers > _pool_size:
+            if _pool is not None:
+                # Fits already running on the old pool finish first.
+                _pool.shutdown(wait=False)
+            _pool_size = max(max_workers, _pool_size)
+            _pool = _start_pool(_pool_size)
+        _in_flight += 1
+        return _pool
+
+
+def _release(future=None):
+    global _in_flight
+    with _pool_cond:
+        _in_flight -= 1
+        _pool_cond.notify_all()
 
-            future = model.make_future_dataframe(periods=7)
-            future["is_holiday"] = future["ds"].apply(is_indian_holiday)
 
-            forecast = model.predict(future)
-            forecast_result = forecast[["ds", "yhat"]].rename(columns={
-                "ds": "date", "yhat": "prediction"
-            })
-            forecast_result["sku"] = sku
-            result_frames.append(forecast_result)
+def _recycle_pool(pool: ProcessPoolExecutor):
+    """
+    Kill a pool's workers (a fit stuck inside Stan can't be cancelled) and
+    retire it; the next fit starts a fresh pool. Fits of other forecasts on
+    it fail with ``BrokenProcessPool`` and are rerun by their own ``_run_pool``.
+    """
+    global _pool
+    with _pool_cond:
+        if _pool is pool:
+            _pool = None
+        pids = _worker_pids.pop(pool, None)
+    if pids is None:
+        return
+    while not pids.empty():
+        try:
+            os.kill(pids.get(), signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _recycle_if_running(future, pool: ProcessPoolExecutor):
+    if not future.done():
+        _recycle_pool(pool)
+
 
-            logger.info(f"✅ Forecast complete for SKU: {sku}")
+def _run_pool(tasks, periods: int, errors: list, tick, warm_start: dict,
+              max_workers: int, sku_timeout: float, period_days: int = 1):
+    """
+    Fan per-SKU fits out over the shared process pool.
 
+    At most ``max_workers`` SKUs are in flight, and never more than the pool
+    has processes across all callers, so every submitted SKU starts right away
+    and large uploads never queue every series in memory. ``sku_timeout`` is
+    therefore a wall-clock budget from the moment a fit starts. A SKU that
+    exceeds it is reported, the pool's workers are killed, and the SKUs that
+    were fitting alongside it are rerun on a fresh pool.
+    """
+    pending = {}
+    tasks = iter(tasks)
+    exhausted = False
+    # Tasks waiting for a process slot: reruns first, then the next new SKU
+    queued = deque()
+
+    def submit(seq, sku, sales_df, reruns):
+        while True:
+            pool = _reserve(max_workers, block=not pending)
+            if pool is None:
+                return False
+            try:
+                future = pool.submit(_fit_sku, sku, sales_df, periods, warm_start.get(sku), period_days)
+            except BrokenProcessPool:
+                # A worker died; retire the pool so the next attempt gets a fresh one
+                _release()
+                _recycle_pool(pool)
+                continue
+            except RuntimeError:
+                # Replaced by a bigger pool between _reserve and submit
+                _release()
+                continue
+            future.add_done_callback(_release)
+            pending[future] = (seq, sku, sales_df, time.monotonic() + sku_timeout, pool, reruns)
+            return True
+
+    def finish(future):
+        seq, sku, sales_df, _, _, reruns = pending.pop(future)
+        try:
+            frame, params = _collect(sku, future.result())
+        except (BrokenProcessPool, CancelledError) as e:
+            # Another forecast killed the shared pool's workers. A SKU that
+            # breaks the pool a second time is reported, not retried forever.
+            if not reruns:
+                logger.info(f"🔁 Restarting fit for SKU '{sku}' after the pool was recycled")
+                queued.append((seq, sku, sales_df, reruns + 1))
+                return
+            logger.error(f"❌ Forecasting failed for SKU '{sku}': {e}")
+            errors.append(_sku_error(sku, "fit", e))
+            frame = None
         except Exception as e:
             logger.error(f"❌ Forecasting failed for SKU '{sku}': {e}")
-            continue
+            errors.append(_sku_error(sku, "fit", e))
+            frame = None
+        tick()
+        if frame is not None:
+            yield seq, sku, frame, params
+
+    try:
+        while pending or queued or not exhausted:
+            while len(pending) < max_workers:
+                if not queued:
+                    if exhausted:
+                        break
+                    try:
+                        queued.append((*next(tasks), 0))
+                    except StopIteration:
+                        exhausted = True
+                        break
+                if not submit(*queued[0]):
+                    break
+                queued.popleft()
+
+            if not pending:
+                break
+
+            next_deadline = min(entry[3] for entry in pending.values())
+            done, _ = wait(
+                pending,
+                timeout=max(next_deadline - time.monotonic(), 0),
+                return_when=FIRST_COMPLETED,
+            )
+            for future in done:
+                yield from finish(future)
+
+            now = time.monotonic()
+            expired = [future for future, entry in pending.items() if entry[3] <= now]
+            if not expired:
+                continue
+            hung_pools = set()
+            for future in expired:
+                _, sku, _, _, pool, _ = pending.pop(future)
+                logger.error(f"⏱️ Forecasting timed out for SKU '{sku}' after {sku_timeout}s")
+                errors.append(_sku_error(sku, "timeout", f"exceeded {sku_timeout}s"))
+                tick()
+                hung_pools.add(pool)
+            # Keep fits that finished meanwhile, then recycle the pool so the
+            # hung workers stop holding process slots
+            for future in [future for future in pending if future.done()]:
+                yield from finish(future)
+            for pool in hung_pools:
+                _recycle_pool(pool)
+            for future in [future for future, entry in pending.items() if entry[4] in hung_pools]:
+                seq, sku, sales_df, _, _, reruns = pending.pop(future)
+                logger.info(f"🔁 Restarting fit for SKU '{sku}' on a fresh worker")
+                queued.appendleft((seq, sku, sales_df, reruns))
+    finally:
+        # Fits are still pending only when the consumer stopped early (e.g. a
+        # client disconnected mid-stream). Nobody will read them: drop queued
+        # ones, and let running ones finish unless they overrun their budget.
+        now = time.monotonic()
+        for future, (_, _, _, deadline, pool, _) in pending.items():
+            if not future.cancel():
+                timer = threading.Timer(max(deadline - now, 0), _recycle_if_running, (future, pool))
+                timer.daemon = True
+                timer.start()
+
+
+def _run_batch(backend: str, batch: list, periods: int, errors: list, tick, period_days: int = 1) -> list:
+    """Forecast a batch of ``(seq, sku, sales_df)`` with one cheap-backend call."""
+    started = time.perf_counter()
+    try:
+        series = [(sku, sales_df) for _, sku, sales_df in batch]
+        frames = get_forecaster(backend).forecast(series, periods, period_days)
+        batch_seconds = time.perf_counter() - started
+        metrics.BATCH_SECONDS.observe(batch_seconds, backend=backend)
+        metrics.SKUS_FORECAST.inc(len(frames), backend=backend)
+        # Batched backends have no per-SKU cost; charge each SKU an equal share
+        fit = {"backend": backend, "fit_seconds": round(batch_seconds / len(batch), 6), "cached": False}
+        for frame in frames.values():
+            frame.attrs["fit"] = dict(fit)
+    except Exception as e:
+        logger.error(f"❌ {backend} forecaster failed for a batch of {len(batch)} SKUs: {e}")
+        frames = {}
+        errors.extend(_sku_error(sku, "fit", e) for _, sku, _ in batch)
+
+    results = []
+    for seq, sku, _ in batch:
+        tick()
+        if sku in frames:
+            results.append((seq, sku, frames[sku], None))
+    if frames:
+        logger.info(f"✅ Forecast complete for {len(frames)} SKUs ({backend})")
+    return results
+
+
+def _dispatch(tasks, policy: str, run_prophet, periods: int, errors: list, tick, period_days: int = 1):
+    """
+    Route each SKU to a backend: Prophet tasks go through ``run_prophet``
+    (serial or pooled), the rest are buffered per backend and forecast in
+    batches of ``FORECAST_BATCH_SKUS``. Results come out in completion order.
+    """
+    batches = {}
+    ready = deque()
+
+    def prophet_tasks():
+        for seq, (sku, sales_df) in enumerate(tasks):
+            backend = select_backend(sales_df, policy, period_days)
+            if backend == PROPHET:
+                yield seq, sku, sales_df
+                continue
+            batch = batches.setdefault(backend, [])
+            batch.append((seq, sku, sales_df))
+            if len(batch) >= FORECAST_BATCH_SKUS:
+                ready.extend(_run_batch(backend, batches.pop(backend), periods, errors, tick, period_days))
+
+    for result in run_prophet(prophet_tasks()):
+        yield result
+        while ready:
+            yield ready.popleft()
+
+    for backend, batch in batches.items():
+        ready.extend(_run_batch(backend, batch, periods, errors, tick, period_days))
+    yield from ready
+
+# -------------------------------
+# Demand Forecast Functions
+# -------------------------------
+def _iter_results(df, max_workers, sku_timeout, progress, errors, warm_start=None, backend=None,
+                  horizon=None, freq=None):
+    warm_start = warm_start or {}
+    policy = resolve_policy(backend)
+    _, period_days, periods = resolve_frequency(freq, horizon)
+    # Only the global model uses days to expiry; skip parsing it otherwise
+    with_expiry = policy == GLOBAL
+    max_workers = FORECAST_MAX_WORKERS if max_workers is None else max_workers
+    sku_timeout = FORECAST_SKU_TIMEOUT_SECONDS if sku_timeout is None else sku_timeout
+
+    done = 0
+    total = df["sku"].nunique() if isinstance(df, pd.DataFrame) else None
+
+    def tick():
+        nonlocal done
+        done += 1
+        if progress is not None:
+            progress(done, total)
+
+    if isinstance(df, pd.DataFrame):
+        try:
+            # assign() copies, so the caller's frame keeps its own date column.
+            df = df.assign(date=parse_dates(df["date"]))
+        except Exception as e:
+            logger.error(f"❌ Failed to parse 'date' column: {e}")
+            raise ValueError("Invalid date format in input data.")
 
-    if result_frames:
-        final_df = pd.concat(result_frames, ignore_index=True)
-        logger.info(f"📈 Forecasting complete for {len(result_frames)} SKUs.")
-        return final_df
+        # One vectorized calendar lookup (and one column rename) for the whole
+        # upload instead of one per SKU.
+        try:
+            with metrics.stage("holidays"):
+                holiday_flags = is_holiday(df["date"])
+            sales = _sales_frame(df.assign(is_holiday=holiday_flags), expiry=with_expiry)
+            if period_days > 1:
+                with metrics.stage("resample"):
+                    sales = resample_sales(sales.assign(sku=df["sku"].to_numpy()), period_days)
+                partitions = sales.drop(columns="sku").groupby(sales["sku"], sort=False)
+            else:
+                partitions = sales.groupby(df["sku"], sort=False, observed=True)
+        except KeyError as ke:
+            for sku in df["sku"].unique():
+                _validation_failed(sku, ke, errors, tick)
+            partitions = []
+    else:
+        def prepare(parts):
+            lookup_seconds = 0.0
+            resample_seconds = 0.0
+            try:
+                for sku, part in parts:
+                    started = time.perf_counter()
+                    holiday_flags = is_holiday(part["date"])
+                    lookup_seconds += time.perf_counter() - started
+                    try:
+                        sales_df = _sales_frame(part.assign(is_holiday=holiday_flags), expiry=with_expiry)
+                    except KeyError as ke:
+                        _validation_failed(sku, ke, errors, tick)
+                        continue
+                    if period_days > 1:
+                        started = time.perf_counter()
+                        sales_df = resample_sales(sales_df.assign(sku=sku), period_days).drop(columns="sku")
+                        resample_seconds += time.perf_counter() - started
+                    yield sku, sales_df
+            finally:
+                metrics.record_stage("holidays", lookup_seconds)
+                if period_days > 1:
+                    metrics.record_stage("resample", resample_seconds)
+
+        partitions = prepare(df)
+
+    if max_workers > 1 and (total is None or total > 1):
+        def run_prophet(tasks):
+            return _run_pool(
+                tasks, periods, errors, tick, warm_start,
+                max_workers=max_workers,
+                sku_timeout=sku_timeout,
+                period_days=period_days,
+            )
+    else:
+        def run_prophet(tasks):
+            return _run_serial(tasks, periods, errors, tick, warm_start, period_days)
+
+    tasks = _iter_sku_tasks(partitions, errors, tick)
+    return _dispatch(tasks, policy, run_prophet, periods, errors, tick, period_days)
+
+
+def iter_forecasts(df, max_workers: int = None, sku_timeout: float = None,
+                   progress=None, errors: list = None, backend: str = None,
+                   horizon: int = None, freq: str = None):
+    """
+    Yield ``(sku, forecast_frame)`` for each SKU as soon as it is forecast.
+
+    Takes the same inputs as ``forecast_demand``; skipped, failed and timed-out
+    SKUs are appended to ``errors`` when a list is given.
+    """
+    errors = [] if errors is None else errors
+    for _, sku, frame, _ in _iter_results(df, max_workers, sku_timeout, progress, errors, backend=backend,
+                                          horizon=horizon, freq=freq):
+        yield sku, frame
+
+
+def forecast_demand(df, max_workers: int = None, sku_timeout: float = None,
+                    progress=None, warm_start: dict = None, backend: str = None,
+                    horizon: int = None, freq: str = None, fit_stats: bool = False) -> pd.DataFrame:
+    """
+    Forecast every SKU in ``df`` and return one ``date/prediction/sku`` frame,
+    with the ``forecasters.QUANTILE_COLUMNS`` (P10/P50/P90, float32) alongside.
+
+    ``df`` is either a full upload or an iterable of ``(sku, frame)`` partitions
+    (see ``utils.iter_sku_partitions``); partitions are fitted as they arrive.
+    Fits run in parallel when ``max_workers`` > 1. SKUs that are skipped, fail
+    or time out are listed in ``result.attrs["errors"]``. ``progress(done, total)``
+    is called each time a SKU is finished, whatever the outcome (``total`` is
+    ``None`` for streamed partitions).
+
+    ``warm_start`` maps SKUs to parameters from an earlier fit; when given, the
+    new fitted parameters are returned in ``result.attrs["fit_params"]``
+    (``None`` for SKUs handled by a batched backend). With ``fit_stats``,
+    ``result.attrs["fit_stats"]`` maps each forecast SKU to its backend, fit
+    seconds (the original fit's for cached models, an equal share of the batch
+    for batched backends) and whether the model came from the cache.
+
+    ``backend`` overrides the ``FORECAST_BACKEND`` policy: ``auto`` routes short
+    or sparse series to exponential smoothing and the rest to Prophet; a backend
+    name forces that backend for every SKU (see ``forecasters``).
+
+    ``freq`` (``D`` or ``W``, default ``FORECAST_FREQ``) sets the granularity:
+    weekly forecasts resample each SKU's history into Monday-anchored weeks
+    before fitting, so series are ~7x shorter, and rows are dated by week
+    start. ``horizon`` counts periods (see ``resolve_frequency``). Both are
+    echoed in ``result.attrs`` (``freq``, ``period_days``, ``horizon``).
+    """
+    freq, period_days, horizon = resolve_frequency(freq, horizon)
+    errors = []
+    results = list(_iter_results(df, max_workers, sku_timeout, progress, errors, warm_start, backend,
+                                 horizon, freq))
+
+    if results:
+        # Keep the output in upload order regardless of completion order.
+        results.sort(key=lambda item: item[0])
+        stats = {sku: frame.attrs.pop("fit", None) for _, sku, frame, _ in results}
+        final_df = pd.concat([frame for _, _, frame, _ in results], ignore_index=True)
+        logger.info(f"📈 Forecasting complete for {len(results)} SKUs.")
     else:
         logger.warning("⚠️ No forecast results generated.")
-        return pd.DataFrame(columns=["date", "prediction", "sku"])
+        final_df = pd.DataFrame(columns=["date", "prediction", "sku"] + QUANTILE_COLUMNS)
+        stats = {}
+
+    if errors:
+        logger.warning(f"⚠️ {len(errors)} SKUs were skipped or failed during forecasting.")
+    final_df.attrs["errors"] = errors
+    final_df.attrs.update(freq=freq, period_days=period_days, horizon=horizon)
+    if fit_stats:
+        final_df.attrs["fit_stats"] = stats
+    if warm_start is not None:
+        final_df.attrs["fit_params"] = {sku: params for _, sku, _, params in results}
+    return final_df
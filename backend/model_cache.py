@@ -0,0 +1,99 @@
+import hashlib
+import json
+import logging
+import threading
+
+import pandas as pd
+from prophet.serialize import model_to_json, model_from_json
+
+from config import (
+    MODEL_CACHE_ENABLED,
+    MODEL_CACHE_DIR,
+    MODEL_CACHE_MAX_BYTES,
+    MODEL_CACHE_MAX_ENTRIES,
+)
+from disk_cache import DiskCache
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_store = None
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "fit_seconds_saved": 0.0, "fit_seconds_spent": 0.0}
+
+
+def _get_store():
+    global _store
+    if _store is None:
+        _store = DiskCache(MODEL_CACHE_DIR, MODEL_CACHE_MAX_BYTES, MODEL_CACHE_MAX_ENTRIES)
+    return _store
+
+# -------------------------------
+# Fingerprinting
+# -------------------------------
+def fingerprint(sales_df: pd.DataFrame, model_config: dict) -> str:
+    """Hash a SKU's (ds, y, is_holiday) history together with the model config."""
+    history = sales_df[["ds", "y", "is_holiday"]].reset_index(drop=True)
+    digest = hashlib.sha256()
+    digest.update(pd.util.hash_pandas_object(history, index=False).values.tobytes())
+    digest.update(json.dumps(model_config, sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+# -------------------------------
+# Load / Store Fitted Models
+# -------------------------------
+def load_model(key: str):
+    """Return ``(model, fit_seconds)`` for a cached fit, or ``None`` on a miss."""
+    if not MODEL_CACHE_ENABLED:
+        return None
+    data = _get_store().get(key)
+    if data is None:
+        return None
+    try:
+        entry = json.loads(data)
+        return model_from_json(entry["model"]), entry.get("fit_seconds", 0.0)
+    except Exception as e:
+        logger.warning(f"⚠️ Ignoring unreadable model cache entry {key}: {e}")
+        return None
+
+
+def save_model(key: str, model, fit_seconds: float):
+    if not MODEL_CACHE_ENABLED:
+        return
+    try:
+        entry = {"model": model_to_json(model), "fit_seconds": fit_seconds}
+        _get_store().put(key, json.dumps(entry).encode("utf-8"))
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to cache fitted model {key}: {e}")
+
+# -------------------------------
+# Hit / Miss Counters
+# -------------------------------
+def record(cache_hit: bool, fit_seconds: float):
+    """Account for one SKU fit. Called in the parent process with worker results."""
+    with _stats_lock:
+        if cache_hit:
+            _stats["hits"] += 1
+            _stats["fit_seconds_saved"] += fit_seconds
+        else:
+            _stats["misses"] += 1
+            _stats["fit_seconds_spent"] += fit_seconds
+
+
+def counters() -> dict:
+    """This process's hit/miss counters, without touching the disk."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def cache_stats() -> dict:
+    stats = counters()
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 4) if lookups else 0.0
+    stats["enabled"] = MODEL_CACHE_ENABLED
+    if MODEL_CACHE_ENABLED:
+        stats.update(_get_store().usage())
+    return stats
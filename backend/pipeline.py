@@ -0,0 +1,309 @@
+import json
+import logging
+import math
+import time
+
+import numpy as np
+import pandas as pd
+
+from config import FORECAST_HORIZON_DAYS, FORECAST_MODE, NDJSON_BATCH_SKUS, NDJSON_FLUSH_SECONDS
+from metrics import stage, timed_iter
+from model import forecast_demand, iter_forecasts, resolve_frequency
+from forecasters import period_start
+from alerts import generate_alerts
+from waste import project_waste, waste_alerts
+from hierarchy import HIERARCHICAL, forecast_hierarchical
+from columnar import COLUMNAR_FORMATS, JSON, encode_table, read_columnar, result_table
+from utils import (
+    parse_csv,
+    iter_sku_partitions,
+    is_grouped_by_sku,
+    concat_partitions,
+    CSVSchemaError,
+    EMPTY_UPLOAD_MESSAGE,
+    UngroupedInputError,
+)
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# ---------------------- Utility: JSON Sanitizer ----------------------
+def sanitize_json(data):
+    """Recursively clean JSON-unsafe values like NaN and Inf."""
+    if isinstance(data, dict):
+        return {k: sanitize_json(v) for k, v in data.items()}
+    elif isinstance(data, list):
+        return [sanitize_json(item) for item in data]
+    elif isinstance(data, float):
+        if math.isnan(data) or math.isinf(data):
+            return None
+        return data
+    else:
+        return data
+
+
+def frame_records(frame: pd.DataFrame) -> list:
+    """
+    ``to_dict(orient="records")`` with NaN/inf replaced by ``None`` column-wise
+    and datetimes rendered as ISO strings, so the rows are JSON-safe as-is.
+    """
+    frame = frame.copy()
+    for col in frame.columns:
+        if pd.api.types.is_datetime64_any_dtype(frame[col]):
+            frame[col] = frame[col].dt.strftime("%Y-%m-%dT%H:%M:%S")
+        elif pd.api.types.is_float_dtype(frame[col]):
+            frame[col] = frame[col].where(np.isfinite(frame[col]))
+    frame = frame.astype(object).where(frame.notna(), None)
+    return frame.to_dict(orient="records")
+
+# ---------------------- Forecast → Alerts Pipeline ----------------------
+def run_prediction(df: pd.DataFrame, progress=None, response_format: str = JSON,
+                   horizon: int = None, freq: str = None):
+    """
+    Forecast, alert and serialize one upload.
+
+    ``progress(done, total)`` is called as SKUs finish forecasting. See
+    ``build_response`` for ``response_format`` and ``model.resolve_frequency``
+    for ``horizon``/``freq``.
+    """
+    logger.info("📊 Running demand forecast model...")
+    with stage("forecast"):
+        if FORECAST_MODE == HIERARCHICAL:
+            forecast_df = forecast_hierarchical(df, progress=progress, horizon=horizon, freq=freq)
+        else:
+            forecast_df = forecast_demand(df, progress=progress, horizon=horizon, freq=freq)
+    return build_response(df, forecast_df, response_format)
+
+
+def run_prediction_stream(source, response_format: str = JSON, horizon: int = None, freq: str = None):
+    """
+    Like ``run_prediction``, but forecast SKUs while ``source`` is still being parsed.
+
+    ``source`` is a path or seekable binary file. If its rows turn out not to be
+    grouped by SKU, the upload is re-read in full; fits finished so far are
+    picked up again from the model cache.
+    """
+    if FORECAST_MODE == HIERARCHICAL:
+        # Aggregates need every SKU of a node, so nothing can be fitted early
+        with stage("parse"):
+            df = parse_csv(source)
+        return run_prediction(df, response_format=response_format, horizon=horizon, freq=freq)
+
+    partitions = []
+
+    def collect():
+        for sku, part in timed_iter(iter_sku_partitions(source), "parse"):
+            partitions.append(part)
+            yield sku, part
+
+    logger.info("📊 Running demand forecast model on streamed upload...")
+    try:
+        # Includes the streamed parse, which is also reported as "parse"
+        with stage("forecast"):
+            forecast_df = forecast_demand(collect(), horizon=horizon, freq=freq)
+    except UngroupedInputError as e:
+        logger.warning(f"↩️ {e} Falling back to a full parse.")
+        if hasattr(source, "seek"):
+            source.seek(0)
+        with stage("parse"):
+            df = parse_csv(source)
+        return run_prediction(df, response_format=response_format, horizon=horizon, freq=freq)
+
+    if not partitions:
+        raise CSVSchemaError(message=EMPTY_UPLOAD_MESSAGE)
+    return build_response(concat_partitions(partitions), forecast_df, response_format)
+
+
+def run_prediction_columnar(source, upload_format: str, response_format: str = JSON,
+                            horizon: int = None, freq: str = None):
+    """Like ``run_prediction`` for a Parquet/Arrow upload, which is read in one go."""
+    with stage("parse"):
+        df = read_columnar(source, upload_format)
+    return run_prediction(df, response_format=response_format, horizon=horizon, freq=freq)
+
+
+def annotate_forecast(df: pd.DataFrame, forecast_df: pd.DataFrame) -> pd.DataFrame:
+    """Add each SKU's ``max_predicted_day`` and ``product_name`` to the forecast."""
+    # ✅ Calculate max predicted day per SKU
+    max_idx = forecast_df.groupby("sku")["prediction"].idxmax()
+    max_days = forecast_df.loc[max_idx, ["sku", "date"]].rename(columns={"date": "max_predicted_day"})
+    forecast_df = pd.merge(forecast_df, max_days, on="sku", how="left")
+
+    # ✅ Handle product_name mapping BEFORE alerts
+    if "product_name" in df.columns:
+        sku_name_map = df[["sku", "product_name"]].dropna().drop_duplicates().set_index("sku")["product_name"].to_dict()
+        forecast_df["product_name"] = forecast_df["sku"].map(sku_name_map)
+    else:
+        forecast_df["product_name"] = "N/A"
+    return forecast_df
+
+
+def merge_actuals(df: pd.DataFrame, forecast_df: pd.DataFrame, period_days: int = 1) -> pd.DataFrame:
+    """
+    Join the uploaded sales/inventory onto the forecast rows. For weekly
+    forecasts the actuals are first summed per week (inventory: last value).
+    """
+    actuals = df[["date", "sku", "sales", "inventory"]]
+    if period_days > 1:
+        actuals = (
+            actuals.assign(date=pd.DatetimeIndex(period_start(pd.to_datetime(actuals["date"]).to_numpy(), period_days)))
+            .groupby(["sku", "date"], sort=False, observed=True)
+            .agg(sales=("sales", "sum"), inventory=("inventory", "last"))
+            .reset_index()
+        )
+    return pd.merge(
+        forecast_df,
+        actuals,
+        on=["date", "sku"],
+        how="left"
+    )
+
+
+def _assemble(df: pd.DataFrame, forecast_df: pd.DataFrame, period_days: int = 1,
+              horizon_days: int = FORECAST_HORIZON_DAYS):
+    """
+    Return the merged forecast frame, the alert list and the waste ranking for
+    ``df``. ``forecast_df`` rows are ``period_days`` long and extend
+    ``horizon_days`` past the history.
+    """
+    with stage("merge"):
+        forecast_df = annotate_forecast(df, forecast_df)
+
+    # ✅ Now generate alerts AFTER product_name is added
+    logger.info("🚨 Generating alerts...")
+    with stage("alerts"):
+        alerts = generate_alerts(df, forecast_df, period_days)
+
+    # ✅ Project stock expiring unsold and add markdown/transfer alerts
+    with stage("waste"):
+        waste = project_waste(df, forecast_df, horizon_days, period_days)
+        expiring = waste_alerts(waste)
+        for block in alerts:
+            block["alerts"].extend(expiring.get(str(block["sku"]), []))
+
+    # ✅ Merge forecast with actuals
+    with stage("merge"):
+        merged = merge_actuals(df, forecast_df, period_days)
+    return merged, alerts, waste
+
+
+def build_response(df: pd.DataFrame, forecast_df: pd.DataFrame, response_format: str = JSON):
+    """
+    The ``forecast/alerts/waste/errors`` response as a JSON-ready dict or, for
+    ``parquet``/``arrow``, as encoded bytes: the forecast rows go straight from
+    the frame into Arrow buffers, the rest rides in the schema metadata.
+    """
+    forecast_errors = forecast_df.attrs.get("errors", [])
+    period_days = forecast_df.attrs.get("period_days", 1)
+    horizon_days = forecast_df.attrs.get("horizon", FORECAST_HORIZON_DAYS) * period_days
+    merged, alerts, waste = _assemble(df, forecast_df, period_days, horizon_days)
+
+    if response_format in COLUMNAR_FORMATS:
+        with stage("serialize"):
+            table = result_table(
+                merged,
+                alerts=sanitize_json(alerts),
+                waste=frame_records(waste),
+                errors=forecast_errors,
+            )
+            return encode_table(table, response_format)
+
+    with stage("serialize"):
+        return {
+            "forecast": frame_records(merged),
+            "alerts": sanitize_json(alerts),
+            "waste": frame_records(waste),
+            "errors": forecast_errors
+        }
+
+# ---------------------- NDJSON Streaming Mode ----------------------
+def iter_prediction_ndjson(source, horizon: int = None, freq: str = None):
+    """
+    Yield one NDJSON line per SKU (its forecast rows plus its alert block) as
+    SKUs finish, followed by a final ``{"errors": [...]}`` line. ``source`` is
+    a CSV path/file or an already parsed upload frame.
+
+    Finished SKUs are micro-batched so alerting and serialization stay
+    vectorized, but the first SKU is always flushed on its own. In hierarchical
+    mode the whole upload is forecast first, then streamed in batches.
+    """
+    freq, period_days, horizon = resolve_frequency(freq, horizon)
+    if FORECAST_MODE == HIERARCHICAL:
+        yield from _iter_hierarchical_ndjson(source, horizon, freq)
+        return
+
+    if isinstance(source, pd.DataFrame):
+        # Already parsed (e.g. a Parquet/Arrow upload)
+        partitions = source.groupby("sku", sort=False, observed=True)
+    elif is_grouped_by_sku(source):
+        partitions = iter_sku_partitions(source)
+    else:
+        logger.info("↩️ Upload is not grouped by SKU; parsing it in full before streaming.")
+        partitions = parse_csv(source).groupby("sku", sort=False, observed=True)
+
+    originals = {}
+
+    def collect():
+        for sku, part in partitions:
+            originals[sku] = part
+            yield sku, part
+
+    errors = []
+    batch = []
+    last_flush = None
+
+    for sku, forecast in iter_forecasts(collect(), errors=errors, horizon=horizon, freq=freq):
+        batch.append((sku, forecast))
+        now = time.monotonic()
+        if last_flush is None or len(batch) >= NDJSON_BATCH_SKUS or now - last_flush >= NDJSON_FLUSH_SECONDS:
+            yield from _ndjson_lines(batch, originals, period_days, horizon * period_days)
+            batch = []
+            last_flush = now
+
+    if batch:
+        yield from _ndjson_lines(batch, originals, period_days, horizon * period_days)
+    yield json.dumps({"errors": errors}) + "\n"
+
+
+def _iter_hierarchical_ndjson(source, horizon: int, freq: str):
+    df = source if isinstance(source, pd.DataFrame) else parse_csv(source)
+    forecast_df = forecast_hierarchical(df, horizon=horizon, freq=freq)
+    period_days = forecast_df.attrs.get("period_days", 1)
+    originals = dict(iter(df.groupby("sku", sort=False, observed=True)))
+
+    batch = []
+    for sku, forecast in forecast_df.groupby("sku", sort=False):
+        batch.append((sku, forecast))
+        if len(batch) >= NDJSON_BATCH_SKUS:
+            yield from _ndjson_lines(batch, originals, period_days, horizon * period_days)
+            batch = []
+
+    if batch:
+        yield from _ndjson_lines(batch, originals, period_days, horizon * period_days)
+    yield json.dumps({"errors": forecast_df.attrs.get("errors", [])}) + "\n"
+
+
+def _ndjson_lines(batch: list, originals: dict, period_days: int = 1, horizon_days: int = FORECAST_HORIZON_DAYS):
+    df = concat_partitions([originals.pop(sku) for sku, _ in batch])
+    forecast_df = pd.concat([frame for _, frame in batch], ignore_index=True)
+    merged, alerts, waste = _assemble(df, forecast_df, period_days, horizon_days)
+
+    # Ranks only make sense across the whole catalog, not within a micro-batch
+    waste_by_sku = {record["sku"]: record for record in frame_records(waste.drop(columns="rank"))}
+    alerts_by_sku = {block["sku"]: block for block in sanitize_json(alerts)}
+    records = frame_records(merged)
+    rows_by_sku = {}
+    for record in records:
+        rows_by_sku.setdefault(record["sku"], []).append(record)
+
+    for sku, _ in batch:
+        line = {
+            "sku": sku,
+            "forecast": rows_by_sku.get(sku, []),
+            "alerts": alerts_by_sku.get(sku),
+            "waste": waste_by_sku.get(str(sku)),
+        }
+        yield json.dumps(line, allow_nan=False, default=str) + "\n"
@@ -0,0 +1,178 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+
+from config import (
+    ALERT_RULES_PATH,
+    RESPONSE_CACHE_ENABLED,
+    RESPONSE_CACHE_DIR,
+    RESPONSE_CACHE_MAX_BYTES,
+    RESPONSE_CACHE_MAX_ENTRIES,
+    RESPONSE_CACHE_MAX_ENTRY_BYTES,
+    SKLEARN_MODEL_PATH,
+)
+from disk_cache import DiskCache
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Bump when the pipeline's output changes for the same upload and settings
+RESPONSE_FORMAT_VERSION = 1
+_HASH_CHUNK_BYTES = 1 << 20
+
+_store = None
+_stats_lock = threading.Lock()
+_stats = {"hits": 0, "misses": 0, "not_modified": 0}
+
+
+def _get_store():
+    global _store
+    if _store is None:
+        _store = DiskCache(RESPONSE_CACHE_DIR, RESPONSE_CACHE_MAX_BYTES, RESPONSE_CACHE_MAX_ENTRIES)
+    return _store
+
+# -------------------------------
+# Cache Keys / ETags
+# -------------------------------
+def _file_version(path: str):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return [stat.st_mtime_ns, stat.st_size]
+
+
+def model_version() -> dict:
+    """
+    Everything besides the upload and the request that shapes a response:
+    every ``config`` setting (parsing, backends, thresholds, flags such as
+    ``CSV_DATE_DAYFIRST``), the Prophet settings, the alert rules file and the
+    sklearn and global model files. Changing any of them changes every key.
+    """
+    # Imported here so computing a key doesn't pull Prophet into the caller.
+    import config
+    from features import model_path
+    from model import PROPHET_CONFIG
+
+    path = model_path()
+    return {
+        "format": RESPONSE_FORMAT_VERSION,
+        "prophet": PROPHET_CONFIG,
+        "settings": {name: value for name, value in vars(config).items() if name.isupper()},
+        "alert_rules": _file_version(ALERT_RULES_PATH),
+        "sklearn_model": _file_version(SKLEARN_MODEL_PATH),
+        "global_model": [path, _file_version(path)] if path else None,
+    }
+
+
+def request_key(source, params: dict) -> str:
+    """
+    Content address of one request: SHA-256 over the upload bytes, the
+    request parameters and ``model_version()``. ``source`` is a seekable
+    binary file, read in chunks and rewound afterwards.
+    """
+    digest = hashlib.sha256()
+    source.seek(0)
+    for chunk in iter(lambda: source.read(_HASH_CHUNK_BYTES), b""):
+        digest.update(chunk)
+    source.seek(0)
+    digest.update(json.dumps([params, model_version()], sort_keys=True, default=str).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def etag(key: str) -> str:
+    return f'"{key}"'
+
+
+def not_modified(if_none_match: str, key: str) -> bool:
+    """
+    True if an ``If-None-Match`` header names this key's ETag (weak or strong)
+    or ``*`` and the response is cached; uncached responses are recomputed.
+    """
+    if not if_none_match:
+        return False
+    tags = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    matched = ("*" in tags or etag(key) in tags) and _get_store().contains(key)
+    if matched:
+        _count("not_modified")
+    return matched
+
+# -------------------------------
+# Load / Store Responses
+# -------------------------------
+def _count(name: str):
+    with _stats_lock:
+        _stats[name] += 1
+
+
+def load(key: str):
+    """``(media_type, body)`` for a cached response, or ``None`` on a miss."""
+    data = _get_store().get(key)
+    if data is None:
+        _count("misses")
+        return None
+    header_end = data.find(b"\n")
+    if header_end < 0:
+        logger.warning(f"⚠️ Ignoring unreadable response cache entry {key}")
+        _count("misses")
+        return None
+    _count("hits")
+    return data[:header_end].decode("ascii"), memoryview(data)[header_end + 1:]
+
+
+def save(key: str, media_type: str, body, errors=None):
+    """
+    Store a serialized response. Responses reporting per-SKU ``errors`` (which
+    may be transient, e.g. timeouts) and bodies above
+    ``RESPONSE_CACHE_MAX_ENTRY_BYTES`` are skipped.
+    """
+    if errors:
+        logger.info(f"📦 Not caching a response with {len(errors)} SKU error(s)")
+        return
+    if len(body) > RESPONSE_CACHE_MAX_ENTRY_BYTES:
+        logger.info(f"📦 Not caching a {len(body)}-byte response (limit {RESPONSE_CACHE_MAX_ENTRY_BYTES})")
+        return
+    try:
+        _get_store().put(key, b"".join([media_type.encode("ascii"), b"\n", body]))
+    except Exception as e:
+        logger.warning(f"⚠️ Failed to cache response {key}: {e}")
+
+
+def caching_stream(key: str, media_type: str, lines):
+    """
+    Pass a streamed NDJSON response through, storing it once it has been sent
+    in full. A stream the client abandons part-way is not stored, nor is one
+    whose closing ``{"errors": [...]}`` line reports errors.
+    """
+    parts = []
+    size = 0
+    data = b""
+    for line in lines:
+        data = line.encode("utf-8") if isinstance(line, str) else line
+        if size <= RESPONSE_CACHE_MAX_ENTRY_BYTES:
+            parts.append(data)
+            size += len(data)
+        yield line
+    if size <= RESPONSE_CACHE_MAX_ENTRY_BYTES:
+        save(key, media_type, b"".join(parts), json.loads(data or b"{}").get("errors"))
+
+
+def counters() -> dict:
+    """This process's lookup counters, without touching the disk."""
+    with _stats_lock:
+        return dict(_stats)
+
+
+def stats() -> dict:
+    result = counters()
+    lookups = result["hits"] + result["misses"]
+    result["hit_rate"] = round(result["hits"] / lookups, 4) if lookups else 0.0
+    result["enabled"] = RESPONSE_CACHE_ENABLED
+    if RESPONSE_CACHE_ENABLED:
+        result.update(_get_store().usage())
+    return result
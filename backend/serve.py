@@ -0,0 +1,61 @@
+"""
+Production entry point: run the API under uvicorn with several worker processes.
+
+    python serve.py --workers 4 --port 8000
+
+Each worker warms up (Prophet/Stan, holiday calendar, backends, recently used
+cached models) before it accepts requests; ``/health`` answers 503 until then.
+Workers share the on-disk model cache, job store and history store. Each one
+publishes its ``/metrics`` counters to ``METRICS_MULTIPROC_DIR`` (a fresh
+temporary directory unless set), so a scrape of any worker reports the sum.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+from config import METRICS_ENABLED, SERVER_HOST, SERVER_PORT, SERVER_WORKERS
+import metrics
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Serve the inventory forecasting API.")
+    parser.add_argument("--host", default=SERVER_HOST)
+    parser.add_argument("--port", type=int, default=SERVER_PORT)
+    parser.add_argument("--workers", type=int, default=SERVER_WORKERS, help="server worker processes")
+    parser.add_argument("--no-warmup", action="store_true", help="start serving without preloading")
+    parser.add_argument("--log-level", default="info")
+    args = parser.parse_args(argv)
+
+    workers = max(args.workers, 1)
+    # Read by config at import time in each worker, so set them before uvicorn
+    # spawns any. Split the forecast pool between server workers unless it is
+    # configured explicitly, so N workers don't each fork one process per core.
+    os.environ.setdefault("FORECAST_MAX_WORKERS", str(max((os.cpu_count() or 1) // workers, 1)))
+    if args.no_warmup:
+        os.environ["WARMUP_ENABLED"] = "0"
+    metrics_dir = None
+    if workers > 1 and METRICS_ENABLED:
+        if os.environ.get("METRICS_MULTIPROC_DIR"):
+            metrics.reset_multiproc_dir(os.environ["METRICS_MULTIPROC_DIR"])
+        else:
+            metrics_dir = os.environ["METRICS_MULTIPROC_DIR"] = tempfile.mkdtemp(prefix="forecast-metrics-")
+
+    import uvicorn
+
+    try:
+        uvicorn.run(
+            "main:app",
+            host=args.host,
+            port=args.port,
+            workers=workers,
+            log_level=args.log_level,
+            app_dir=os.path.dirname(os.path.abspath(__file__)),
+        )
+    finally:
+        if metrics_dir is not None:
+            shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,447 @@
+import json
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+from statistics import NormalDist
+
+import numpy as np
+import pandas as pd
+from fastapi import APIRouter, File, Form, HTTPException, Query, UploadFile
+from fastapi.concurrency import run_in_threadpool
+
+from config import (
+    FORECAST_INTERVAL_WIDTH,
+    FORECAST_MODE,
+    SIMULATION_CHUNK_SKUS,
+    SIMULATION_HOLDING_COST,
+    SIMULATION_HORIZON_DAYS,
+    SIMULATION_LEAD_TIME_DAYS,
+    SIMULATION_MAX_PATHS,
+    SIMULATION_ORDER_COST,
+    SIMULATION_PATHS,
+    SIMULATION_POLICIES,
+    SIMULATION_STOCKOUT_COST,
+    SIMULATION_THREADS,
+    SIMULATION_WASTE_COST,
+)
+from forecasters import QUANTILE_LOWER, QUANTILE_MEDIAN, QUANTILE_UPPER
+from hierarchy import HIERARCHICAL, forecast_hierarchical
+from metrics import stage
+from model import forecast_demand
+from pipeline import frame_records, sanitize_json
+from columnar import COLUMNAR_FORMATS, UploadFormatError, read_columnar, sniff_format
+from utils import CSVSchemaError, parse_csv, parse_dates
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Spread of the P10-P90 interval in standard deviations of a normal
+_INTERVAL_Z = 2 * NormalDist().inv_cdf(0.5 + FORECAST_INTERVAL_WIDTH / 2)
+
+COST_KEYS = ("holding_cost", "waste_cost", "stockout_cost", "order_cost")
+DEFAULT_COSTS = {
+    "holding_cost": SIMULATION_HOLDING_COST,
+    "waste_cost": SIMULATION_WASTE_COST,
+    "stockout_cost": SIMULATION_STOCKOUT_COST,
+    "order_cost": SIMULATION_ORDER_COST,
+}
+RESULT_COLUMNS = [
+    "demand", "sales", "stockout_units", "stockout_days", "fill_rate", "waste_units",
+    "holding_units", "orders", "ordered_units", "end_stock",
+    "holding_cost", "waste_cost", "stockout_cost", "order_cost", "total_cost",
+]
+
+# -------------------------------
+# Reorder Policies
+# -------------------------------
+# Every policy is reviewed every ``review`` days and, at a review where the
+# inventory position (on hand + on order) is at or below ``low``, orders up to
+# ``high``. Levels are given in days of the SKU's mean forecast demand.
+POLICY_TYPES = {
+    # (s, S): continuous (daily) review
+    "sS": {"low": "s_days", "high": "S_days", "review": None},
+    # (R, s, S): periodic review, order only below the minimum
+    "min_max": {"low": "min_days", "high": "max_days", "review": "review_days"},
+    # (R, S): periodic review, always top up to S
+    "order_up_to": {"low": "S_days", "high": "S_days", "review": "review_days"},
+}
+
+
+class PolicyError(ValueError):
+    """A reorder policy spec is invalid."""
+
+
+def parse_policies(specs: list) -> list:
+    """Validate policy specs into ``(name, low_days, high_days, review_days)`` tuples."""
+    if not isinstance(specs, list) or not specs:
+        raise PolicyError("policies must be a non-empty list")
+    policies = []
+    for spec in specs:
+        if not isinstance(spec, dict) or spec.get("type") not in POLICY_TYPES:
+            raise PolicyError(f"policy type must be one of {', '.join(POLICY_TYPES)}: {spec!r}")
+        fields = POLICY_TYPES[spec["type"]]
+        name = str(spec.get("name", spec["type"]))
+        try:
+            low, high = float(spec[fields["low"]]), float(spec[fields["high"]])
+            review = int(spec[fields["review"]]) if fields["review"] else 1
+        except KeyError as e:
+            raise PolicyError(f"policy '{name}' is missing {e}")
+        except (TypeError, ValueError) as e:
+            raise PolicyError(f"policy '{name}' has an invalid level: {e}")
+        if low < 0 or high < low or review < 1:
+            raise PolicyError(f"policy '{name}' needs 0 <= low <= high and review_days >= 1")
+        policies.append((name, low, high, review))
+    names = [name for name, *_ in policies]
+    if len(set(names)) != len(names):
+        raise PolicyError(f"duplicate policy names: {names}")
+    return policies
+
+
+def parse_costs(overrides: dict) -> dict:
+    """Validate cost overrides into ``{cost_key: float}``; each must be a finite number >= 0."""
+    if not isinstance(overrides, dict):
+        raise PolicyError("costs must be a JSON object")
+    unknown = set(overrides) - set(COST_KEYS)
+    if unknown:
+        raise PolicyError(f"unknown cost keys: {sorted(unknown)}; expected {', '.join(COST_KEYS)}")
+    costs = {}
+    for key, value in overrides.items():
+        try:
+            costs[key] = float(value)
+        except (TypeError, ValueError):
+            raise PolicyError(f"cost '{key}' must be a number, got {value!r}")
+        if not np.isfinite(costs[key]) or costs[key] < 0:
+            raise PolicyError(f"cost '{key}' must be a finite number >= 0, got {value!r}")
+    return costs
+
+# -------------------------------
+# Simulation Inputs
+# -------------------------------
+def stock_state(original_df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Per SKU (index): ``inventory`` and ``as_of`` from the latest uploaded row,
+    ``days_to_expiry`` of that stock and ``shelf_life`` of new deliveries
+    (the longest expiry - date gap seen for the SKU). Both are ``NaN``
+    without expiry dates.
+    """
+    columns = ["sku", "date", "inventory"] + (["expiry_date"] if "expiry_date" in original_df else [])
+    rows = original_df[columns].copy()
+    rows["sku"] = rows["sku"].astype(str)
+    rows["date"] = pd.to_datetime(rows["date"])
+    if "expiry_date" in rows:
+        expiry = parse_dates(rows["expiry_date"], errors="coerce")
+        rows["days_to_expiry"] = (expiry - rows["date"]).dt.days
+    else:
+        rows["days_to_expiry"] = np.nan
+
+    rows = rows.sort_values("date", kind="stable")
+    latest = rows.drop_duplicates("sku", keep="last").set_index("sku")
+    state = pd.DataFrame({
+        "inventory": latest["inventory"].astype("float64").fillna(0).clip(lower=0),
+        "as_of": latest["date"],
+        "days_to_expiry": latest["days_to_expiry"].astype("float64"),
+    })
+    state["shelf_life"] = rows.groupby("sku")["days_to_expiry"].max().reindex(state.index)
+    state["shelf_life"] = state[["shelf_life", "days_to_expiry"]].max(axis=1)
+    return state
+
+
+def demand_inputs(forecast_df: pd.DataFrame, state: pd.DataFrame, days: int):
+    """
+    ``(skus, mean, sigma)``: the daily demand distribution over the ``days``
+    after each SKU's latest row, as ``(skus, days)`` float32 arrays. The mean
+    is the P50 forecast; the spread comes from the P10-P90 interval.
+    SKUs with fewer future forecast days than ``days`` are left out.
+    """
+    skus = forecast_df["sku"].astype(str)
+    known = skus.isin(state.index).to_numpy()
+    future = forecast_df.loc[known].assign(sku=skus[known].to_numpy())
+    as_of = state["as_of"].reindex(future["sku"]).to_numpy()
+    future = future[pd.to_datetime(future["date"]).to_numpy() > as_of]
+    future = future.sort_values(["sku", "date"], kind="stable")
+    future = future[future.groupby("sku", sort=False).cumcount() < days]
+
+    counts = future.groupby("sku", sort=False).size()
+    complete = counts.index[counts == days]
+    future = future[future["sku"].isin(complete)]
+
+    median_column = QUANTILE_MEDIAN if QUANTILE_MEDIAN in future else "prediction"
+    mean = np.clip(future[median_column].to_numpy(dtype="float32"), 0, None).reshape(-1, days)
+    if QUANTILE_LOWER in future and QUANTILE_UPPER in future:
+        spread = future[QUANTILE_UPPER].to_numpy(dtype="float32") - future[QUANTILE_LOWER].to_numpy(dtype="float32")
+        sigma = np.clip(np.nan_to_num(spread) / _INTERVAL_Z, 0, None).reshape(-1, days)
+    else:
+        sigma = np.zeros_like(mean)
+    return future["sku"].iloc[::days].to_numpy(), np.nan_to_num(mean), sigma
+
+# -------------------------------
+# Vectorized Monte Carlo Kernel
+# -------------------------------
+def _simulate_chunk(mean, sigma, inventory, days_to_expiry, shelf_life, low, high, review,
+                    paths: int, lead_time: int, rng) -> dict:
+    """
+    Simulate ``n`` SKUs under ``P`` policies along ``paths`` demand paths.
+
+    State arrays are ``(n, P, paths)`` float32. All policies see the same
+    demand draws, so their differences aren't sampling noise; the SKUs of a
+    chunk share them too, which leaves every SKU's expected outcome unchanged
+    and cuts random number generation, the costliest step, ``n``-fold. Each day:
+    deliveries arrive, stock past its shelf life is written off, demand is
+    served from stock (unmet demand is lost), and policies due for review
+    place orders that arrive ``lead_time`` days later.
+
+    Stock is issued first-in first-out and deliveries expire in arrival
+    order, so what expires on day ``t`` is whatever is left of the cumulative
+    inflow up to the last delivery that is now too old: that level minus
+    everything issued or written off so far. One cumulative-inflow history
+    replaces per-lot bookkeeping.
+
+    Returns per-(SKU, policy) path means as ``(n, P)`` arrays.
+    """
+    n, days = mean.shape
+    P = low.shape[1]
+    shape = (n, P, paths)
+    skus = np.arange(n)
+
+    stock = np.broadcast_to(inventory[:, None, None], shape).astype(np.float32)
+    inflow = stock.copy()  # cumulative: opening stock + deliveries
+    pipeline = np.zeros(shape, np.float32)
+    ring = np.zeros((lead_time + 1,) + shape, np.float32)
+    tracks_expiry = bool(np.isfinite(days_to_expiry).any())
+    if tracks_expiry:
+        history = np.empty((days,) + shape, np.float32)
+        opening_expiry = np.where(np.isfinite(days_to_expiry), days_to_expiry, days + 1).astype(np.int64)
+        lot_life = np.where(np.isfinite(shelf_life), shelf_life, days + 1).astype(np.int64)
+        lot_life = np.maximum(lot_life, 1)
+
+    shortfall = np.zeros(shape, np.float32)
+    holding = np.zeros(shape, np.float32)
+    # Counts summed over paths as they happen
+    stockout_days = np.zeros((n, P), np.int64)
+    orders = np.zeros((n, P), np.int64)
+    demand_total = np.zeros((n, 1, paths), np.float32)
+    low = low[:, :, None].astype(np.float32)
+    high = high[:, :, None].astype(np.float32)
+    buf = np.empty(shape, np.float32)
+    buf2 = np.empty(shape, np.float32)
+    flags = np.empty(shape, bool)
+    demand = np.empty((n, 1, paths), np.float32)
+    z = rng.standard_normal((days, paths), dtype=np.float32)
+
+    for t in range(days):
+        arriving = ring[t % (lead_time + 1)]
+        stock += arriving
+        inflow += arriving
+        pipeline -= arriving
+        arriving.fill(0)
+
+        if tracks_expiry:
+            history[t] = inflow
+            # Inflow level of everything no longer sellable today: the opening
+            # stock once it expires, then every delivery at least lot_life old
+            oldest = t - lot_life
+            aged = oldest >= 0
+            opened = t >= opening_expiry
+            if aged.any() or opened.any():
+                expired_level = buf
+                expired_level[...] = np.where(opened, inventory, 0)[:, None, None]
+                expired_level[aged] = history[oldest[aged], skus[aged]]
+                # waste = stock - (inflow - expired_level), floored at 0
+                expired_level -= inflow
+                expired_level += stock
+                np.maximum(expired_level, 0, out=expired_level)
+                stock -= expired_level
+
+        np.multiply(z[t], sigma[:, t, None, None], out=demand)
+        demand += mean[:, t, None, None]
+        np.maximum(demand, 0, out=demand)
+        demand_total += demand
+
+        # Serve demand; what stock can't cover is lost
+        stock -= demand
+        np.minimum(stock, 0, out=buf)
+        shortfall -= buf
+        np.less(buf, 0, out=flags)
+        stockout_days += flags.sum(axis=2)
+        np.maximum(stock, 0, out=stock)
+        holding += stock
+
+        reviewing = (t % review) == 0
+        if reviewing.any():
+            position = np.add(stock, pipeline, out=buf)
+            np.less_equal(position, low, out=flags)
+            flags &= reviewing[None, :, None]
+            order = np.subtract(high, position, out=buf2)
+            order *= flags
+            np.ceil(order, out=order)
+            ring[(t + lead_time) % (lead_time + 1)] += order
+            pipeline += order
+            # A position already at ``high`` (e.g. low == high == 0) orders nothing
+            np.greater(order, 0, out=flags)
+            orders += flags.sum(axis=2)
+
+    sales_total = demand_total - shortfall
+    results = {
+        "demand": demand_total.mean(axis=2).repeat(P, axis=1),
+        "sales": sales_total.mean(axis=2),
+        "stockout_units": shortfall.mean(axis=2),
+        "stockout_days": stockout_days / paths,
+        "waste_units": np.clip((inflow - sales_total - stock).mean(axis=2), 0, None),
+        "holding_units": holding.mean(axis=2),
+        "orders": orders / paths,
+        "ordered_units": (inflow - inventory[:, None, None] + pipeline).mean(axis=2),
+        "end_stock": stock.mean(axis=2),
+    }
+    return results
+
+
+def simulate_policies(forecast_df: pd.DataFrame, original_df: pd.DataFrame, policies: list,
+                      days: int = SIMULATION_HORIZON_DAYS, paths: int = SIMULATION_PATHS,
+                      lead_time: int = SIMULATION_LEAD_TIME_DAYS, costs: dict = None,
+                      seed: int = 0) -> pd.DataFrame:
+    """
+    Expected outcomes of each reorder policy for every SKU, one row per
+    (sku, policy), from ``paths`` simulated demand paths over ``days``.
+
+    ``policies`` are ``parse_policies`` tuples; ``costs`` overrides
+    ``DEFAULT_COSTS``. SKUs are simulated in chunks of
+    ``SIMULATION_CHUNK_SKUS`` (spread over ``SIMULATION_THREADS``), each with
+    its own seeded stream, so a given forecast and seed always give the
+    same results.
+    """
+    costs = {**DEFAULT_COSTS, **(costs or {})}
+    state = stock_state(original_df)
+    skus, mean, sigma = demand_inputs(forecast_df, state, days)
+    if not len(skus):
+        return pd.DataFrame(columns=["sku", "policy"] + RESULT_COLUMNS)
+
+    state = state.loc[skus]
+    inventory = state["inventory"].to_numpy(dtype="float32")
+    days_to_expiry = state["days_to_expiry"].to_numpy(dtype="float64")
+    shelf_life = state["shelf_life"].to_numpy(dtype="float64")
+    daily = mean.mean(axis=1, dtype="float64")
+    low = np.outer(daily, [p[1] for p in policies])
+    high = np.outer(daily, [p[2] for p in policies])
+    review = np.array([p[3] for p in policies])
+
+    bounds = range(0, len(skus), SIMULATION_CHUNK_SKUS)
+    seeds = np.random.SeedSequence(seed).spawn(len(bounds))
+
+    def run(i, start):
+        end = start + SIMULATION_CHUNK_SKUS
+        return _simulate_chunk(
+            mean[start:end], sigma[start:end], inventory[start:end], days_to_expiry[start:end],
+            shelf_life[start:end], low[start:end], high[start:end], review,
+            paths, lead_time, np.random.default_rng(seeds[i]),
+        )
+
+    if SIMULATION_THREADS > 1 and len(bounds) > 1:
+        # NumPy releases the GIL inside array operations
+        with ThreadPoolExecutor(max_workers=SIMULATION_THREADS) as pool:
+            chunks = list(pool.map(run, range(len(bounds)), bounds))
+    else:
+        chunks = [run(i, start) for i, start in enumerate(bounds)]
+
+    names = [p[0] for p in policies]
+    result = pd.DataFrame({
+        "sku": np.repeat(skus, len(policies)),
+        "policy": np.tile(names, len(skus)),
+        **{key: np.concatenate([chunk[key] for chunk in chunks]).ravel().astype("float64")
+           for key in chunks[0]},
+    })
+    with np.errstate(invalid="ignore", divide="ignore"):
+        result["fill_rate"] = np.where(result["demand"] > 0, result["sales"] / result["demand"], 1.0)
+    result["holding_cost"] = result["holding_units"] * costs["holding_cost"]
+    result["waste_cost"] = result["waste_units"] * costs["waste_cost"]
+    result["stockout_cost"] = result["stockout_units"] * costs["stockout_cost"]
+    result["order_cost"] = result["orders"] * costs["order_cost"]
+    result["total_cost"] = result[list(COST_KEYS)].sum(axis=1)
+    result[RESULT_COLUMNS] = result[RESULT_COLUMNS].round(4)
+    return result[["sku", "policy"] + RESULT_COLUMNS]
+
+
+def summarize(result: pd.DataFrame) -> list:
+    """Per-policy totals over all SKUs, and how many SKUs each policy is cheapest for."""
+    totals = result.groupby("policy", sort=False)[RESULT_COLUMNS].sum()
+    with np.errstate(invalid="ignore", divide="ignore"):
+        totals["fill_rate"] = np.where(totals["demand"] > 0, totals["sales"] / totals["demand"], 1.0)
+    best = result.loc[result.groupby("sku", sort=False)["total_cost"].idxmin(), "policy"]
+    totals["best_for_skus"] = best.value_counts().reindex(totals.index, fill_value=0)
+    return frame_records(totals.round(4).reset_index())
+
+# -------------------------------
+# Upload → Forecast → Simulation
+# -------------------------------
+def run_simulation(df: pd.DataFrame, policies: list, days: int = SIMULATION_HORIZON_DAYS,
+                   paths: int = SIMULATION_PATHS, lead_time: int = SIMULATION_LEAD_TIME_DAYS,
+                   costs: dict = None, seed: int = 0) -> dict:
+    """Forecast ``days`` ahead daily, then simulate every policy for every SKU."""
+    with stage("forecast"):
+        if FORECAST_MODE == HIERARCHICAL:
+            forecast_df = forecast_hierarchical(df, horizon=days, freq="D")
+        else:
+            forecast_df = forecast_demand(df, horizon=days, freq="D")
+
+    started = time.perf_counter()
+    with stage("simulate"):
+        result = simulate_policies(forecast_df, df, policies, days, paths, lead_time, costs, seed)
+    logger.info(f"🎲 Simulated {result['sku'].nunique()} SKUs x {len(policies)} policies x {paths} paths "
+                f"x {days} days in {time.perf_counter() - started:.2f}s")
+
+    best = result.loc[result.groupby("sku", sort=False)["total_cost"].idxmin(), ["sku", "policy"]]
+    by_sku = {}
+    for record in frame_records(result):
+        by_sku.setdefault(record["sku"], {})[record.pop("policy")] = record
+        record.pop("sku")
+    skus = [
+        {"sku": sku, "best_policy": policy, "policies": by_sku[sku]}
+        for sku, policy in zip(best["sku"].tolist(), best["policy"].tolist())
+    ]
+    return {
+        "params": {"days": days, "paths": paths, "lead_time_days": lead_time, "seed": seed,
+                   "costs": {**DEFAULT_COSTS, **(costs or {})}},
+        "policies": summarize(result),
+        "skus": skus,
+        "errors": sanitize_json(forecast_df.attrs.get("errors", [])),
+    }
+
+# -------------------------------
+# Simulation API
+# -------------------------------
+router = APIRouter()
+
+@router.post("/simulate")
+async def simulate(
+    file: UploadFile = File(...),
+    policies: str = Form(None, description="JSON list of policy specs; defaults to SIMULATION_POLICIES"),
+    costs: str = Form(None, description="JSON object overriding holding/waste/stockout/order costs"),
+    days: int = Query(SIMULATION_HORIZON_DAYS, ge=1, le=365),
+    paths: int = Query(SIMULATION_PATHS, ge=1, le=SIMULATION_MAX_PATHS),
+    lead_time: int = Query(SIMULATION_LEAD_TIME_DAYS, ge=1, le=90),
+    seed: int = Query(0, ge=0),
+):
+    """
+    Monte Carlo what-if for reorder policies: forecast the upload, then
+    simulate (s,S), min/max and order-up-to candidates for every SKU and
+    report expected stockouts, waste and costs per policy and per SKU.
+    """
+    try:
+        candidates = parse_policies(json.loads(policies) if policies else SIMULATION_POLICIES)
+        cost_overrides = parse_costs(json.loads(costs) if costs else {})
+    except (json.JSONDecodeError, PolicyError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    def read_upload():
+        upload_format = sniff_format(file.file)
+        if upload_format in COLUMNAR_FORMATS:
+            return read_columnar(file.file, upload_format)
+        return parse_csv(file.file)
+
+    try:
+        df = await run_in_threadpool(read_upload)
+    except (CSVSchemaError, UploadFormatError) as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return await run_in_threadpool(run_simulation, df, candidates, days, paths, lead_time, cost_overrides, seed)
@@ -0,0 +1,67 @@
+import io
+import os
+import sys
+import tempfile
+
+import pandas as pd
+import pytest
+
+# Config is read at import time, so point every store at a scratch directory
+# before any backend module is imported.
+_SCRATCH = tempfile.mkdtemp(prefix="inventory-tests-")
+for name, value in {
+    "MODEL_CACHE_DIR": os.path.join(_SCRATCH, "model_cache"),
+    "RESPONSE_CACHE_DIR": os.path.join(_SCRATCH, "response_cache"),
+    "JOBS_DB_PATH": os.path.join(_SCRATCH, "jobs.sqlite3"),
+    "JOBS_UPLOAD_DIR": os.path.join(_SCRATCH, "job_uploads"),
+    "JOBS_RESULT_DIR": os.path.join(_SCRATCH, "job_results"),
+    "HISTORY_DB_PATH": os.path.join(_SCRATCH, "history.sqlite3"),
+    "GLOBAL_MODEL_DIR": os.path.join(_SCRATCH, "global_models"),
+    "BATCH_OUTPUT_DIR": os.path.join(_SCRATCH, "batch_output"),
+    "FORECAST_BACKEND": "smoothing",
+    "FORECAST_MAX_WORKERS": "1",
+    "WARMUP_ENABLED": "0",
+}.items():
+    os.environ.setdefault(name, value)
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def make_upload(skus: int = 2, days: int = 60, date_format: str = "%d-%m-%Y", start: str = "2025-01-01",
+                expiry: bool = True) -> bytes:
+    """A small ``inventory_data.csv``-shaped upload."""
+    dates = pd.date_range(start, periods=days, freq="D")
+    frames = []
+    for i in range(skus):
+        frame = pd.DataFrame({
+            "date": dates.strftime(date_format),
+            "sku": f"SKU{i + 1:03d}",
+            "product_name": f"Product {i + 1}",
+            "inventory": 50 + (pd.RangeIndex(days) * 7 + i) % 30,
+            "sales": 5 + (pd.RangeIndex(days) * 3 + i) % 7,
+        })
+        if expiry:
+            frame["expiry_date"] = (dates + pd.Timedelta(days=20)).strftime(date_format)
+        frames.append(frame)
+    return pd.concat(frames).to_csv(index=False).encode("utf-8")
+
+
+@pytest.fixture
+def upload():
+    return make_upload
+
+
+@pytest.fixture
+def client():
+    from fastapi.testclient import TestClient
+    import main
+
+    with TestClient(main.app) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def csv_file():
+    def build(data: bytes):
+        return {"file": ("inventory.csv", io.BytesIO(data), "text/csv")}
+    return build
@@ -0,0 +1,62 @@
+import json
+import os
+import shutil
+
+import pytest
+
+from alert_rules import RuleError, RuleSet, get_rules
+from config import ALERT_RULES_PATH
+
+
+@pytest.fixture
+def rules_path(tmp_path):
+    path = tmp_path / "alert_rules.json"
+    shutil.copy(ALERT_RULES_PATH, path)
+    return str(path)
+
+
+def _rewrite(path, text, bump):
+    with open(path, "w") as f:
+        f.write(text)
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + bump * 1_000_000_000))
+
+
+def test_default_rules_compile():
+    assert get_rules().rules
+
+
+@pytest.mark.parametrize("data", [[], "rules", 3, {"rules": "x"}, {"rules": ["not a rule"]}])
+def test_non_object_rules_are_rule_errors(data):
+    with pytest.raises(RuleError):
+        RuleSet.from_dict(data)
+
+
+def test_invalid_edit_keeps_last_good_rules(rules_path):
+    good = get_rules(rules_path)
+    _rewrite(rules_path, "[]", bump=1)
+    assert get_rules(rules_path) is good
+    _rewrite(rules_path, "{not json", bump=2)
+    assert get_rules(rules_path) is good
+
+
+def test_valid_edit_is_picked_up(rules_path):
+    good = get_rules(rules_path)
+    with open(rules_path) as f:
+        data = json.load(f)
+    data["rules"] = data["rules"][:1]
+    _rewrite(rules_path, json.dumps(data), bump=1)
+    reloaded = get_rules(rules_path)
+    assert reloaded is not good
+    assert len(reloaded.rules) == 1
+
+
+def test_missing_file_keeps_last_good_rules(rules_path):
+    good = get_rules(rules_path)
+    os.remove(rules_path)
+    assert get_rules(rules_path) is good
+
+
+def test_missing_file_without_previous_rules_is_a_rule_error(tmp_path):
+    with pytest.raises(RuleError):
+        get_rules(str(tmp_path / "missing.json"))
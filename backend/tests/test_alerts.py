@@ -0,0 +1,27 @@
+import io
+
+import pandas as pd
+
+from pipeline import run_prediction
+from utils import parse_csv
+
+
+def _upload(rows):
+    frame = pd.DataFrame(rows, columns=["date", "sku", "product_name", "inventory", "sales", "expiry_date"])
+    return parse_csv(io.BytesIO(frame.to_csv(index=False).encode()))
+
+
+def _history(sku, days, inventory, sales, expiry_in):
+    dates = pd.date_range("2025-03-01", periods=days, freq="D")
+    expiry = (dates[-1] + pd.Timedelta(days=expiry_in)).strftime("%d-%m-%Y")
+    return [(d.strftime("%d-%m-%Y"), sku, f"{sku} name", inventory, sales, expiry) for d in dates]
+
+
+def test_alerts_have_one_block_per_sku_with_known_severities():
+    df = _upload(_history("LOW", 40, inventory=1, sales=10, expiry_in=30)
+                 + _history("HIGH", 40, inventory=900, sales=1, expiry_in=30))
+    blocks = {block["sku"]: block for block in run_prediction(df)["alerts"]}
+    assert set(blocks) == {"LOW", "HIGH"}
+    for block in blocks.values():
+        assert {alert["severity"] for alert in block["alerts"]} <= {"Critical", "High", "Medium", "Low"}
+    assert blocks["LOW"]["alerts"]
@@ -0,0 +1,18 @@
+import io
+
+from backtest import accuracy, run_backtest
+from tests.conftest import make_upload
+from utils import parse_csv
+
+
+def _upload(skus=3, days=60):
+    return parse_csv(io.BytesIO(make_upload(skus=skus, days=days)))
+
+
+def test_backtest_scores_every_fold():
+    rows, fits, runs, params = run_backtest(_upload(), ["smoothing"], folds=2, horizon=7)
+    assert params["folds"] == 2
+    assert set(rows["sku"]) == {"SKU001", "SKU002", "SKU003"}
+    summary = accuracy(rows, ["backend"])
+    assert 0 <= summary["wape"].iloc[0] < 100
+    assert runs[0]["failed_fits"] == 0
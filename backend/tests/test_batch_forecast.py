@@ -0,0 +1,61 @@
+import json
+import os
+
+import pandas as pd
+import pytest
+
+import batch_forecast
+from model import forecast_demand
+from tests.conftest import make_upload
+from utils import parse_csv
+
+
+def test_rerun_skips_finished_inputs(tmp_path, capsys):
+    path = tmp_path / "inventory.csv"
+    path.write_bytes(make_upload(skus=3, days=40))
+    output = str(tmp_path / "out")
+    argv = [str(path), "--output", output, "--checkpoint-skus", "1"]
+
+    batch_forecast.main(argv)
+    first = json.loads(capsys.readouterr().out)
+    assert first["inputs"][0]["skus"] == 3
+    assert first["parts"] >= 3
+    forecast = pd.read_parquet(os.path.join(output, "forecast"))
+    assert set(forecast["sku"]) == {"SKU001", "SKU002", "SKU003"}
+
+    batch_forecast.main(argv)
+    second = json.loads(capsys.readouterr().out)
+    assert second["inputs"][0]["skipped"]
+    assert second["parts"] == first["parts"]
+
+
+def test_changed_settings_need_restart(tmp_path, capsys):
+    path = tmp_path / "inventory.csv"
+    path.write_bytes(make_upload(skus=1, days=40))
+    output = str(tmp_path / "out")
+    batch_forecast.main([str(path), "--output", output])
+    with pytest.raises(ValueError):
+        batch_forecast.main([str(path), "--output", output, "--horizon", "3"])
+    batch_forecast.main([str(path), "--output", output, "--horizon", "3", "--restart"])
+
+
+
+def test_empty_parts_read_back_with_the_rest(tmp_path):
+    path = tmp_path / "inventory.csv"
+    path.write_bytes(make_upload(skus=2, days=40))
+    df = parse_csv(str(path))
+    forecast = forecast_demand(df, max_workers=1)
+    originals = dict(iter(df.groupby("sku", sort=False, observed=True)))
+    batch = list(forecast.groupby("sku", sort=False))
+    tables = batch_forecast._part_tables(batch, originals, period_days=1, horizon_days=7)
+    assert len(tables["alerts"]) and len(tables["waste"])
+
+    checkpoint = batch_forecast.Checkpoint(str(tmp_path / "out"), params={})
+    checkpoint.input_state(str(path))
+    empty = {"forecast": tables["forecast"].iloc[:0], "alerts": batch_forecast._alert_rows([]),
+             "waste": pd.DataFrame(columns=tables["waste"].columns)}
+    checkpoint.write_part(str(path), empty, skus=[], errors=[])
+    checkpoint.write_part(str(path), tables, skus=["SKU001", "SKU002"], errors=[])
+
+    for table in batch_forecast.TABLES:
+        assert len(pd.read_parquet(tmp_path / "out" / table)) == len(tables[table])
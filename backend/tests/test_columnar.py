@@ -0,0 +1,27 @@
+import io
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+from columnar import read_result
+from tests.conftest import make_upload
+
+
+def test_arrow_and_parquet_results_carry_side_tables(client, csv_file):
+    data = make_upload(skus=2, days=40)
+    table, side_tables = read_result(client.post("/predict?format=arrow", files=csv_file(data)).content)
+    assert set(table.column("sku").to_pylist()) == {"SKU001", "SKU002"}
+    assert {"alerts", "waste", "errors"} <= set(side_tables)
+
+    parquet = pq.read_table(io.BytesIO(client.post("/predict?format=parquet", files=csv_file(data)).content))
+    assert parquet.num_rows == table.num_rows
+
+
+def test_parquet_upload_matches_csv_upload(client, csv_file):
+    data = make_upload(skus=2, days=40, date_format="%Y-%m-%d")
+    frame = pd.read_csv(io.BytesIO(data), parse_dates=["date"])
+    sink = io.BytesIO()
+    frame.to_parquet(sink, index=False)
+    from_csv = client.post("/predict", files=csv_file(data)).json()
+    from_parquet = client.post("/predict", files={"file": ("inventory.parquet", sink.getvalue())}).json()
+    assert len(from_csv["forecast"]) == len(from_parquet["forecast"])
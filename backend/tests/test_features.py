@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from features import FEATURE_COLUMNS, build_features, history_window, step_features
+
+
+def _frame(days_by_sku):
+    rows = [(sku, pd.Timestamp("2025-01-01") + pd.Timedelta(days=day), float(value))
+            for sku, days in days_by_sku.items() for day, value in days]
+    frame = pd.DataFrame(rows, columns=["sku", "ds", "y"])
+    frame["is_holiday"] = 0
+    return frame
+
+
+def test_lags_are_taken_by_date_across_gaps():
+    # Day 2 is missing: day 3's lag_1 is unknown, its lag_7 is before the history
+    frame = _frame({"A": [(0, 10), (1, 20), (3, 40), (7, 80)]})
+    features = build_features(frame)
+    assert features["lag_1"].tolist() == [0, 10, 15, pytest.approx(70 / 3)]
+    assert features["lag_7"].tolist()[-1] == 10
+    assert features["roll_mean_7"].tolist() == [0, 10, 15, pytest.approx(70 / 3)]
+    assert features["history"].tolist() == [0, 1, 2, 3]
+
+
+def test_gap_free_series_matches_row_shifts():
+    frame = _frame({"A": [(day, day + 1) for day in range(20)], "B": [(day, 2 * day) for day in range(5)]})
+    features = build_features(frame)
+    a = features[frame["sku"] == "A"]
+    assert a["lag_1"].tolist()[1:] == frame.loc[frame["sku"] == "A", "y"].tolist()[:-1]
+    assert a["lag_14"].iloc[19] == 6
+
+
+def test_step_features_match_build_features():
+    days = {"A": [(0, 5), (1, 7), (4, 3), (9, 8), (10, 2), (30, 6), (31, 4)], "B": [(0, 1), (2, 3)]}
+    next_day = {"A": 32, "B": 3}
+    frame = _frame(days)
+    extended = _frame({sku: rows + [(next_day[sku], 0)] for sku, rows in days.items()})
+    expected = build_features(extended)[extended["ds"].isin(
+        [pd.Timestamp("2025-01-01") + pd.Timedelta(days=d) for d in next_day.values()])
+        & (extended.groupby("sku").cumcount(ascending=False) == 0)]
+
+    codes = pd.factorize(frame["sku"])[0]
+    window = history_window(codes, frame["ds"].to_numpy(), frame["y"].to_numpy(), 2)
+    step_days = np.array([pd.Timestamp("2025-01-01") + pd.Timedelta(days=next_day[sku]) for sku in ("A", "B")],
+                         dtype="datetime64[D]")
+    actual = step_features(window, step_days, np.zeros(2), np.full(2, np.nan))
+    np.testing.assert_allclose(actual[FEATURE_COLUMNS].to_numpy(),
+                               expected[FEATURE_COLUMNS].to_numpy(), rtol=1e-6)
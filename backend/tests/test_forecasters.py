@@ -0,0 +1,28 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from forecasters import BACKENDS, QUANTILE_COLUMNS, Forecaster
+
+
+def test_forecaster_is_abstract():
+    with pytest.raises(TypeError):
+        Forecaster()
+
+    class Incomplete(Forecaster):
+        name = "incomplete"
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_smoothing_backend_returns_history_and_horizon():
+    dates = pd.date_range("2025-01-01", periods=30, freq="D")
+    series = [(sku, pd.DataFrame({"ds": dates, "y": np.arange(30, dtype=float) % 7 + offset}))
+              for sku, offset in (("A", 1), ("B", 5))]
+    frames = BACKENDS["smoothing"].forecast(series, periods=7)
+    assert set(frames) == {"A", "B"}
+    for frame in frames.values():
+        assert len(frame) == 37
+        assert frame["date"].iloc[-1] == dates[-1] + pd.Timedelta(days=7)
+        assert set(QUANTILE_COLUMNS) <= set(frame.columns)
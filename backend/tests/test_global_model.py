@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+
+import features
+import train_model
+from forecasters import GlobalForecaster
+from tests.conftest import make_upload
+
+
+def test_train_and_forecast_with_gaps(tmp_path):
+    data = make_upload(skus=3, days=90)
+    lines = data.decode().splitlines()
+    # Drop every 10th day so the series have gaps
+    path = tmp_path / "history.csv"
+    path.write_text("\n".join([lines[0]] + [line for i, line in enumerate(lines[1:]) if i % 10 != 5]) + "\n")
+
+    version = tmp_path.name
+    train_model.main([str(path), "--epochs", "1", "--version", version])
+    assert features.latest_version() == version
+
+    forecaster = GlobalForecaster(version)
+    assert forecaster.available()
+
+    dates = pd.date_range("2025-01-01", periods=40, freq="D").delete([5, 17])
+    series = [("A", pd.DataFrame({"ds": dates, "y": np.arange(len(dates)) % 5 + 3.0, "is_holiday": 0.0}))]
+    frame = forecaster.forecast(series, periods=7)["A"]
+    assert len(frame) == len(dates) + 7
+    assert np.isfinite(frame["prediction"]).all()
+    assert (frame["prediction"] >= 0).all()
@@ -0,0 +1,31 @@
+import io
+
+import pandas as pd
+
+from hierarchy import forecast_hierarchical
+from tests.conftest import make_upload
+from utils import parse_csv
+
+
+def _upload(skus=3, days=60):
+    return parse_csv(io.BytesIO(make_upload(skus=skus, days=days)))
+
+
+def test_hierarchical_forecast_covers_every_sku():
+    df = _upload()
+    df["store"] = ["north" if sku != "SKU003" else "south" for sku in df["sku"]]
+    df["category"] = "dairy"
+    forecast = forecast_hierarchical(df, backend="smoothing", horizon=5)
+    assert set(forecast["sku"]) == {"SKU001", "SKU002", "SKU003"}
+    future = forecast[forecast["date"] > df["date"].max()]
+    assert future.groupby("sku").size().eq(5).all()
+    assert not forecast.attrs.get("errors")
+
+
+def test_hierarchical_forecast_leaves_the_input_frame_alone():
+    df = pd.read_csv(io.BytesIO(make_upload(skus=2, days=40, start="2025-06-01")))
+    df["store"] = "north"
+    before = df["date"].copy()
+    forecast = forecast_hierarchical(df, backend="smoothing", horizon=3)
+    pd.testing.assert_series_equal(df["date"], before)
+    assert forecast["date"].min() == pd.Timestamp("2025-06-01")
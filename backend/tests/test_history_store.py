@@ -0,0 +1,62 @@
+import io
+
+import pytest
+
+import history_store
+from history_store import HistoryStore
+from tests.conftest import make_upload
+from utils import parse_csv
+
+
+@pytest.fixture
+def store(tmp_path, monkeypatch):
+    store = HistoryStore(str(tmp_path / "history.sqlite3"))
+    monkeypatch.setattr(history_store, "_store", store)
+    return store
+
+
+def _rows(days=40, start="2025-01-01"):
+    return parse_csv(io.BytesIO(make_upload(skus=2, days=days, start=start)))
+
+
+def test_append_ignores_unchanged_rows(store):
+    rows = _rows()
+    assert store.append(rows) == ["SKU001", "SKU002"]
+    assert store.append(rows) == []
+
+
+def test_update_reforecasts_changed_skus_only(store):
+    history_store.apply_update(_rows())
+    assert store.stale_skus() == []
+
+    update = _rows(days=1, start="2025-02-10")
+    update = update[update["sku"] == "SKU002"]
+    response = history_store.apply_update(update)
+    assert response["updated_skus"] == ["SKU002"]
+    assert {row["sku"] for row in response["forecast"]} == {"SKU002"}
+
+
+def test_failed_reforecast_is_retried(store, monkeypatch):
+    def fail(*args, **kwargs):
+        raise RuntimeError("fit crashed")
+
+    rows = _rows()
+    with monkeypatch.context() as patch:
+        patch.setattr(history_store, "forecast_demand", fail)
+        with pytest.raises(RuntimeError):
+            history_store.apply_update(rows)
+    assert store.stale_skus() == ["SKU001", "SKU002"]
+
+    # Re-sending the same rows changes nothing, but the stale SKUs are retried
+    response = history_store.apply_update(rows)
+    assert response["updated_skus"] == []
+    assert {row["sku"] for row in response["forecast"]} == {"SKU001", "SKU002"}
+    assert store.stale_skus() == []
+
+
+def test_scratch_tables_do_not_outlive_a_call(store):
+    store.append(_rows())
+    store.load_history(["SKU001"])
+    with store._connect() as conn:
+        tables = {name for (name,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    assert not {"incoming_keys", "wanted_skus"} & tables
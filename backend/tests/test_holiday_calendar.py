@@ -0,0 +1,17 @@
+import numpy as np
+import pandas as pd
+
+from holiday_calendar import holiday_name, is_holiday
+
+
+def test_daily_flags_and_names():
+    dates = pd.to_datetime(["2025-01-26", "2025-01-27", "2025-08-15"])
+    assert is_holiday(dates).tolist() == [1, 0, 1]
+    names = holiday_name(dates)
+    assert names[0] and names[1] is None and names[2]
+
+
+def test_weekly_periods_flag_any_holiday_inside():
+    mondays = np.array(["2025-01-20", "2025-02-03"], dtype="datetime64[D]")
+    # Republic Day (Sunday 26 January) falls in the first week only
+    assert is_holiday(mondays, period_days=7).tolist() == [1, 0]
@@ -0,0 +1,17 @@
+import pandas as pd
+
+from forecasters import QUANTILE_COLUMNS
+from tests.conftest import make_upload
+
+
+def test_weekly_horizon_and_quantiles(client, csv_file):
+    body = client.post("/predict?freq=W&horizon=3", files=csv_file(make_upload(skus=1, days=70))).json()
+    future = [row for row in body["forecast"] if row.get("sales") is None]
+    assert len(future) == 3
+    assert all(pd.Timestamp(row["date"]).dayofweek == 0 for row in body["forecast"])
+    lower, median, upper = QUANTILE_COLUMNS
+    assert all(row[lower] <= row[median] <= row[upper] for row in body["forecast"])
+
+
+def test_bad_horizon_is_400(client, csv_file):
+    assert client.post("/predict?horizon=0", files=csv_file(make_upload(skus=1, days=30))).status_code == 400
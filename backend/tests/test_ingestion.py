@@ -0,0 +1,83 @@
+import io
+
+import pandas as pd
+import pytest
+
+from tests.conftest import make_upload
+from model import forecast_demand
+from utils import CSVSchemaError, parse_csv, parse_dates
+
+
+def test_iso_dates_round_trip_unchanged():
+    df = parse_csv(io.BytesIO(make_upload(skus=1, days=3, date_format="%Y-%m-%d", start="2025-06-01")))
+    assert df["date"].dt.strftime("%Y-%m-%d").tolist() == ["2025-06-01", "2025-06-02", "2025-06-03"]
+
+
+def test_day_first_dates_still_parse_day_first():
+    df = parse_csv(io.BytesIO(make_upload(skus=1, days=2, date_format="%d-%m-%Y", start="2025-06-01")))
+    assert df["date"].dt.strftime("%Y-%m-%d").tolist() == ["2025-06-01", "2025-06-02"]
+
+
+def test_parse_dates_mixes_iso_and_day_first():
+    parsed = parse_dates(pd.Series(["2025-06-02", "03-04-2025", None]))
+    assert parsed.iloc[0] == pd.Timestamp("2025-06-02")
+    assert parsed.iloc[1] == pd.Timestamp("2025-04-03")
+    assert pd.isna(parsed.iloc[2])
+
+
+def test_iso_expiry_dates_are_not_swapped():
+    parsed = parse_dates(pd.Series(["2025-06-01", "not a date"]), errors="coerce")
+    assert parsed.iloc[0] == pd.Timestamp("2025-06-01")
+    assert pd.isna(parsed.iloc[1])
+
+
+
+def test_forecast_parses_day_first_strings_without_touching_the_input():
+    df = pd.read_csv(io.BytesIO(make_upload(skus=1, days=30, start="2025-06-01")))
+    before = df["date"].copy()
+    forecast = forecast_demand(df, max_workers=1)
+    pd.testing.assert_series_equal(df["date"], before)
+    assert forecast["date"].min() == pd.Timestamp("2025-06-01")
+
+def test_missing_columns_raise_schema_error():
+    with pytest.raises(CSVSchemaError):
+        parse_csv(io.BytesIO(b"date,sku\n01-01-2025,A\n"))
+
+
+def test_predict_keeps_iso_upload_dates(client, csv_file):
+    data = make_upload(skus=1, days=40, date_format="%Y-%m-%d", start="2025-06-01")
+    response = client.post("/predict", files=csv_file(data))
+    assert response.status_code == 200
+    actual_dates = sorted({row["date"][:10] for row in response.json()["forecast"] if row.get("sales") is not None})
+    assert actual_dates[0] == "2025-06-01"
+    assert actual_dates[-1] == "2025-07-10"
+
+
+HEADER_ONLY = b"date,sku,product_name,inventory,sales\n"
+
+
+def test_upload_status_codes(client, csv_file):
+    assert client.post("/predict", files=csv_file(b"date,sku\n01-01-2025,A\n")).status_code == 400
+    assert client.post("/predict", files=csv_file(HEADER_ONLY)).status_code == 400
+    assert client.post("/predict", files={"file": ("inventory.parquet", b"PAR1garbagePAR1")}).status_code == 400
+    assert client.post("/predict", files=csv_file(make_upload(skus=1, days=30))).status_code == 200
+
+
+def test_empty_upload_is_400_in_every_format(client, csv_file):
+    for response_format in ("json", "ndjson", "arrow", "parquet"):
+        response = client.post(f"/predict?format={response_format}", files=csv_file(HEADER_ONLY))
+        assert response.status_code == 400, response_format
+
+
+def test_empty_columnar_upload_is_400(client):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    empty = pa.table({name: pa.array([], type=pa.string()) for name in ("date", "sku", "product_name")}
+                     | {name: pa.array([], type=pa.int64()) for name in ("inventory", "sales")})
+    sink = io.BytesIO()
+    pq.write_table(empty, sink)
+    for response_format in ("json", "ndjson"):
+        response = client.post(f"/predict?format={response_format}",
+                               files={"file": ("inventory.parquet", sink.getvalue())})
+        assert response.status_code == 400, response_format
@@ -0,0 +1,29 @@
+import time
+import urllib.parse
+
+from tests.conftest import make_upload
+
+
+def _wait(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/jobs/{job_id}", params={"result": "false"}).json()
+        if job["status"] in ("completed", "failed"):
+            return job
+        time.sleep(0.2)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_job_sku_lookup_with_reserved_characters(client, csv_file):
+    data = make_upload(skus=2, days=40).replace(b"SKU002", b"A/B 2")
+    job_id = client.post("/jobs", files=csv_file(data)).json()["job_id"]
+    assert _wait(client, job_id)["status"] == "completed"
+
+    assert "A/B 2" in client.get(f"/jobs/{job_id}/skus").json()["skus"]
+    response = client.get(f"/jobs/{job_id}/sku/{urllib.parse.quote('A/B 2', safe='')}")
+    assert response.status_code == 200
+    assert client.get(f"/jobs/{job_id}/sku/NOPE").status_code == 404
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/jobs/does-not-exist").status_code == 404
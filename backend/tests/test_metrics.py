@@ -0,0 +1,53 @@
+import os
+import subprocess
+import sys
+
+import metrics
+import model_cache
+import response_cache
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def test_render_includes_cache_sizes():
+    text = metrics.render()
+    assert "model_cache_hits_total" in text
+    assert "model_cache_bytes" in text
+
+
+def test_render_with_caches_disabled(monkeypatch):
+    monkeypatch.setattr(model_cache, "MODEL_CACHE_ENABLED", False)
+    monkeypatch.setattr(response_cache, "RESPONSE_CACHE_ENABLED", False)
+    text = metrics.render()
+    assert "model_cache_misses_total" in text
+    assert "model_cache_bytes" not in text
+    assert "response_cache_bytes" not in text
+
+
+def test_render_sums_counters_across_worker_processes(monkeypatch, tmp_path):
+    # Another worker process increments and publishes its snapshot at exit.
+    other = """
+import metrics, model_cache
+metrics.share_across_processes()
+metrics.SKUS_FORECAST.inc(3, backend="other-worker")
+model_cache.record(True, 1.0)
+"""
+    env = {**os.environ, "METRICS_ENABLED": "1", "METRICS_MULTIPROC_DIR": str(tmp_path)}
+    subprocess.run([sys.executable, "-c", other], cwd=BACKEND_DIR, env=env, check=True)
+
+    monkeypatch.setattr(metrics, "METRICS_MULTIPROC_DIR", str(tmp_path))
+    monkeypatch.setattr(metrics, "_snapshot_name", "this-worker.json")
+    monkeypatch.setattr(metrics, "_last_flushed", None)
+    metrics.SKUS_FORECAST.inc(2, backend="other-worker")
+    before = model_cache.counters()["hits"]
+
+    text = metrics.render()
+    assert 'forecast_skus_total{backend="other-worker"} 5.0' in text
+    assert f"model_cache_hits_total {before + 1}" in text
+    assert len(list(tmp_path.glob("*.json"))) == 2
+
+
+def test_reset_multiproc_dir_drops_old_snapshots(tmp_path):
+    (tmp_path / "123-1.json").write_text("{}")
+    metrics.reset_multiproc_dir(str(tmp_path))
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,31 @@
+import io
+
+import pandas as pd
+
+import model_cache
+from model import PROPHET_CONFIG, forecast_demand
+from tests.conftest import make_upload
+from utils import parse_csv
+
+
+def _sales(values):
+    dates = pd.date_range("2025-01-01", periods=len(values), freq="D")
+    return pd.DataFrame({"ds": dates, "y": values, "is_holiday": 0})
+
+
+def test_fingerprint_tracks_history_and_config():
+    base = model_cache.fingerprint(_sales([1, 2, 3]), PROPHET_CONFIG)
+    assert base == model_cache.fingerprint(_sales([1, 2, 3]), PROPHET_CONFIG)
+    assert base != model_cache.fingerprint(_sales([1, 2, 4]), PROPHET_CONFIG)
+    assert base != model_cache.fingerprint(_sales([1, 2, 3]), {**PROPHET_CONFIG, "interval_width": 0.5})
+
+
+def test_second_prophet_fit_is_served_from_cache():
+    df = parse_csv(io.BytesIO(make_upload(skus=1, days=35, start="2023-05-01")))
+    before = model_cache.cache_stats()
+    first = forecast_demand(df, max_workers=1, backend="prophet")
+    second = forecast_demand(df, max_workers=1, backend="prophet")
+    after = model_cache.cache_stats()
+    assert after["misses"] - before["misses"] == 1
+    assert after["hits"] - before["hits"] == 1
+    pd.testing.assert_series_equal(first["prediction"], second["prediction"])
@@ -0,0 +1,11 @@
+import json
+
+from tests.conftest import make_upload
+
+
+def test_ndjson_streams_one_line_per_sku_then_errors(client, csv_file):
+    response = client.post("/predict?format=ndjson", files=csv_file(make_upload(skus=3, days=40)))
+    assert response.status_code == 200
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert list(lines[-1]) == ["errors"]
+    assert len(lines) == 4
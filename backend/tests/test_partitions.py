@@ -0,0 +1,44 @@
+import io
+
+import pandas as pd
+import pyarrow as pa
+import pytest
+
+import utils
+from tests.conftest import make_upload
+
+
+def _write(frame, path, fmt):
+    frame = frame.assign(date=pd.to_datetime(frame["date"], dayfirst=True))
+    if fmt == "csv":
+        frame.assign(date=frame["date"].dt.strftime("%Y-%m-%d")).to_csv(path, index=False)
+    elif fmt == "parquet":
+        frame.to_parquet(path, index=False, row_group_size=10)
+    else:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        with pa.ipc.new_file(str(path), table.schema) as writer:
+            for batch in table.to_batches(max_chunksize=10):
+                writer.write_batch(batch)
+
+
+def _rows(partitions):
+    return {str(sku): sorted(zip(part["date"], part["sales"])) for sku, part in partitions}
+
+
+@pytest.mark.parametrize("fmt", ["csv", "parquet", "arrow"])
+@pytest.mark.parametrize("grouped", [True, False])
+def test_partitions_stream_or_spill_every_format(tmp_path, monkeypatch, fmt, grouped):
+    frame = pd.read_csv(io.BytesIO(make_upload(skus=3, days=25)))
+    if not grouped:
+        frame = frame.sample(frac=1, random_state=0)
+    path = tmp_path / f"inventory.{fmt}"
+    _write(frame, path, fmt)
+
+    spilled = []
+    spill = utils.iter_spilled_partitions
+    monkeypatch.setattr(utils, "iter_spilled_partitions", lambda chunks: spilled.append(True) or spill(chunks, buckets=2))
+
+    rows = _rows(utils.iter_partitions(str(path), chunksize=7))
+    expected = _rows(utils.parse_csv(io.BytesIO(make_upload(skus=3, days=25))).groupby("sku", observed=True))
+    assert rows == expected
+    assert spilled == ([] if grouped else [True])
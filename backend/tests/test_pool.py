@@ -0,0 +1,89 @@
+import os
+import threading
+import time
+
+import pandas as pd
+
+import model
+
+
+def _fake_fit(sku, sales_df, periods, init=None, period_days=1):
+    """Stands in for ``model._fit_sku``: sleeps for the SKU's ``y`` value."""
+    time.sleep(float(sales_df["y"].iloc[0]))
+    frame = pd.DataFrame({"date": [pd.Timestamp("2025-01-01")], "prediction": [1.0], "sku": [sku]})
+    return frame, False, 0.01, {"pid": os.getpid()}
+
+
+def _tasks(seconds_by_sku):
+    return [(seq, sku, pd.DataFrame({"y": [seconds]})) for seq, (sku, seconds) in enumerate(seconds_by_sku.items())]
+
+
+def _run(monkeypatch, seconds_by_sku, max_workers, sku_timeout, pids=None):
+    monkeypatch.setattr(model, "_fit_sku", _fake_fit)
+    errors = []
+    done = []
+    for _, sku, _, params in model._run_pool(
+        _tasks(seconds_by_sku), periods=1, errors=errors, tick=lambda: None, warm_start={},
+        max_workers=max_workers, sku_timeout=sku_timeout,
+    ):
+        done.append(sku)
+        if pids is not None:
+            pids.add(params["pid"])
+    return done, errors
+
+
+def _in_threads(*runs):
+    results = [None] * len(runs)
+    threads = [threading.Thread(target=lambda i=i, run=run: results.__setitem__(i, run())) for i, run in enumerate(runs)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return results
+
+
+def test_queued_skus_get_their_full_budget(monkeypatch):
+    # Four 0.6s fits on one worker take 2.4s in total, well past the 1.5s
+    # budget, but each one is timed from its own start.
+    done, errors = _run(monkeypatch, {"A": 0.6, "B": 0.6, "C": 0.6, "D": 0.6}, max_workers=1, sku_timeout=1.5)
+    assert done == ["A", "B", "C", "D"]
+    assert errors == []
+
+
+def test_hung_fit_is_killed_and_the_rest_still_run(monkeypatch):
+    started = time.monotonic()
+    done, errors = _run(monkeypatch, {"HUNG": 60, "A": 0.1, "B": 0.1}, max_workers=1, sku_timeout=1.0)
+    assert done == ["A", "B"]
+    assert [(e["sku"], e["stage"]) for e in errors] == [("HUNG", "timeout")]
+    assert time.monotonic() - started < 20
+
+
+def test_fits_beside_a_hung_one_are_rerun(monkeypatch):
+    # C starts at ~1s and is still fitting when HUNG times out at 2s, so it is
+    # restarted on the fresh pool with a new budget.
+    done, errors = _run(monkeypatch, {"HUNG": 60, "B": 1.0, "C": 1.5}, max_workers=2, sku_timeout=2.0)
+    assert done == ["B", "C"]
+    assert [e["sku"] for e in errors] == ["HUNG"]
+
+
+def test_concurrent_forecasts_share_one_pool(monkeypatch):
+    pids = set()
+    results = _in_threads(
+        lambda: _run(monkeypatch, {"A": 0.3, "B": 0.3, "C": 0.3}, max_workers=2, sku_timeout=10, pids=pids),
+        lambda: _run(monkeypatch, {"D": 0.3, "E": 0.3, "F": 0.3}, max_workers=2, sku_timeout=10, pids=pids),
+    )
+    assert [sorted(done) for done, _ in results] == [["A", "B", "C"], ["D", "E", "F"]]
+    assert len(pids) <= model._pool_size == 2
+    assert model._in_flight == 0
+
+
+def test_a_hung_fit_does_not_fail_another_forecast(monkeypatch):
+    # HUNG's timeout kills the shared pool's workers under the other
+    # forecast's running fit, which is rerun on the fresh pool.
+    (hung_done, hung_errors), (done, errors) = _in_threads(
+        lambda: _run(monkeypatch, {"HUNG": 60}, max_workers=2, sku_timeout=1.0),
+        lambda: _run(monkeypatch, {"A": 0.5, "B": 0.5, "C": 0.5}, max_workers=2, sku_timeout=10),
+    )
+    assert [e["stage"] for e in hung_errors] == ["timeout"]
+    assert sorted(done) == ["A", "B", "C"]
+    assert errors == []
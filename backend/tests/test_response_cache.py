@@ -0,0 +1,83 @@
+import config
+import response_cache
+
+
+def _post(client, csv_file, data, headers=None, query=""):
+    return client.post(f"/predict{query}", files=csv_file(data), headers=headers or {})
+
+
+def test_miss_then_hit_with_same_etag(client, csv_file, upload):
+    data = upload(skus=2, days=45, start="2024-03-01")
+    first = _post(client, csv_file, data)
+    second = _post(client, csv_file, data)
+    assert first.status_code == second.status_code == 200
+    assert second.headers["x-cache"] == "hit"
+    assert first.headers["etag"] == second.headers["etag"]
+    assert first.content == second.content
+
+
+def test_if_none_match_returns_304_once_cached(client, csv_file, upload):
+    data = upload(skus=2, days=46, start="2024-03-01")
+    tag = _post(client, csv_file, data).headers["etag"]
+    assert _post(client, csv_file, data, {"If-None-Match": tag}).status_code == 304
+    assert _post(client, csv_file, data, {"If-None-Match": f"W/{tag}"}).status_code == 304
+    assert _post(client, csv_file, data, {"If-None-Match": '"other"'}).status_code == 200
+
+
+def test_star_is_not_modified_only_when_cached(client, csv_file, upload):
+    data = upload(skus=2, days=47, start="2024-03-01")
+    first = _post(client, csv_file, data, {"If-None-Match": "*"})
+    assert first.status_code == 200
+    assert _post(client, csv_file, data, {"If-None-Match": "*"}).status_code == 304
+
+
+def test_parameters_change_the_key(client, csv_file, upload):
+    data = upload(skus=2, days=48, start="2024-03-01")
+    daily = _post(client, csv_file, data)
+    weekly = _post(client, csv_file, data, query="?freq=W")
+    assert daily.headers["etag"] != weekly.headers["etag"]
+    assert weekly.headers["x-cache"] == "miss"
+
+
+def test_boolean_settings_change_the_key(monkeypatch):
+    before = response_cache.model_version()
+    monkeypatch.setattr(config, "CSV_DATE_DAYFIRST", not config.CSV_DATE_DAYFIRST)
+    assert response_cache.model_version() != before
+
+
+def test_responses_with_errors_are_not_cached(client, csv_file, upload):
+    # A SKU with no sales is skipped and reported in ``errors``
+    lines = upload(skus=2, days=49, start="2024-03-01").decode().splitlines()
+    header = lines[0].split(",")
+    sales = header.index("sales")
+    rows = [line.split(",") for line in lines[1:]]
+    for row in rows:
+        if row[1] == "SKU002":
+            row[sales] = "0"
+    data = "\n".join([lines[0]] + [",".join(row) for row in rows]).encode() + b"\n"
+
+    for _ in range(2):
+        response = _post(client, csv_file, data)
+        assert response.status_code == 200
+        assert response.json()["errors"]
+        assert response.headers["x-cache"] == "miss"
+    tag = response.headers["etag"]
+    assert _post(client, csv_file, data, {"If-None-Match": tag}).status_code == 200
+
+
+def test_columnar_responses_with_errors_are_not_cached(client, csv_file, upload):
+    lines = upload(skus=1, days=50, start="2024-03-01").decode().splitlines()
+    lines.append(lines[1].replace("SKU001", "EMPTY").replace(",Product 1,", ",Empty,"))
+    data = ("\n".join(lines) + "\n").encode()
+    first = _post(client, csv_file, data, query="?format=parquet")
+    second = _post(client, csv_file, data, query="?format=parquet")
+    assert first.status_code == second.status_code == 200
+    assert second.headers["x-cache"] == "miss"
+
+
+def test_ndjson_stream_is_cached_once_sent(client, csv_file, upload):
+    data = upload(skus=2, days=51, start="2024-03-01")
+    first = _post(client, csv_file, data, query="?format=ndjson")
+    second = _post(client, csv_file, data, query="?format=ndjson")
+    assert second.headers["x-cache"] == "hit"
+    assert first.content == second.content
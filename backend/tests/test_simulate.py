@@ -0,0 +1,38 @@
+import json
+
+import pytest
+
+from simulate import PolicyError, parse_costs, parse_policies
+from tests.conftest import make_upload
+
+
+def test_parse_costs_coerces_numbers():
+    assert parse_costs({"waste_cost": "2.5", "order_cost": 0}) == {"waste_cost": 2.5, "order_cost": 0.0}
+
+
+@pytest.mark.parametrize("costs", [{"waste_cost": -1}, {"waste_cost": "abc"}, {"waste_cost": None},
+                                   {"waste_cost": "nan"}, {"typo_cost": 1}, [1, 2]])
+def test_parse_costs_rejects_bad_values(costs):
+    with pytest.raises(PolicyError):
+        parse_costs(costs)
+
+
+def test_parse_policies_rejects_inverted_levels():
+    with pytest.raises(PolicyError):
+        parse_policies([{"type": "sS", "s_days": 9, "S_days": 3}])
+
+
+def test_simulate_bad_costs_are_400(client, csv_file):
+    for costs in ({"waste_cost": "abc"}, {"stockout_cost": -3}):
+        response = client.post("/simulate", files=csv_file(make_upload(skus=1, days=30)),
+                               data={"costs": json.dumps(costs)})
+        assert response.status_code == 400
+
+
+def test_simulate_reports_every_policy(client, csv_file):
+    response = client.post("/simulate?paths=50&days=10", files=csv_file(make_upload(skus=2, days=40)),
+                           data={"costs": json.dumps({"waste_cost": "1.5"})})
+    assert response.status_code == 200
+    body = response.json()
+    assert {row["policy"] for row in body["policies"]} == {"sS", "min_max", "order_up_to"}
+    assert body["params"]["costs"]["waste_cost"] == 1.5
@@ -0,0 +1,27 @@
+import io
+
+import pandas as pd
+
+from pipeline import run_prediction
+from utils import parse_csv
+
+
+def _upload(rows):
+    frame = pd.DataFrame(rows, columns=["date", "sku", "product_name", "inventory", "sales", "expiry_date"])
+    return parse_csv(io.BytesIO(frame.to_csv(index=False).encode()))
+
+
+def _history(sku, days, inventory, sales, expiry_in):
+    dates = pd.date_range("2025-03-01", periods=days, freq="D")
+    expiry = (dates[-1] + pd.Timedelta(days=expiry_in)).strftime("%d-%m-%Y")
+    return [(d.strftime("%d-%m-%Y"), sku, f"{sku} name", inventory, sales, expiry) for d in dates]
+
+
+def test_near_expiry_overstock_projects_waste():
+    df = _upload(_history("SLOW", 40, inventory=500, sales=2, expiry_in=3)
+                 + _history("FAST", 40, inventory=20, sales=15, expiry_in=30))
+    result = run_prediction(df)
+    waste = {row["sku"]: row for row in result["waste"]}
+    assert waste["SLOW"]["projected_waste"] > 400
+    assert waste["SLOW"]["days_to_expiry"] == 3
+    assert waste.get("FAST", {"projected_waste": 0})["projected_waste"] == 0
@@ -1,26 +1,197 @@
+"""
+Train the global demand model: one regressor for every SKU, scored by the
+``global`` forecaster backend in a single batched predict per forecast step.
+
+    python train_model.py inventory_data.csv
+    python train_model.py "exports/inventory_*.csv" stores.parquet --epochs 5
+    python train_model.py data/ --chunk-rows 100000 --holdout-days 28
+
+Each row is a SKU-day; features (see ``features.FEATURE_COLUMNS``) are lags
+and rolling means of earlier sales, day of week, the holiday flag and days to
+expiry, never the day's own sales.
+
+Inputs are read a chunk (or record batch) at a time by ``utils.iter_partitions``.
+CSV, Parquet and Arrow files whose rows are grouped by SKU stream SKU by SKU;
+other files are first spilled to temporary per-bucket files by SKU hash, so
+memory holds one bucket (about 1/``PARTITION_SPILL_BUCKETS`` of the file)
+rather than the whole file. Every pass re-reads the inputs, so sort large
+exports by SKU to skip the spill. Whole SKUs are assembled into
+``--chunk-rows`` chunks: one pass fits the feature scaler, each of
+``--epochs`` passes feeds shuffled chunks to ``SGDRegressor.partial_fit``, and
+a last pass scores each SKU's final ``--holdout-days`` days, which are never
+trained on, against a 7-day moving-average baseline.
+
+Models are saved under ``GLOBAL_MODEL_DIR/<version>/`` with a metadata.json,
+and ``LATEST`` is pointed at the new version.
+"""
+import argparse
+import json
+import logging
+import sys
+import time
+
+import numpy as np
 import pandas as pd
-from sklearn.ensemble import RandomForestRegressor
-import joblib
-import os
 
-# Load CSV
-df = pd.read_csv(r"C:\Users\Admin\OneDrive\Desktop\VScode\ai-inventory-optimizer\backend\inventory_data.csv")
+from config import (
+    GLOBAL_MODEL_DIR,
+    TRAIN_CHUNK_ROWS,
+    TRAIN_EPOCHS,
+    TRAIN_HOLDOUT_DAYS,
+)
+from features import FEATURE_COLUMNS, FEATURE_VERSION, build_features, save_model
+from utils import iter_partitions, parse_dates
+
+# -------------------------------
+# Training Data
+# -------------------------------
+def _daily_frame(sku, part: pd.DataFrame) -> pd.DataFrame:
+    frame = pd.DataFrame({
+        "sku": str(sku),
+        "ds": pd.to_datetime(part["date"]).to_numpy(),
+        "y": part["sales"].to_numpy(dtype="float64"),
+    })
+    if "expiry_date" in part:
+        expiry = parse_dates(part["expiry_date"], errors="coerce")
+        frame["days_to_expiry"] = (expiry.to_numpy() - frame["ds"].to_numpy()) / np.timedelta64(1, "D")
+    return frame.sort_values("ds", kind="stable")
+
+
+def iter_chunks(paths: list, chunk_rows: int = TRAIN_CHUNK_ROWS, holdout_days: int = TRAIN_HOLDOUT_DAYS):
+    """
+    Yield ``(features, y, holdout)`` for chunks of about ``chunk_rows`` rows.
+    Chunks hold whole SKUs, so lags never cross a chunk boundary; a SKU's
+    first row (no history to learn from) is left out.
+    """
+    from holiday_calendar import is_holiday
+
+    def emit(frames):
+        frame = pd.concat(frames, ignore_index=True)
+        frame["is_holiday"] = is_holiday(frame["ds"])
+        features = build_features(frame)
+        # Days back from each SKU's last day
+        last_day = frame.groupby("sku", sort=False)["ds"].transform("max")
+        from_end = ((last_day - frame["ds"]) / pd.Timedelta(days=1)).to_numpy()
+        keep = features.pop("history").to_numpy() > 0
+        return (features[keep].reset_index(drop=True), frame["y"].to_numpy(dtype="float64")[keep],
+                from_end[keep] < holdout_days)
+
+    for path in paths:
+        frames, rows = [], 0
+        for sku, part in iter_partitions(path):
+            frames.append(_daily_frame(sku, part))
+            rows += len(part)
+            if rows >= chunk_rows:
+                yield emit(frames)
+                frames, rows = [], 0
+        if frames:
+            yield emit(frames)
+
+# -------------------------------
+# Out-of-Core Training
+# -------------------------------
+def train(paths: list, epochs: int = TRAIN_EPOCHS, chunk_rows: int = TRAIN_CHUNK_ROWS,
+          holdout_days: int = TRAIN_HOLDOUT_DAYS, seed: int = 0):
+    """Return ``(bundle, stats)``: the fitted scaler/regressor and training/holdout statistics."""
+    from sklearn.linear_model import SGDRegressor
+    from sklearn.preprocessing import StandardScaler
+
+    rng = np.random.default_rng(seed)
+    scaler = StandardScaler()
+    regressor = SGDRegressor(loss="huber", epsilon=5.0, alpha=1e-5, learning_rate="adaptive",
+                             eta0=0.01, random_state=seed)
+    stats = {"train_rows": 0, "holdout_rows": 0, "chunks": 0}
+
+    started = time.perf_counter()
+    for features, y, holdout in iter_chunks(paths, chunk_rows, holdout_days):
+        if (~holdout).any():
+            scaler.partial_fit(features[~holdout].to_numpy(dtype="float64"))
+        stats["train_rows"] += int((~holdout).sum())
+        stats["holdout_rows"] += int(holdout.sum())
+        stats["chunks"] += 1
+    if not stats["train_rows"]:
+        raise ValueError("No training rows; the inputs need SKUs with more history than --holdout-days.")
+    print(f"📏 Scaled {stats['train_rows']} rows in {stats['chunks']} chunks "
+          f"({time.perf_counter() - started:.1f}s)", file=sys.stderr)
+
+    for epoch in range(epochs):
+        started = time.perf_counter()
+        for features, y, holdout in iter_chunks(paths, chunk_rows, holdout_days):
+            train_at = np.flatnonzero(~holdout)
+            if not len(train_at):
+                continue
+            # Chunks are ordered by SKU and date; shuffle so SGD sees mixed rows
+            train_at = rng.permutation(train_at)
+            regressor.partial_fit(scaler.transform(features.iloc[train_at].to_numpy(dtype="float64")), y[train_at])
+        print(f"🏋️ Epoch {epoch + 1}/{epochs} in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+    bundle = {
+        "feature_version": FEATURE_VERSION,
+        "features": list(FEATURE_COLUMNS),
+        "scaler": scaler,
+        "regressor": regressor,
+    }
+    stats["holdout"] = evaluate(bundle, paths, chunk_rows, holdout_days)
+    return bundle, stats
+
+
+def evaluate(bundle: dict, paths: list, chunk_rows: int, holdout_days: int) -> dict:
+    """One-step-ahead WAPE (%) on the held-out days, next to the 7-day moving average's."""
+    from features import predict
+
+    error = baseline_error = actual = 0.0
+    for features, y, holdout in iter_chunks(paths, chunk_rows, holdout_days):
+        if not holdout.any():
+            continue
+        held = features[holdout]
+        error += np.abs(predict(bundle, held) - y[holdout]).sum()
+        baseline_error += np.abs(held["roll_mean_7"].to_numpy(dtype="float64") - y[holdout]).sum()
+        actual += np.abs(y[holdout]).sum()
+    if not actual:
+        return {"wape": None, "baseline_wape": None}
+    return {"wape": round(100 * error / actual, 3), "baseline_wape": round(100 * baseline_error / actual, 3)}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Train the global demand model out of core and save a new version.")
+    parser.add_argument("inputs", nargs="+", help="CSV/Parquet/Arrow files, directories or glob patterns")
+    parser.add_argument("--epochs", type=int, default=TRAIN_EPOCHS, help="passes of partial_fit over the data")
+    parser.add_argument("--chunk-rows", type=int, default=TRAIN_CHUNK_ROWS, help="rows per training chunk")
+    parser.add_argument("--holdout-days", type=int, default=TRAIN_HOLDOUT_DAYS,
+                        help="each SKU's last days, held out for scoring")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--model-dir", default=GLOBAL_MODEL_DIR, help="versioned model directory")
+    parser.add_argument("--version", help="version name (default: a UTC timestamp)")
+    args = parser.parse_args(argv)
+
+    # Pipeline modules configure INFO logging when they are imported
+    logging.disable(logging.INFO)
 
-# Preview data
-print("📊 Columns:", df.columns)
+    import sklearn
+    from batch_forecast import expand_inputs
 
-# Define your features and target
-features = ['inventory', 'sales']
-target = 'sales'  # TEMP: Predicting sales as proxy if 'demand' not available
+    paths = expand_inputs(args.inputs)
+    started = time.perf_counter()
+    bundle, stats = train(paths, args.epochs, args.chunk_rows, args.holdout_days, args.seed)
 
-# Train model
-X = df[features]
-y = df[target]
+    version = args.version or time.strftime("%Y%m%dT%H%M%SZ", time.gmtime())
+    metadata = {
+        "version": version,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%SZ", time.gmtime()),
+        "feature_version": FEATURE_VERSION,
+        "features": list(FEATURE_COLUMNS),
+        "inputs": paths,
+        "epochs": args.epochs,
+        "chunk_rows": args.chunk_rows,
+        "holdout_days": args.holdout_days,
+        "sklearn_version": sklearn.__version__,
+        "train_seconds": round(time.perf_counter() - started, 3),
+        "coefficients": dict(zip(FEATURE_COLUMNS, np.round(bundle["regressor"].coef_, 4).tolist())),
+        **stats,
+    }
+    target = save_model(bundle, metadata, version, args.model_dir)
+    print(json.dumps({"model": target, **metadata}, indent=2))
 
-model = RandomForestRegressor()
-model.fit(X, y)
 
-# Save model
-os.makedirs("models", exist_ok=True)
-joblib.dump(model, "models/inventory_model.pkl")
-print("✅ Model saved to models/inventory_model.pkl")
+if __name__ == "__main__":
+    main()
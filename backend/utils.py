@@ -1,7 +1,12 @@
+import numpy as np
 import pandas as pd
-from prophet import Prophet
 import logging
-import holidays
+import os
+import pickle
+import tempfile
+from contextlib import ExitStack
+
+from config import CSV_CHUNK_ROWS, CSV_DATE_DAYFIRST, PARTITION_SPILL_BUCKETS
 
 # -------------------------------
 # Logging Setup
@@ -9,68 +14,257 @@ import holidays
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+REQUIRED_COLUMNS = {"date", "sku", "sales", "inventory"}
+EMPTY_UPLOAD_MESSAGE = "Uploaded file contains no rows."
+
+# Year-first dates are unambiguous and must never be read day-first
+ISO_DATE_PATTERN = r"^\d{4}-\d{1,2}-\d{1,2}"
+
+# Explicit dtypes so pandas never has to sniff (or hold) the raw text
+CSV_DTYPES = {
+    "sku": "string",
+    "product_name": "string",
+    "store": "string",
+    "category": "string",
+    "sales": "Int64",
+    "inventory": "Int64",
+}
+
+
+class CSVSchemaError(ValueError):
+    """The upload is missing columns the pipeline needs, or has no rows."""
+
+    def __init__(self, missing: set = frozenset(), message: str = None):
+        self.missing = missing
+        super().__init__(message or f"Missing required columns: {missing}")
+
+
+class UngroupedInputError(ValueError):
+    """Rows for one SKU are not contiguous, so SKUs can't be streamed."""
+
+
+def missing_columns(columns) -> set:
+    return REQUIRED_COLUMNS - set(columns)
+
+
+def parse_dates(values, errors: str = "raise") -> pd.Series:
+    """
+    Parse date strings: ISO ``YYYY-MM-DD`` values as ISO 8601, everything
+    else day-first when ``CSV_DATE_DAYFIRST`` is set (``DD-MM-YYYY``
+    exports). Already parsed datetimes pass through unchanged.
+    """
+    values = pd.Series(values)
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values
+    text = values.astype("string").str.strip()
+    iso = text.str.match(ISO_DATE_PATTERN).fillna(False).to_numpy(dtype=bool)
+    parsed = [pd.to_datetime(text[iso], format="ISO8601", errors=errors)]
+    if not iso.all():
+        parsed.append(pd.to_datetime(text[~iso], dayfirst=CSV_DATE_DAYFIRST, errors=errors))
+    return pd.concat(parsed).reindex(values.index)
+
 # -------------------------------
-# Holiday Regressor Helper
+# Chunked CSV Reading
 # -------------------------------
-def is_indian_holiday(date):
-    india_holidays = holidays.CountryHoliday("IN")
-    return int(date in india_holidays)
+def iter_csv_chunks(source, chunksize: int = CSV_CHUNK_ROWS):
+    """
+    Parse ``source`` (path or binary file object) incrementally with fixed dtypes.
+
+    Only one chunk of raw text is decoded at a time.
+    """
+    # Closing the reader explicitly leaves a caller's file object open (and
+    # seekable) even if we stop part-way through.
+    with pd.read_csv(source, dtype=CSV_DTYPES, chunksize=chunksize) as reader:
+        for i, chunk in enumerate(reader):
+            if i == 0:
+                missing = missing_columns(chunk.columns)
+                if missing:
+                    raise CSVSchemaError(missing)
+            chunk = chunk[chunk["sku"].notna()]
+            try:
+                chunk["date"] = parse_dates(chunk["date"])
+            except Exception as e:
+                logger.error(f"❌ Failed to parse 'date' column: {e}")
+                raise ValueError("Invalid date format in input data.")
+            yield chunk
+
+
+def finalize_frame(df: pd.DataFrame, categorical_sku: bool = True) -> pd.DataFrame:
+    """Compact a parsed upload: categorical SKUs, plain integer counts where possible."""
+    df = df.copy()
+    df["sku"] = df["sku"].astype(object)
+    if categorical_sku:
+        df["sku"] = df["sku"].astype("category")
+    for col in ("sales", "inventory"):
+        if df[col].isna().any():
+            df[col] = df[col].astype("float64")
+        else:
+            df[col] = df[col].astype("int64")
+    for col in ("product_name", "store", "category"):
+        if col in df.columns:
+            df[col] = df[col].astype(object).where(df[col].notna(), None)
+    return df
+
+
+def parse_csv(source, chunksize: int = CSV_CHUNK_ROWS) -> pd.DataFrame:
+    """Read a whole upload into one typed DataFrame."""
+    df = pd.concat(iter_csv_chunks(source, chunksize), ignore_index=True)
+    if df.empty:
+        raise CSVSchemaError(message=EMPTY_UPLOAD_MESSAGE)
+    return finalize_frame(df)
+
+
+def concat_partitions(frames: list) -> pd.DataFrame:
+    """Reassemble streamed SKU partitions into one upload frame."""
+    df = pd.concat(frames, ignore_index=True)
+    df["sku"] = df["sku"].astype("category")
+    return df
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def read_head(source) -> pd.DataFrame:
+    """The header and first data row, untyped; rewinds ``source`` afterwards."""
+    try:
+        return pd.read_csv(source, nrows=1, dtype=str)
+    finally:
+        _rewind(source)
 
 # -------------------------------
-# Demand Forecast Function
+# Streaming SKU Partitions
 # -------------------------------
-def forecast_demand(df: pd.DataFrame) -> pd.DataFrame:
-    result_frames = []
+def skus_are_grouped(sku_chunks) -> bool:
+    """True if each SKU's values in the ``sku_chunks`` arrays are contiguous."""
+    seen = set()
+    last = None
+    for skus in sku_chunks:
+        skus = skus[pd.notna(skus)]
+        if not len(skus):
+            continue
+        runs = skus[np.concatenate(([0], np.flatnonzero(skus[1:] != skus[:-1]) + 1))]
+        if runs[0] == last:
+            runs = runs[1:]
+        if len(set(runs)) != len(runs) or not seen.isdisjoint(runs):
+            return False
+        seen.update(runs)
+        last = skus[-1]
+    return True
+
 
+def is_grouped_by_sku(source, chunksize: int = CSV_CHUNK_ROWS) -> bool:
+    """
+    Cheap pre-pass over the ``sku`` column only: True if each SKU's rows are
+    contiguous, i.e. ``iter_sku_partitions`` can stream the file. Rewinds
+    ``source`` afterwards.
+    """
     try:
-        df["date"] = pd.to_datetime(df["date"])
-    except Exception as e:
-        logger.error(f"❌ Failed to parse 'date' column: {e}")
-        raise ValueError("Invalid date format in input data.")
-
-    for sku in df["sku"].unique():
-        logger.info(f"📊 Forecasting for SKU: {sku}")
-
-        sku_df = df[df["sku"] == sku].copy()
-        sku_df["is_holiday"] = sku_df["date"].apply(is_indian_holiday)
-
-        try:
-            sales_df = sku_df[["date", "sales", "is_holiday"]].rename(columns={
-                "date": "ds", "sales": "y"
-            })
-        except KeyError as ke:
-            logger.error(f"⚠️ Missing required columns in input data: {ke}")
-            continue
+        with pd.read_csv(source, usecols=["sku"], dtype={"sku": "string"}, chunksize=chunksize) as reader:
+            return skus_are_grouped(chunk["sku"].to_numpy(dtype=object) for chunk in reader)
+    finally:
+        _rewind(source)
 
-        if sales_df["y"].sum() == 0 or len(sales_df) < 2:
-            logger.warning(f"⛔ Skipping SKU '{sku}' due to insufficient data.")
-            continue
 
-        try:
-            model = Prophet(daily_seasonality=True)
-            model.add_regressor("is_holiday")
-            model.fit(sales_df)
+def iter_chunk_partitions(chunks):
+    """
+    Yield ``(sku, frame)`` for each SKU as soon as all of its rows have been
+    read from ``chunks`` (typed frames, e.g. from ``iter_csv_chunks``).
 
-            future = model.make_future_dataframe(periods=7)
-            future["is_holiday"] = future["ds"].apply(is_indian_holiday)
+    Assumes rows for a SKU are contiguous (the usual export layout). A SKU is
+    complete once a different SKU follows it; the trailing run of each chunk
+    is carried into the next one. Raises ``UngroupedInputError`` if a SKU
+    shows up again after it was yielded.
+    """
+    emitted = set()
+    carry = None
 
-            forecast = model.predict(future)
-            forecast_result = forecast[["ds", "yhat"]].rename(columns={
-                "ds": "date", "yhat": "prediction"
-            })
-            forecast_result["sku"] = sku
-            result_frames.append(forecast_result)
+    def run_starts(frame) -> np.ndarray:
+        skus = frame["sku"].to_numpy(dtype=object)
+        return np.concatenate(([0], np.flatnonzero(skus[1:] != skus[:-1]) + 1))
 
-            logger.info(f"✅ Forecast complete for SKU: {sku}")
+    def emit(frame, starts):
+        bounds = np.append(starts, len(frame))
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            part = frame.iloc[start:end].reset_index(drop=True)
+            sku = part["sku"].iat[0]
+            if sku in emitted:
+                raise UngroupedInputError(f"Rows for SKU '{sku}' are not contiguous.")
+            emitted.add(sku)
+            yield sku, finalize_frame(part, categorical_sku=False)
 
-        except Exception as e:
-            logger.error(f"❌ Forecasting failed for SKU '{sku}': {e}")
+    for chunk in chunks:
+        if carry is not None:
+            chunk = pd.concat([carry, chunk], ignore_index=True)
+        if chunk.empty:
             continue
 
-    if result_frames:
-        final_df = pd.concat(result_frames, ignore_index=True)
-        logger.info(f"📈 Forecasting complete for {len(result_frames)} SKUs.")
-        return final_df
+        # The last run may continue in the next chunk, so hold it back
+        starts = run_starts(chunk)
+        carry = chunk.iloc[starts[-1]:]
+        yield from emit(chunk.iloc[:starts[-1]], starts[:-1])
+
+    if carry is not None and len(carry):
+        yield from emit(carry, np.array([0]))
+
+
+def iter_sku_partitions(source, chunksize: int = CSV_CHUNK_ROWS):
+    """``iter_chunk_partitions`` over a CSV upload read ``chunksize`` rows at a time."""
+    return iter_chunk_partitions(iter_csv_chunks(source, chunksize))
+
+
+def iter_spilled_partitions(chunks, buckets: int = PARTITION_SPILL_BUCKETS):
+    """
+    Yield ``(sku, frame)`` per SKU from ``chunks`` whose SKUs are not contiguous.
+
+    Each chunk is split by SKU hash into ``buckets`` temporary files; the
+    buckets are then read back one at a time, so memory holds about
+    1/``buckets`` of the input instead of all of it.
+    """
+    with tempfile.TemporaryDirectory(prefix="sku-spill-") as directory:
+        paths = [os.path.join(directory, f"bucket-{i:03d}.pkl") for i in range(buckets)]
+        with ExitStack() as stack:
+            files = {}
+            for chunk in chunks:
+                codes = pd.util.hash_array(chunk["sku"].astype(str).to_numpy(dtype=object)) % buckets
+                for code, part in chunk.groupby(codes, sort=False):
+                    if code not in files:
+                        files[code] = stack.enter_context(open(paths[code], "wb"))
+                    pickle.dump(part, files[code], protocol=pickle.HIGHEST_PROTOCOL)
+
+        for path in paths:
+            if not os.path.exists(path):
+                continue
+            parts = []
+            with open(path, "rb") as f:
+                while True:
+                    try:
+                        parts.append(pickle.load(f))
+                    except EOFError:
+                        break
+            os.remove(path)
+            bucket = pd.concat(parts, ignore_index=True)
+            for sku, part in bucket.groupby("sku", sort=False):
+                yield sku, finalize_frame(part.reset_index(drop=True), categorical_sku=False)
+
+
+def iter_partitions(path: str, chunksize: int = CSV_CHUNK_ROWS):
+    """
+    ``(sku, frame)`` per SKU of one CSV, Parquet or Arrow input file, read a
+    chunk (or record batch) at a time. Files whose SKUs are contiguous stream
+    straight through; others go through ``iter_spilled_partitions``.
+    """
+    # Imported here: columnar itself builds on this module.
+    from columnar import COLUMNAR_FORMATS, iter_columnar_chunks, iter_columnar_skus, sniff_format
+
+    upload_format = sniff_format(path)
+    if upload_format in COLUMNAR_FORMATS:
+        grouped = skus_are_grouped(iter_columnar_skus(path, upload_format, chunksize))
+        chunks = iter_columnar_chunks(path, upload_format, chunksize)
     else:
-        logger.warning("⚠️ No forecast results generated.")
-        return pd.DataFrame(columns=["date", "prediction", "sku"])
+        grouped = is_grouped_by_sku(path, chunksize)
+        chunks = iter_csv_chunks(path, chunksize)
+    if grouped:
+        return iter_chunk_partitions(chunks)
+    logger.info(f"🪣 {path} is not grouped by SKU; spilling it to {PARTITION_SPILL_BUCKETS} buckets")
+    return iter_spilled_partitions(chunks)
@@ -0,0 +1,130 @@
+import logging
+import os
+import threading
+import time
+from datetime import date
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    MODEL_CACHE_ENABLED,
+    MODEL_CACHE_DIR,
+    WARMUP_CACHED_MODELS,
+)
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+_state_lock = threading.Lock()
+_state = {"ready": False, "seconds": None, "steps": {}, "error": None}
+
+
+def status() -> dict:
+    with _state_lock:
+        return {**_state, "steps": dict(_state["steps"])}
+
+
+def is_ready() -> bool:
+    with _state_lock:
+        return _state["ready"]
+
+# -------------------------------
+# Warm-up Steps
+# -------------------------------
+def _fit_prophet():
+    """Import Prophet and run one tiny fit, which loads the compiled Stan model."""
+    from model import _new_model
+
+    ds = pd.date_range(end=pd.Timestamp.today().normalize(), periods=30, freq="D")
+    y = 5 + 2 * np.sin(np.arange(len(ds)) * 2 * np.pi / 7)
+    model = _new_model()
+    model.fit(pd.DataFrame({"ds": ds, "y": y, "is_holiday": 0}))
+
+
+def _build_calendar():
+    from holiday_calendar import get_calendar
+
+    year = date.today().year
+    get_calendar(pd.to_datetime([f"{year - 2}-01-01", f"{year + 1}-12-31"]))
+
+
+def _load_backends():
+    """Load the sklearn regressor, memory-map the global model (if present) and compile the alert rules."""
+    from alert_rules import get_rules
+    from forecasters import GLOBAL, SKLEARN, get_forecaster
+
+    for name in (SKLEARN, GLOBAL):
+        forecaster = get_forecaster(name)
+        if forecaster.available():
+            forecaster._get_model()
+    get_rules()
+
+
+def _read_cached_models() -> int:
+    """
+    Read the most recently used model cache entries once, so the first
+    requests after a restart find them in the OS page cache.
+    """
+    if not MODEL_CACHE_ENABLED or WARMUP_CACHED_MODELS <= 0 or not os.path.isdir(MODEL_CACHE_DIR):
+        return 0
+    from model_cache import _get_store
+
+    entries = sorted(_get_store()._entries(), reverse=True)[:WARMUP_CACHED_MODELS]
+    read = 0
+    for _, _, path in entries:
+        try:
+            with open(path, "rb") as fh:
+                while fh.read(1 << 20):
+                    pass
+            read += 1
+        except OSError:
+            continue
+    return read
+
+
+STEPS = [
+    ("prophet", _fit_prophet),
+    ("holidays", _build_calendar),
+    ("backends", _load_backends),
+    ("model_cache", _read_cached_models),
+]
+
+
+def warm_up():
+    """
+    Preload everything the first upload would otherwise pay for.
+
+    Runs once per server process. Forecast worker processes don't inherit it:
+    they start from a forkserver that preloads the model module. A failing
+    step is logged and leaves the process not ready, so ``/health`` keeps it
+    out of rotation.
+    """
+    started = time.perf_counter()
+    for name, step in STEPS:
+        step_started = time.perf_counter()
+        try:
+            result = step()
+        except Exception as e:
+            logger.error(f"❌ Warm-up step '{name}' failed: {e}")
+            with _state_lock:
+                _state["error"] = f"{name}: {e}"
+            return
+        with _state_lock:
+            _state["steps"][name] = round(time.perf_counter() - step_started, 3)
+        if isinstance(result, int):
+            logger.info(f"🔥 Warm-up '{name}': {result} items")
+
+    with _state_lock:
+        _state["ready"] = True
+        _state["seconds"] = round(time.perf_counter() - started, 3)
+    logger.info(f"🔥 Warm-up complete in {_state['seconds']}s")
+
+
+def mark_ready():
+    """Skip warm-up (``WARMUP_ENABLED=0``) and report ready straight away."""
+    with _state_lock:
+        _state["ready"] = True
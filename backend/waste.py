@@ -0,0 +1,162 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from config import (
+    EXPIRY_WARNING_DAYS,
+    FORECAST_HORIZON_DAYS,
+    WASTE_TRANSFER_MIN_DAYS,
+    WASTE_TRANSFER_MIN_FRACTION,
+)
+from utils import parse_dates
+
+# -------------------------------
+# Logging Setup
+# -------------------------------
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+WASTE_COLUMNS = [
+    "rank", "sku", "product_name", "inventory", "expiry_date", "days_to_expiry",
+    "demand_before_expiry", "projected_waste", "waste_fraction",
+]
+
+
+def _empty() -> pd.DataFrame:
+    return pd.DataFrame(columns=WASTE_COLUMNS)
+
+# -------------------------------
+# Waste Projection
+# -------------------------------
+def project_waste(original_df: pd.DataFrame, forecast_df: pd.DataFrame,
+                  horizon: int = FORECAST_HORIZON_DAYS, period_days: int = 1) -> pd.DataFrame:
+    """
+    Units each SKU is expected to still hold when its stock expires.
+
+    Starting from the latest uploaded row per SKU (inventory and expiry date),
+    forecast demand is summed over the days up to the expiry date; beyond the
+    forecast horizon (in days) the horizon's average daily demand is assumed.
+    Forecast rows covering ``period_days`` days (weekly forecasts) are spread
+    evenly over their days. Stock that has already expired counts as waste in
+    full. SKUs without an expiry date are left out. The result is ranked by
+    projected waste, largest first.
+    """
+    if "expiry_date" not in original_df.columns or forecast_df.empty:
+        return _empty()
+
+    # Latest row per SKU: the stock on hand right now and when it expires
+    latest = original_df[["sku", "date", "inventory", "expiry_date"]].copy()
+    latest["date"] = pd.to_datetime(latest["date"])
+    latest = latest.sort_values("date", kind="stable").drop_duplicates("sku", keep="last")
+    latest["expiry_date"] = parse_dates(latest["expiry_date"], errors="coerce")
+    latest = latest.dropna(subset=["expiry_date", "inventory"])
+    if latest.empty:
+        return _empty()
+
+    skus = latest["sku"].astype(str).to_numpy()
+    as_of = latest["date"].to_numpy(dtype="datetime64[D]")
+    days_to_expiry = (latest["expiry_date"].to_numpy(dtype="datetime64[D]") - as_of).astype("int64")
+    inventory = latest["inventory"].to_numpy(dtype="float64")
+
+    # Forecast rows as (sku index, first/last day ahead covered, units per day)
+    codes = pd.Index(skus).get_indexer(forecast_df["sku"].astype(str))
+    known = codes >= 0
+    codes = codes[known]
+    first = (pd.to_datetime(forecast_df["date"]).to_numpy(dtype="datetime64[D]")[known] - as_of[codes]).astype("int64")
+    last = first + period_days - 1
+    daily_units = np.clip(forecast_df["prediction"].to_numpy(dtype="float64")[known], 0, None) / period_days
+    start = np.maximum(first, 1)
+
+    # Days of each row inside the horizon, and inside it before expiry; one
+    # bincount per quantity instead of a groupby per SKU
+    n = len(skus)
+    in_horizon = np.clip(np.minimum(last, horizon) - start + 1, 0, None)
+    before_expiry = np.clip(np.minimum(np.minimum(last, horizon), days_to_expiry[codes]) - start + 1, 0, None)
+    horizon_demand = np.bincount(codes, weights=daily_units * in_horizon, minlength=n)
+    horizon_days = np.bincount(codes, weights=in_horizon, minlength=n)
+    demand = np.bincount(codes, weights=daily_units * before_expiry, minlength=n)
+
+    with np.errstate(invalid="ignore", divide="ignore"):
+        daily = np.where(horizon_days > 0, horizon_demand / horizon_days, 0.0)
+    demand += daily * np.clip(days_to_expiry - horizon, 0, None)
+    demand = np.where(days_to_expiry <= 0, 0.0, demand)
+
+    waste = np.clip(inventory - demand, 0, None)
+    with np.errstate(invalid="ignore", divide="ignore"):
+        fraction = np.where(inventory > 0, waste / inventory, 0.0)
+
+    if "product_name" in original_df.columns:
+        names = original_df[["sku", "product_name"]].dropna().drop_duplicates("sku")
+        name_map = dict(zip(names["sku"].astype(str), names["product_name"]))
+    else:
+        name_map = {}
+
+    result = pd.DataFrame({
+        "sku": skus,
+        "product_name": [name_map.get(sku, "N/A") for sku in skus],
+        "inventory": latest["inventory"].to_numpy(),
+        "expiry_date": latest["expiry_date"].dt.strftime("%Y-%m-%d").to_numpy(),
+        "days_to_expiry": days_to_expiry,
+        "demand_before_expiry": demand.round(2),
+        "projected_waste": waste.round(2),
+        "waste_fraction": fraction.round(3),
+    })
+    result = result.sort_values(["projected_waste", "days_to_expiry"], ascending=[False, True], kind="stable")
+    result.insert(0, "rank", np.arange(1, len(result) + 1))
+    return result.reset_index(drop=True)
+
+# -------------------------------
+# Markdown / Transfer Alerts
+# -------------------------------
+def waste_alerts(waste_df: pd.DataFrame) -> dict:
+    """
+    Alerts for SKUs with projected waste that expire within ``EXPIRY_WARNING_DAYS``.
+
+    Stock that is already expired should be pulled. If a large share of the
+    stock would be wasted and there are still enough days to move it, transfer
+    it to another location. Otherwise, mark it down so it sells before expiry.
+    Returns ``{sku: [alert, ...]}``.
+    """
+    at_risk = waste_df[(waste_df["projected_waste"] > 0) & (waste_df["days_to_expiry"] <= EXPIRY_WARNING_DAYS)]
+
+    expired = at_risk["days_to_expiry"] <= 0
+    transfer = ~expired & (at_risk["days_to_expiry"] >= WASTE_TRANSFER_MIN_DAYS) \
+        & (at_risk["waste_fraction"] >= WASTE_TRANSFER_MIN_FRACTION)
+    urgent = at_risk["days_to_expiry"] <= 2
+
+    alerts = {}
+    for sku, units, days, expiry, is_expired, is_transfer, is_urgent in zip(
+        at_risk["sku"].tolist(),
+        at_risk["projected_waste"].tolist(),
+        at_risk["days_to_expiry"].tolist(),
+        at_risk["expiry_date"].tolist(),
+        expired.tolist(),
+        transfer.tolist(),
+        urgent.tolist(),
+    ):
+        if is_expired:
+            alert = {
+                "type": "Expired Stock",
+                "severity": "Critical",
+                "message": f"{units:g} units of {sku} expired on {expiry}. Remove from sale.",
+            }
+        elif is_transfer:
+            alert = {
+                "type": "Transfer Recommended",
+                "severity": "High",
+                "message": f"{units:g} units of {sku} are projected to expire unsold by {expiry} "
+                           f"({days} days). Transfer stock to a higher-demand location.",
+            }
+        else:
+            alert = {
+                "type": "Markdown Recommended",
+                "severity": "High" if is_urgent else "Medium",
+                "message": f"{units:g} units of {sku} are projected to expire unsold by {expiry} "
+                           f"({days} days). Consider a markdown to clear stock.",
+            }
+        alerts[sku] = [alert]
+
+    if alerts:
+        logger.info(f"🗑️ {len(alerts)} SKUs are projected to expire with unsold stock")
+    return alerts
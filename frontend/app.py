@@ -1,8 +1,15 @@
 import streamlit as st
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 import requests
 from streamlit_lottie import st_lottie
+import hashlib
+import io
 import json
+import math
+import time
+import urllib.parse
 
 # ------------------ Page Config ------------------
 st.set_page_config(page_title="AI Inventory Optimizer", layout="wide")
@@ -17,88 +24,202 @@ st.markdown("""
 st.sidebar.title("📌 Navigation")
 page = st.sidebar.radio("Go to", ["📤 Upload CSV", "📊 Dashboard", "📈 SKU Comparison"])
 
+BACKEND_URL = "http://localhost:8000"
+JOB_POLL_SECONDS = 2
+ARROW_STREAM = "application/vnd.apache.arrow.stream"
+SEVERITIES = ["Critical", "High", "Medium", "Low"]
+SEVERITY_ICONS = {"Critical": "⛔", "High": "🔴", "Medium": "🟠", "Low": "🟢"}
+PAGE_SIZES = [25, 50, 100]
+PREVIEW_ROWS = 10
+
+# ------------------ Forecast Job Polling ------------------
+def wait_for_job(job_id):
+    """Poll the backend until the forecast job finishes, showing SKU progress."""
+    progress_bar = st.progress(0.0, text="⏳ Processing with AI engine...")
+    while True:
+        job = requests.get(f"{BACKEND_URL}/jobs/{job_id}", params={"result": "false"}, timeout=60).json()
+        progress = job.get("progress", {})
+        done, total = progress.get("skus_done") or 0, progress.get("skus_total") or 0
+        if total:
+            progress_bar.progress(done / total, text=f"⏳ Forecasting SKUs: {done}/{total}")
+        if job["status"] in ("completed", "failed"):
+            progress_bar.empty()
+            return job
+        time.sleep(JOB_POLL_SECONDS)
+
+# ------------------ Cached Backend Reads ------------------
+# A finished job's result never changes, so every read is cached by job id
+# and only the rows on screen are fetched.
+@st.cache_data(show_spinner=False)
+def fetch_alert_page(job_id, severities, page_number, page_size):
+    response = requests.get(
+        f"{BACKEND_URL}/jobs/{job_id}/alerts",
+        params={"severity": list(severities), "page": page_number, "page_size": page_size},
+        timeout=60,
+    )
+    response.raise_for_status()
+    return response.json()
+
+
+@st.cache_data(show_spinner=False)
+def fetch_skus(job_id):
+    response = requests.get(f"{BACKEND_URL}/jobs/{job_id}/skus", timeout=60)
+    response.raise_for_status()
+    return response.json()["skus"]
+
+
+@st.cache_data(show_spinner=False)
+def fetch_sku_series(job_id, sku):
+    """One SKU's forecast rows (read from Arrow) and its alert block."""
+    response = requests.get(
+        f"{BACKEND_URL}/jobs/{job_id}/sku/{urllib.parse.quote(str(sku), safe='')}",
+        headers={"Accept": ARROW_STREAM},
+        timeout=60,
+    )
+    response.raise_for_status()
+    table = pa.ipc.open_stream(response.content).read_all()
+    blocks = json.loads((table.schema.metadata or {}).get(b"alerts", b"[]"))
+    return table.to_pandas(), blocks[0] if blocks else None
+
+# ------------------ Upload Handling ------------------
+@st.cache_data(show_spinner=False)
+def preview_upload(data, name):
+    """The first rows of an upload, without parsing the whole file."""
+    name = name.lower()
+    if name.endswith(".parquet"):
+        parquet = pq.ParquetFile(io.BytesIO(data))
+        if parquet.num_row_groups == 0:
+            return parquet.schema_arrow.empty_table().to_pandas()
+        return parquet.read_row_group(0).slice(0, PREVIEW_ROWS).to_pandas()
+    if name.endswith((".arrow", ".feather", ".ipc")):
+        source = pa.BufferReader(data)
+        if data[:6] == b"ARROW1":
+            reader = pa.ipc.open_file(source)
+            batch = reader.get_batch(0) if reader.num_record_batches else None
+        else:
+            reader = pa.ipc.open_stream(source)
+            batch = next(iter(reader), None)
+        if batch is None:
+            return reader.schema.empty_table().to_pandas()
+        return batch.slice(0, PREVIEW_ROWS).to_pandas()
+    return pd.read_csv(io.BytesIO(data), nrows=PREVIEW_ROWS)
+
+
+def submit_upload(data, name):
+    """
+    Job for this file's contents, submitting it only the first time it is
+    seen. Failed jobs are forgotten (see ``forget_upload``), so the next run
+    submits the file again.
+    """
+    file_hash = hashlib.sha256(data).hexdigest()
+    jobs = st.session_state.setdefault("jobs_by_hash", {})
+    if file_hash not in jobs:
+        response = requests.post(f"{BACKEND_URL}/jobs", files={"file": (name, data)}, timeout=60)
+        if response.status_code != 202:
+            raise RuntimeError(f"Backend Error: {response.status_code} - {response.text}")
+        jobs[file_hash] = {"job_id": response.json()["job_id"], "status": "queued"}
+    return jobs[file_hash]
+
+
+def forget_upload(data):
+    st.session_state.setdefault("jobs_by_hash", {}).pop(hashlib.sha256(data).hexdigest(), None)
+
 # ------------------ Upload Page ------------------
 def upload_page():
     st.title("AI Inventory Optimizer")
     st.title("📤 Upload Your Inventory CSV")
-    st.markdown("Upload your inventory dataset to generate AI-powered forecasts and alerts.")
-    uploaded_file = st.file_uploader("Choose a CSV file", type="csv")
+    st.markdown("Upload your inventory dataset (CSV, Parquet or Arrow) to generate AI-powered forecasts and alerts.")
+    uploaded_file = st.file_uploader("Choose a file", type=["csv", "parquet", "arrow", "feather", "ipc"])
 
     if uploaded_file:
-        st.session_state.uploaded_file = uploaded_file
         try:
-            df = pd.read_csv(uploaded_file)
-            st.success("✅ CSV uploaded successfully!")
-            st.dataframe(df.head(10), use_container_width=True)
-
-            with st.spinner("⏳ Processing with AI engine..."):
-                uploaded_file.seek(0)
-                response = requests.post(
-                    "http://localhost:8000/predict",
-                    files={"file": uploaded_file},
-                    timeout=60
-                )
-
-            if response.status_code == 200:
-                result = response.json()
-                st.session_state.forecast_data = result.get("forecast", [])
-                st.session_state.alerts_data = result.get("alerts", [])
+            data = uploaded_file.getvalue()
+            st.success("✅ File uploaded successfully!")
+            st.dataframe(preview_upload(data, uploaded_file.name), use_container_width=True)
+
+            # Reruns with the same file reuse its job instead of re-submitting it
+            job = submit_upload(data, uploaded_file.name)
+            if job["status"] not in ("completed", "failed"):
+                finished = wait_for_job(job["job_id"])
+                job.update(status=finished["status"], error=finished.get("error"))
+
+            if job["status"] == "completed":
+                st.session_state.job_id = job["job_id"]
                 st.success("✅ Forecast and Alerts Received!")
             else:
-                st.error(f"❌ Backend Error: {response.status_code} - {response.text}")
+                forget_upload(data)
+                st.error(f"❌ Forecast job failed: {job.get('error')}")
 
         except Exception as e:
-            st.error(f"⚠️ Error processing CSV: {str(e)}")
+            st.error(f"⚠️ Error processing upload: {str(e)}")
 
 # ------------------ Dashboard Page ------------------
 def dashboard_page():
     st.title("📊 Inventory Insights Dashboard")
-    alerts_data = st.session_state.get('alerts_data')
-
-    if alerts_data:
-        for alert in alerts_data:
-            st.markdown(f"""
-                <h4>🔍 SKU: {alert.get("sku", "N/A")} — {alert.get("product_name", "N/A")}</h4>
-                <p><strong>Forecast Window:</strong> {alert.get("forecast_window", "N/A")}</p>
-                <p><strong>Avg. Prediction:</strong> {alert.get("avg_prediction", "N/A")} | <strong>Max Predicted Day:</strong> {alert.get("max_predicted_day", "N/A")}</p>
-            """, unsafe_allow_html=True)
-
-            for al in alert.get("alerts", []):
-                severity_icon = {
-                    "High": "🔴",
-                    "Medium": "🟠",
-                    "Low": "🟢"
-                }.get(al.get("severity", "Low"), "⚪")
-                st.markdown(f"{severity_icon} **{al.get('type', 'Alert')}** — {al.get('message', '')}")
-
-            st.markdown("</div>", unsafe_allow_html=True)
-    else:
+    job_id = st.session_state.get('job_id')
+
+    if not job_id:
         st.info("📥 Please upload a CSV file from the Upload Page to populate this dashboard.")
+        return
+
+    filters = st.columns([3, 1, 1])
+    severities = filters[0].multiselect("Severity", SEVERITIES, default=SEVERITIES)
+    page_size = filters[1].selectbox("SKUs per page", PAGE_SIZES)
+    page_number = filters[2].number_input("Page", min_value=1, value=1, step=1)
+
+    page_number = int(page_number)
+    alert_page = fetch_alert_page(job_id, tuple(severities), page_number, page_size)
+    pages = max(math.ceil(alert_page["total"] / page_size), 1)
+    if page_number > pages:
+        # Past the end (e.g. after narrowing the filters): show the last page
+        page_number = pages
+        alert_page = fetch_alert_page(job_id, tuple(severities), page_number, page_size)
+    st.caption(f"{alert_page['total']} SKUs match — page {page_number} of {pages}")
+
+    for alert in alert_page["items"]:
+        st.markdown(f"""
+            <h4>🔍 SKU: {alert.get("sku", "N/A")} — {alert.get("product_name", "N/A")}</h4>
+            <p><strong>Forecast Window:</strong> {alert.get("forecast_window", "N/A")}</p>
+            <p><strong>Avg. Prediction:</strong> {alert.get("avg_prediction", "N/A")} | <strong>Max Predicted Day:</strong> {alert.get("max_predicted_day", "N/A")}</p>
+        """, unsafe_allow_html=True)
+
+        for al in alert.get("alerts", []):
+            if severities and al.get("severity") not in severities:
+                continue
+            severity_icon = SEVERITY_ICONS.get(al.get("severity", "Low"), "⚪")
+            st.markdown(f"{severity_icon} **{al.get('type', 'Alert')}** — {al.get('message', '')}")
+
+        st.markdown("</div>", unsafe_allow_html=True)
 
 # ------------------ SKU Comparison Page ------------------
 def sku_comparison_page():
     st.title("📈 SKU Forecast Comparison")
-    forecast_data = st.session_state.get('forecast_data')
+    job_id = st.session_state.get('job_id')
+
+    if not job_id:
+        st.info("📥 Please upload a CSV file from the Upload Page to visualize SKU comparison.")
+        return
 
-    if forecast_data:
-        forecast_df = pd.DataFrame(forecast_data)
-        required_cols = {'sku', 'inventory', 'sales', 'date'}
+    selected_sku = st.selectbox("Select an SKU to visualize", fetch_skus(job_id))
+    if selected_sku is None:
+        return
 
-        if required_cols.issubset(forecast_df.columns):
-            sku_options = forecast_df["sku"].dropna().unique().tolist()
-            selected_sku = st.selectbox("Select an SKU to visualize", sku_options)
+    # Only the selected SKU's rows are fetched
+    sku_df, block = fetch_sku_series(job_id, selected_sku)
+    required_cols = {'inventory', 'sales', 'date'}
+    if not required_cols.issubset(sku_df.columns):
+        st.warning("Required columns are missing from the dataset.")
+        return
 
-            sku_df = forecast_df[forecast_df["sku"] == selected_sku].copy()
-            product_name = sku_df["product_name"].dropna().unique()
-            st.markdown(f"**Product Name:** {product_name[0] if product_name else 'N/A'}")
+    product_name = sku_df["product_name"].dropna().unique() if "product_name" in sku_df else []
+    st.markdown(f"**Product Name:** {product_name[0] if len(product_name) else 'N/A'}")
 
-            sku_df["date"] = pd.to_datetime(sku_df["date"])
-            sku_df.set_index("date", inplace=True)
-            st.line_chart(sku_df[["inventory", "sales"]])
-        else:
-            st.warning("Required columns are missing from the dataset.")
-    else:
-        st.info("📥 Please upload a CSV file from the Upload Page to visualize SKU comparison.")
+    sku_df = sku_df.assign(date=pd.to_datetime(sku_df["date"])).set_index("date")
+    st.line_chart(sku_df[["inventory", "sales"]])
+
+    for al in (block or {}).get("alerts", []):
+        severity_icon = SEVERITY_ICONS.get(al.get("severity", "Low"), "⚪")
+        st.markdown(f"{severity_icon} **{al.get('type', 'Alert')}** — {al.get('message', '')}")
 
 # ------------------ Page Controller ------------------
 if page == "📤 Upload CSV":